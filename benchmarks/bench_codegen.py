@@ -0,0 +1,42 @@
+"""
+Generated (unrolled, constant-folded) code vs. the generic engines
+
+usage: python benchmarks/bench_codegen.py [path/to/model.urdf] [batch size]
+"""
+import sys
+import timeit
+import numpy as np
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from urdf_kit.graph.tree import kinematic_tree
+from urdf_kit.graph.kinematics import fk_engine
+from urdf_kit.graph.dynamics import multibody_dynamics
+from urdf_kit.graph.codegen import generate_module, load_module
+
+def best_of(func, repeat: int = 5, number: int = 10) -> float:
+    return min(timeit.repeat(func, repeat=repeat, number=number))/number
+
+if __name__ == "__main__":
+    default_urdf = Path(__file__).resolve().parent/".."/"tests"/"data"/"kuka_iiwa"/"model.urdf"
+    urdf_path = sys.argv[1] if len(sys.argv) > 1 else default_urdf
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    tree = kinematic_tree(ET.parse(urdf_path).getroot())
+    params = tree.extract_dynamics(base_is_mobile=False)
+    engine = fk_engine(tree)
+    dyn = multibody_dynamics(params)
+    generated = load_module(generate_module(tree.compile(), dynamics=params))
+    tip_link = next(iter(generated.JACOBIANS.keys()))
+
+    rng = np.random.default_rng(0)
+    q, qd, qdd = rng.uniform(-1, 1, size=(3, batch_size, engine.n_dof))
+    cases = {
+        "forward kinematics": (lambda: engine.compute(q), lambda: generated.fk(q)),
+        f"space Jacobian [{tip_link}]": (lambda: engine.jacobian(q, tip_link), lambda: generated.jacobian(q, tip_link)),
+        "inverse dynamics (RNEA)": (lambda: dyn.inverse_dynamics(q, qd, qdd), lambda: generated.rnea(q, qd, qdd)),
+    }
+    print(f"robot: {tree.urdf_root.get('name')}, {engine.n_dof} DoF, batch size: {batch_size}")
+    for name, (generic, unrolled) in cases.items():
+        t_generic, t_unrolled = best_of(generic), best_of(unrolled)
+        print(f"{name:>40s}: generic {t_generic*1e3:8.3f} ms | generated {t_unrolled*1e3:8.3f} ms | speedup x{t_generic/t_unrolled:.1f}")
@@ -18,4 +18,7 @@ setuptools.setup(
         "pyyaml>=6",
     #     "onshape-to-robot=0.3.17" # I guess it's not a strict requirement
     ],
+    entry_points={
+        "console_scripts": ["urdf-kit=urdf_kit.cli:main"],
+    },
 )
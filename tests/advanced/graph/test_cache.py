@@ -0,0 +1,94 @@
+from urdf_kit.graph.cache import model_cache, _entry_key
+from urdf_kit.graph.tree import kinematic_tree
+
+import json
+import shutil
+import numpy as np
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from numpy.testing import assert_array_equal
+
+data_dir = (Path(__file__).resolve().parent/".."/".."/"data").resolve()
+
+def copy_kuka(tmp_path: Path) -> Path:
+    urdf_path = tmp_path/"model.urdf"
+    shutil.copy(data_dir/"kuka_iiwa"/"model.urdf", urdf_path)
+    return urdf_path
+
+def test_roundtrip(tmp_path):
+    urdf_path = copy_kuka(tmp_path)
+    cache = model_cache(tmp_path/"cache")
+    cold = cache.load(urdf_path, base_is_mobile=False)
+    assert not cold.hit
+    assert len(cache.entries()) == 1
+    warm = cache.load(urdf_path, base_is_mobile=False)
+    assert warm.hit
+    assert warm.sha256 == cold.sha256
+
+    tree = kinematic_tree(ET.parse(urdf_path).getroot())
+    expected = tree.compile()
+    for field_name in ("parent", "depth", "joint_type", "dof_index", "axis", "X_ParentJoint", "mass", "X_LinkCom", "inertia", "lower", "upper", "velocity_limit", "effort_limit", "screw_axis", "subtree_end"):
+        assert_array_equal(getattr(warm.compiled, field_name), getattr(expected, field_name))
+    assert warm.compiled.link_names == expected.link_names
+    assert warm.compiled.joint_names == expected.joint_names
+    assert warm.dynamics.as_dict() == tree.extract_dynamics(base_is_mobile=False).as_dict()
+
+    # the options are part of the key
+    assert not cache.load(urdf_path, with_dynamics=False).hit
+    assert cache.load(urdf_path, with_dynamics=False).dynamics is None
+    assert len(cache.entries()) == 2
+
+def test_modified_source_evicts(tmp_path):
+    urdf_path = copy_kuka(tmp_path)
+    cache = model_cache(tmp_path/"cache")
+    old_sha = cache.load(urdf_path, with_dynamics=False).sha256
+    urdf_path.write_text(urdf_path.read_text().replace('<mass value="5.0"/>', '<mass value="6.0"/>', 1))
+    res = cache.load(urdf_path, with_dynamics=False)
+    assert not res.hit
+    assert res.sha256 != old_sha
+    assert [meta["sha256"] for meta in cache.entries().values()] == [res.sha256] # the old entry is gone
+    assert cache.load(urdf_path, with_dynamics=False).hit
+
+def test_evict_stale(tmp_path):
+    urdf_path = copy_kuka(tmp_path)
+    other_path = tmp_path/"other.urdf"
+    shutil.copy(data_dir/"biped2d_pybullet.urdf", other_path)
+    cache = model_cache(tmp_path/"cache")
+    cache.load(urdf_path, with_dynamics=False)
+    res = cache.load(other_path, with_dynamics=False)
+    assert cache.evict_stale() == []
+
+    # outdated urdf_kit version
+    key = _entry_key(res.sha256, False, True)
+    meta_path = cache.cache_dir/f"{key}.json"
+    meta = json.loads(meta_path.read_text())
+    meta["urdf_kit_version"] = "0.0"
+    meta_path.write_text(json.dumps(meta))
+    # vanished source
+    urdf_path.unlink()
+    assert len(cache.evict_stale()) == 2
+    assert cache.entries() == {}
+    assert list(cache.cache_dir.iterdir()) == []
+
+def test_corrupted_entry_is_rebuilt(tmp_path):
+    urdf_path = copy_kuka(tmp_path)
+    cache = model_cache(tmp_path/"cache")
+    res = cache.load(urdf_path, with_dynamics=False)
+    (cache.cache_dir/f"{_entry_key(res.sha256, False, True)}.npz").write_bytes(b"garbage")
+    assert not cache.load(urdf_path, with_dynamics=False).hit
+    assert cache.load(urdf_path, with_dynamics=False).hit
+
+def test_distinct_temporary_files(tmp_path, monkeypatch):
+    import os
+    import urdf_kit.graph.cache as cache_module
+    replaced = []
+    os_replace = os.replace
+    def replace(src, dst):
+        replaced.append((Path(src).name, Path(dst).name))
+        os_replace(src, dst)
+    monkeypatch.setattr(cache_module.os, "replace", replace)
+    cache = model_cache(tmp_path/"cache")
+    cache.load(copy_kuka(tmp_path))
+    (npz_tmp, npz), (meta_tmp, meta) = replaced
+    assert npz_tmp == f"{npz}.{os.getpid()}.tmp" and meta_tmp == f"{meta}.{os.getpid()}.tmp"
+    assert not list((tmp_path/"cache").glob("*.tmp"))
@@ -0,0 +1,81 @@
+from urdf_kit.graph.tree import kinematic_tree
+from urdf_kit.graph.kinematics import fk_engine
+from urdf_kit.graph.dynamics import multibody_dynamics
+from urdf_kit.graph.codegen import generate_module, load_module, write_module
+from urdf_kit.edit_links import rename_link
+
+import re
+import pytest
+import numpy as np
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from numpy.testing import assert_allclose
+
+data_dir = (Path(__file__).resolve().parent/".."/".."/"data").resolve()
+
+def load_tree(case: str) -> kinematic_tree:
+    if case == 'kuka':
+        src_urdf_path = data_dir/"kuka_iiwa"/"model.urdf"
+    elif case == 'biped':
+        src_urdf_path = data_dir/"biped2d_pybullet.urdf"
+    else:
+        raise ValueError("undefined test case name")
+    return kinematic_tree(ET.parse(src_urdf_path).getroot())
+
+@pytest.mark.parametrize("case", ("kuka", "biped"))
+def test_generated_kinematics(case):
+    tree = load_tree(case)
+    engine = fk_engine(tree)
+    generated = load_module(generate_module(tree.compile()))
+    assert generated.LINK_NAMES == tuple(engine.link_names)
+    assert generated.JOINT_NAMES == tuple(engine.joint_names)
+
+    rng = np.random.default_rng(0)
+    q = rng.uniform(-1, 1, size=(3, 4, engine.n_dof)) # arbitrary batch shape
+    X_RootLink = engine.compute(q.reshape(-1, engine.n_dof)).reshape(q.shape[:-1]+(engine.n_links, 4, 4))
+    assert_allclose(generated.fk(q), X_RootLink, atol=1e-8)
+    assert_allclose(generated.fk(q[0, 0]), X_RootLink[0, 0], atol=1e-8)
+    for link_name in generated.JACOBIANS.keys():
+        assert_allclose(generated.jacobian(q[0], link_name), engine.jacobian(q[0], link_name), atol=1e-8)
+
+def test_colliding_link_names():
+    """ "a-b" and "a_b" would both become `jacobian_a_b` """
+    urdf_root = ET.parse(data_dir/"biped2d_pybullet.urdf").getroot()
+    rename_link(urdf_root, "l_foot", "a-b")
+    rename_link(urdf_root, "r_foot", "a_b")
+    tree = kinematic_tree(urdf_root)
+    engine = fk_engine(tree)
+    source = generate_module(tree.compile(), tip_links=["a-b", "a_b"])
+    assert len(re.findall(r"^def (jacobian_a_b\w*)\(", source, flags=re.M)) == 2
+    generated = load_module(source)
+    assert generated.JACOBIANS["a-b"] is not generated.JACOBIANS["a_b"]
+    q = np.random.default_rng(1).uniform(-1, 1, size=(2, engine.n_dof))
+    for link_name in ("a-b", "a_b"):
+        assert_allclose(generated.jacobian(q, link_name), engine.jacobian(q, link_name), atol=1e-8)
+
+def test_structural_zeros_are_folded():
+    source = generate_module(load_tree('kuka').compile())
+    assert re.search(r"\*-?[01]\.0\b", source) is None
+    assert re.search(r"\+ -?0\.0\b", source) is None
+    # the first joint rotates about z of a translated frame
+    fk_lines = source.split("def fk")[1].split("def ")[0]
+    assert "out[..., 1, 2, 2] = 1.0" in fk_lines
+    assert "out[..., 1, 0, 2]" not in fk_lines # structural zero, left as initialized
+
+@pytest.mark.parametrize("base_is_mobile", (False, True))
+def test_generated_rnea(base_is_mobile, tmp_path):
+    tree = load_tree('kuka')
+    params = tree.extract_dynamics(base_is_mobile=base_is_mobile)
+    dyn = multibody_dynamics(params)
+    source = generate_module(tree.compile(), dynamics=params, tip_links=["lbr_iiwa_link_7"])
+    write_module(tmp_path/"kuka_generated.py", source)
+    assert (tmp_path/"kuka_generated.py").read_text() == source
+    generated = load_module(source)
+    assert list(generated.JACOBIANS.keys()) == ["lbr_iiwa_link_7"]
+
+    rng = np.random.default_rng(1)
+    T = 10
+    q, qd, qdd = rng.uniform(-1, 1, size=(3, T, dyn.n_dof))
+    kwargs = dict(base_twist=rng.uniform(-1, 1, size=(T, 6)), base_accel=rng.uniform(-1, 1, size=(T, 6))) if base_is_mobile else dict()
+    gravity = np.array([0.1, -0.2, -9.81])
+    assert_allclose(generated.rnea(q, qd, qdd, gravity=gravity, **kwargs), dyn.inverse_dynamics(q, qd, qdd, gravity=gravity, **kwargs), atol=1e-8)
@@ -0,0 +1,55 @@
+from urdf_kit.graph.tree import kinematic_tree
+from urdf_kit.graph.compiled import compiled_tree, FIXED, REVOLUTE, PRISMATIC
+
+import pytest
+import numpy as np
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from numpy.testing import assert_allclose
+
+data_dir = (Path(__file__).resolve().parent/".."/".."/"data").resolve()
+
+def test_compile_kuka():
+    tree = kinematic_tree(ET.parse(data_dir/"kuka_iiwa"/"model.urdf").getroot())
+    model = tree.compile()
+    assert isinstance(model, compiled_tree)
+    assert model.n_links == len(tree) == 8
+    assert model.n_dof == 7
+    assert model.link_names[0] == tree.root_name == "lbr_iiwa_link_0"
+    assert model.joint_names == tuple(f"lbr_iiwa_joint_{i}" for i in range(1, 8))
+    assert model.parent.tolist() == [-1, 0, 1, 2, 3, 4, 5, 6]
+    assert np.all(model.joint_type[1:] == REVOLUTE)
+    assert model.dof_index.tolist() == [-1, 0, 1, 2, 3, 4, 5, 6]
+
+    i = model.link_index("lbr_iiwa_link_1")
+    assert_allclose(model.X_ParentJoint[i][:3, 3], [0, 0, 0.1575])
+    assert_allclose(model.axis[i], [0, 0, 1])
+    assert model.lower[i] == pytest.approx(-2.96705972839)
+    assert model.upper[i] == pytest.approx(2.96705972839)
+    assert model.velocity_limit[i] == 10
+    assert model.effort_limit[i] == 300
+    assert model.mass[0] == 5.0
+    assert_allclose(model.mass.sum(), sum(float(elem.get("value")) for elem in tree.urdf_root.findall("link/inertial/mass")))
+
+def test_compiled_is_frozen():
+    tree = kinematic_tree(ET.parse(data_dir/"biped2d_pybullet.urdf").getroot())
+    model = tree.compile()
+    with pytest.raises(ValueError):
+        model.mass[0] = 1.
+    with pytest.raises(AttributeError):
+        model.robot_name = "sth_else"
+    # the snapshot doesn't follow the tree
+    tree.links['torso'].fix_revolute_joint(0.0)
+    assert model.n_dof == 9
+    assert tree.compile().n_dof == 8
+
+def test_compile_biped_joint_types():
+    tree = kinematic_tree(ET.parse(data_dir/"biped2d_pybullet.urdf").getroot())
+    model = tree.compile()
+    types = dict(zip(model.link_joint_names, model.joint_type))
+    assert types["y_to_world"] == PRISMATIC
+    assert types["torso_to_z"] == REVOLUTE
+    i = model.link_names.index("torso")
+    assert model.lower[i] == -np.inf and model.upper[i] == np.inf # continuous
+    assert model.link_joint_names[0] == ""
+    assert model.joint_type[0] == FIXED
@@ -0,0 +1,187 @@
+from urdf_kit.graph.tree import kinematic_tree
+from urdf_kit.graph.kinematics import fk_engine
+from urdf_kit.graph.dynamics import multibody_dynamics
+from urdf_kit.maths.batch import inverse_transform, transform_screw, spatial_inertia
+
+import pytest
+import numpy as np
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from numpy.testing import assert_allclose
+
+data_dir = (Path(__file__).resolve().parent/".."/".."/"data").resolve()
+
+def load_tree() -> kinematic_tree:
+    return kinematic_tree(ET.parse(data_dir/"kuka_iiwa"/"model.urdf").getroot())
+
+def mechanical_energy(engine: fk_engine, q, qd, gravity_Base, base_twist=None) -> np.ndarray:
+    """ independent of `multibody_dynamics`: via the forward kinematics and the link Jacobians
+    
+    the base frame is the CoM-aligned frame of the root link
+    """
+    model = engine.model
+    X_RootLink = engine.compute(q) # (N, n_links, 4, 4)
+    X_BaseRoot = inverse_transform(model.X_LinkCom[0])
+    G = spatial_inertia(model.mass, model.inertia)
+    energy = np.zeros(q.shape[0])
+    for k, link_name in enumerate(model.link_names):
+        X_BaseCom = X_BaseRoot @ X_RootLink[:, k] @ model.X_LinkCom[k]
+        twist = np.zeros((q.shape[0], 6))
+        if k > 0:
+            twist += transform_screw(inverse_transform(model.X_LinkCom[k]), np.einsum('tij,tj->ti', engine.jacobian(q, link_name, frame='body', X_RootLink=X_RootLink), qd))
+        if base_twist is not None:
+            twist += transform_screw(inverse_transform(X_BaseCom), base_twist)
+        energy += 0.5*np.einsum('ti,ij,tj->t', twist, G[k], twist)
+        energy -= model.mass[k]*X_BaseCom[:, :3, 3] @ gravity_Base
+    return energy
+
+def test_fixed_base_power_balance():
+    tree = load_tree()
+    dyn = multibody_dynamics(tree.extract_dynamics(base_is_mobile=False))
+    engine = fk_engine(tree)
+    assert dyn.joint_names == list(engine.joint_names)
+    assert not dyn.base_is_mobile
+
+    rng = np.random.default_rng(0)
+    T = 6
+    q, qd, qdd = (rng.uniform(-1, 1, size=(T, dyn.n_dof)) for _ in range(3))
+    gravity = np.array([0., 0., -9.81])
+    tau = dyn.inverse_dynamics(q, qd, qdd, gravity=gravity)
+    assert tau.shape == (T, dyn.n_dof)
+    # power of the actuators == rate of change of the mechanical energy
+    h = 1e-5
+    energy = [mechanical_energy(engine, q+qd*t+0.5*qdd*t**2, qd+qdd*t, gravity) for t in (-h, h)]
+    assert_allclose(np.sum(tau*qd, axis=1), (energy[1]-energy[0])/(2*h), rtol=1e-6, atol=1e-6)
+    # single sample
+    assert_allclose(dyn.inverse_dynamics(q[0], qd[0], qdd[0], gravity=gravity), tau[0])
+
+def test_fixed_base_static_holding():
+    """ at rest, the joint torques balance gravity only """
+    tree = load_tree()
+    dyn = multibody_dynamics(tree.extract_dynamics(base_is_mobile=False))
+    zeros = np.zeros(dyn.n_dof)
+    assert_allclose(dyn.inverse_dynamics(zeros, zeros, zeros, gravity=np.zeros(3)), 0)
+    # upright home configuration: only the slightly off-axis CoMs load the hinges
+    assert np.all(np.abs(dyn.inverse_dynamics(zeros, zeros, zeros)) < 0.1)
+    q = zeros.copy()
+    q[1] = 0.5 # tilt the shoulder
+    assert abs(dyn.inverse_dynamics(q, zeros, zeros)[1]) > 1.
+
+def test_mobile_base_power_balance():
+    tree = load_tree()
+    dyn = multibody_dynamics(tree.extract_dynamics(base_is_mobile=True))
+    engine = fk_engine(tree)
+    assert dyn.base_is_mobile
+
+    rng = np.random.default_rng(1)
+    T = 4
+    q, qd, qdd = (rng.uniform(-1, 1, size=(T, dyn.n_dof)) for _ in range(3))
+    V0, Vd0 = rng.uniform(-1, 1, size=(T, 6)), rng.uniform(-1, 1, size=(T, 6))
+    gravity = np.zeros(3)
+    tau = dyn.inverse_dynamics(q, qd, qdd, gravity=gravity, base_twist=V0, base_accel=Vd0)
+    assert tau.shape == (T, 6 + dyn.n_dof)
+    h = 1e-5
+    energy = [mechanical_energy(engine, q+qd*t+0.5*qdd*t**2, qd+qdd*t, gravity, base_twist=V0+Vd0*t) for t in (-h, h)]
+    power = np.sum(tau[:, :6]*V0, axis=1) + np.sum(tau[:, 6:]*qd, axis=1)
+    assert_allclose(power, (energy[1]-energy[0])/(2*h), rtol=1e-6, atol=1e-6)
+
+def test_input_validation():
+    tree = load_tree()
+    dyn = multibody_dynamics(tree.extract_dynamics(base_is_mobile=False))
+    zeros = np.zeros((2, dyn.n_dof))
+    with pytest.raises(ValueError):
+        dyn.inverse_dynamics(zeros, zeros, zeros, base_twist=np.ones(6))
+    with pytest.raises(ValueError):
+        dyn.inverse_dynamics(zeros, zeros, np.zeros((3, dyn.n_dof)))
+    params = tree.extract_dynamics(base_is_mobile=False)
+    params.joints.reverse()
+    with pytest.raises(ValueError):
+        multibody_dynamics(params)
+
+@pytest.mark.parametrize("base_is_mobile", (False, True))
+def test_mass_matrix_matches_inverse_dynamics(base_is_mobile):
+    tree = load_tree()
+    dyn = multibody_dynamics(tree.extract_dynamics(base_is_mobile=base_is_mobile))
+    rng = np.random.default_rng(3)
+    T = 5
+    q = rng.uniform(-1, 1, size=(T, dyn.n_dof))
+    M = dyn.mass_matrix(q)
+    n = dyn.n_dof + (6 if base_is_mobile else 0)
+    assert M.shape == (T, n, n)
+    assert_allclose(M, np.swapaxes(M, 1, 2), atol=1e-12)
+    assert np.all(np.linalg.eigvalsh(M) > 0)
+    # column by column: RNEA without velocities and gravity
+    zeros = np.zeros((T, dyn.n_dof))
+    for k in range(n):
+        acc = np.zeros((T, n))
+        acc[:, k] = 1.
+        kwargs = dict(base_accel=acc[:, :6]) if base_is_mobile else dict()
+        tau = dyn.inverse_dynamics(q, zeros, acc[:, n-dyn.n_dof:], gravity=np.zeros(3), **kwargs)
+        assert_allclose(M[:, :, k], tau, atol=1e-12)
+    assert_allclose(dyn.mass_matrix(q[0]), M[0])
+
+@pytest.mark.parametrize("base_is_mobile", (False, True))
+def test_forward_dynamics_inverts_inverse_dynamics(base_is_mobile):
+    tree = load_tree()
+    dyn = multibody_dynamics(tree.extract_dynamics(base_is_mobile=base_is_mobile))
+    rng = np.random.default_rng(4)
+    T = 5
+    offset = 6 if base_is_mobile else 0
+    q, qd = rng.uniform(-1, 1, size=(2, T, dyn.n_dof))
+    tau = rng.uniform(-10, 10, size=(T, offset+dyn.n_dof))
+    kwargs = dict(base_twist=rng.uniform(-1, 1, size=(T, 6))) if base_is_mobile else dict()
+    acc = dyn.forward_dynamics(q, qd, tau, **kwargs)
+    assert acc.shape == tau.shape
+    with pytest.raises(ValueError):
+        dyn.forward_dynamics(q, qd, tau[:, 1:], **kwargs)
+    if base_is_mobile:
+        kwargs['base_accel'] = acc[:, :6]
+    assert_allclose(dyn.inverse_dynamics(q, qd, acc[:, offset:], **kwargs), tau, atol=1e-10)
+
+@pytest.mark.parametrize("method,tolerance", (("semi_implicit_euler", 2e-3), ("rk4", 1e-8)))
+def test_rollout_conserves_energy(method, tolerance):
+    """ passive swinging under gravity """
+    tree = load_tree()
+    dyn = multibody_dynamics(tree.extract_dynamics(base_is_mobile=False))
+    engine = fk_engine(tree)
+    rng = np.random.default_rng(5)
+    T, n_steps, dt = 8, 200, 1e-3
+    state = dyn.initial_state(rng.uniform(-1, 1, size=(T, dyn.n_dof)))
+    gravity = np.array([0., 0., -9.81])
+    q_log, final = dyn.rollout(state, np.zeros((n_steps, T, dyn.n_dof)), dt, n_steps, method=method, gravity=gravity)
+    assert q_log.shape == (n_steps+1, T, dyn.n_dof)
+    assert_allclose(q_log[0], state.q)
+    assert_allclose(q_log[-1], final.q)
+    energy_0 = mechanical_energy(engine, state.q, state.qd, gravity)
+    energy_1 = mechanical_energy(engine, final.q, final.qd, gravity)
+    assert np.any(np.abs(final.qd) > 0.1) # it did move
+    assert_allclose(energy_1, energy_0, rtol=tolerance)
+
+def test_rollout_free_floating():
+    tree = load_tree()
+    dyn = multibody_dynamics(tree.extract_dynamics(base_is_mobile=True))
+    engine = fk_engine(tree)
+    rng = np.random.default_rng(6)
+    T, n_steps, dt = 4, 100, 1e-3
+    state = dyn.initial_state(
+        rng.uniform(-1, 1, size=(T, dyn.n_dof)), qd=rng.uniform(-1, 1, size=(T, dyn.n_dof)),
+        base_twist=rng.uniform(-1, 1, size=(T, 6)),
+    )
+    # a feedback law doing no work on the joints
+    _, final = dyn.rollout(state, lambda k, s: np.zeros((s.batch_size, 6+dyn.n_dof)), dt, n_steps, method="rk4", gravity=np.zeros(3))
+    assert_allclose(
+        mechanical_energy(engine, final.q, final.qd, np.zeros(3), base_twist=final.base_twist),
+        mechanical_energy(engine, state.q, state.qd, np.zeros(3), base_twist=state.base_twist),
+        rtol=1e-6,
+    )
+    R = final.X_WorldBase[:, :3, :3]
+    assert_allclose(R @ np.swapaxes(R, 1, 2), np.tile(np.eye(3), (T, 1, 1)), atol=1e-12)
+    assert not np.allclose(final.X_WorldBase, state.X_WorldBase)
+    # under gravity, the whole robot falls freely: the CoM accelerates with g
+    g = np.array([0., 0., -9.81])
+    state = dyn.initial_state(np.zeros((1, dyn.n_dof)))
+    acc = dyn.forward_dynamics(state.q, state.qd, np.zeros((1, 6+dyn.n_dof)), gravity=g)
+    assert_allclose(acc[:, 6:], 0, atol=1e-9)
+    assert_allclose(acc[0, :3], g, atol=1e-9)
+    with pytest.raises(ValueError):
+        dyn.step(state, np.zeros((1, 6+dyn.n_dof)), dt, method="euler")
@@ -0,0 +1,186 @@
+from urdf_kit.graph.tree import kinematic_tree
+from urdf_kit.graph.kinematics import fk_engine, incremental_fk
+
+import pytest
+import numpy as np
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from numpy.testing import assert_allclose
+
+data_dir = (Path(__file__).resolve().parent/".."/".."/"data").resolve()
+
+def load_tree(case: str) -> kinematic_tree:
+    if case == 'kuka':
+        src_urdf_path = data_dir/"kuka_iiwa"/"model.urdf"
+    elif case == 'biped':
+        src_urdf_path = data_dir/"biped2d_pybullet.urdf"
+    else:
+        raise ValueError("undefined test case name")
+    return kinematic_tree(ET.parse(src_urdf_path).getroot())
+
+def fk_reference(tree: kinematic_tree, engine: fk_engine, q: np.ndarray) -> np.ndarray:
+    """ link by link using `body_entry.get_X_ParentChild` """
+    X_RootLink = {tree.root_name: np.eye(4)}
+    for link_name in tree.gen_sorted_list_topdown('breadth_first'):
+        entry = tree.links[link_name]
+        joint_position = q[engine.joint_names.index(entry.joint_name)] if not entry.is_fixed_wrt_parent() else 0.
+        X_RootLink[link_name] = X_RootLink[entry.parentLink_name] @ entry.get_X_ParentChild(joint_position).A
+    return np.array([X_RootLink[link_name] for link_name in engine.link_names])
+
+@pytest.mark.parametrize("case", ("kuka", "biped"))
+def test_fk_batch_matches_reference(case):
+    tree = load_tree(case)
+    engine = fk_engine(tree)
+    assert engine.n_links == len(tree)
+    assert engine.link_names[0] == tree.root_name
+    assert all(engine.parent[i] < i for i in range(1, engine.n_links)) # topological order
+
+    rng = np.random.default_rng(0)
+    q = rng.uniform(-1, 1, size=(5, engine.n_dof))
+    res = engine.compute(q)
+    assert res.shape == (5, engine.n_links, 4, 4)
+    for k in range(q.shape[0]):
+        assert_allclose(res[k], fk_reference(tree, engine, q[k]), atol=1e-12)
+    # single configuration
+    assert_allclose(engine.compute(q[0]), res[0])
+
+def test_fk_input_validation():
+    engine = fk_engine(load_tree('kuka'))
+    with pytest.raises(ValueError):
+        engine.compute(np.zeros((3, engine.n_dof+1)))
+
+@pytest.mark.parametrize("case,link_name", (
+    ("kuka", "lbr_iiwa_link_7"),
+    ("kuka", "lbr_iiwa_link_3"),
+    ("biped", "l_foot"),
+))
+def test_jacobian_finite_difference(case, link_name):
+    engine = fk_engine(load_tree(case))
+    k = engine.link_index(link_name)
+    rng = np.random.default_rng(2)
+    q = rng.uniform(-1, 1, size=(4, engine.n_dof))
+    J_space = engine.jacobian(q, link_name, frame='space')
+    J_body = engine.jacobian(q, link_name, frame='body')
+    assert J_space.shape == J_body.shape == (4, 6, engine.n_dof)
+
+    eps = 1e-6
+    X = engine.compute(q)[:, k]
+    for i in range(engine.n_dof):
+        dq = np.zeros(engine.n_dof)
+        dq[i] = eps
+        dX = (engine.compute(q+dq)[:, k] - engine.compute(q-dq)[:, k]) / (2*eps)
+        for frame, J, twist_hat in (
+            ('space', J_space, dX @ np.linalg.inv(X)),
+            ('body', J_body, np.linalg.inv(X) @ dX),
+        ):
+            expected = np.concatenate((twist_hat[:, :3, 3], twist_hat[:, [2, 0, 1], [1, 2, 0]]), axis=1)
+            assert_allclose(J[:, :, i], expected, atol=1e-7, err_msg=frame)
+    # single configuration
+    assert_allclose(engine.jacobian(q[0], link_name), J_space[0])
+
+def test_lowest_common_ancestor_brute_force():
+    model = load_tree('biped').compile()
+    def ancestors(i):
+        out = [i]
+        while model.parent[i] >= 0:
+            i = model.parent[i]
+            out.append(i)
+        return out
+    for i in range(model.n_links):
+        for j in range(model.n_links):
+            expected = next(k for k in ancestors(i) if k in ancestors(j))
+            assert model._lca(i, j) == expected
+    assert model.lowest_common_ancestor("l_foot", "r_foot") == "torso"
+    up, lca, down = model.path_between("l_foot", "r_foot")
+    assert model.link_names[lca] == "torso"
+    assert model.link_names[up[0]] == "l_foot" and model.link_names[down[-1]] == "r_foot"
+    assert model.path_between("torso", "torso") == ([], model.link_index("torso"), [])
+
+@pytest.mark.parametrize("case,link_a,link_b", (
+    ("biped", "l_foot", "r_foot"),
+    ("biped", "r_foot", "torso"),
+    ("biped", "torso", "l_foot"),
+    ("kuka", "lbr_iiwa_link_7", "lbr_iiwa_link_2"),
+))
+def test_relative_transform(case, link_a, link_b):
+    tree = load_tree(case)
+    engine = fk_engine(tree)
+    rng = np.random.default_rng(3)
+    q = rng.uniform(-1, 1, size=(4, engine.n_dof))
+    X_RootLink = engine.compute(q)
+    expected = np.linalg.inv(X_RootLink[:, engine.link_index(link_a)]) @ X_RootLink[:, engine.link_index(link_b)]
+    assert_allclose(engine.relative_transform(q, link_a, link_b), expected, atol=1e-12)
+    assert_allclose(engine.relative_transform(q[0], link_a, link_b), expected[0], atol=1e-12)
+    assert_allclose(tree.get_X_AB(link_a, link_b, dict(zip(engine.joint_names, q[1]))), expected[1], atol=1e-12)
+    with pytest.raises(ValueError):
+        tree.get_X_AB(link_a, link_b, {"no_such_joint": 0.})
+
+def test_subtrees_are_contiguous():
+    model = load_tree('biped').compile()
+    for i in range(model.n_links):
+        descendants = {k for k in range(model.n_links) if model._lca(i, k) == i}
+        assert descendants == set(range(i, model.subtree_end[i]))
+
+def test_incremental_fk_stream():
+    from types import SimpleNamespace
+    tree = load_tree('biped')
+    cache = incremental_fk(tree)
+    engine = cache.engine
+    assert_allclose(cache.X_RootLink, engine.compute(np.zeros(engine.n_dof)))
+
+    rng = np.random.default_rng(4)
+    messages = []
+    for _ in range(20):
+        names = list(rng.choice(engine.joint_names, size=2, replace=False))
+        messages.append(dict(zip(names, rng.uniform(-1, 1, size=2))))
+    messages.append(SimpleNamespace(name=["l_knee"], position=[0.3])) # JointState-like
+    messages.append((["r_knee"], [0.2]))
+    messages.append(rng.uniform(-1, 1, size=engine.n_dof))
+    messages.append({}) # nothing changed
+
+    def as_dict(message) -> dict:
+        if isinstance(message, SimpleNamespace):
+            return dict(zip(message.name, message.position))
+        if isinstance(message, tuple):
+            return dict(zip(*message))
+        return message
+    q = np.zeros(engine.n_dof)
+    for message, (updated, X_RootLink) in zip(messages, cache.stream(iter(messages))):
+        if isinstance(message, np.ndarray):
+            q = message.copy()
+        else:
+            for name, position in as_dict(message).items():
+                q[engine.joint_names.index(name)] = position
+        assert X_RootLink is cache.X_RootLink # constant memory
+        assert_allclose(X_RootLink, engine.compute(q), atol=1e-12)
+        assert_allclose(cache.q, q)
+    assert len(updated) == 0
+
+    # only the subtree below the knee is recomputed
+    knee = engine.link_index(engine.model.link_names[engine.model.link_joint_names.index("l_knee")])
+    updated = cache.update({"l_knee": 0.5})
+    assert set(updated) == set(range(knee, engine.model.subtree_end[knee]))
+    assert_allclose(cache.get_X_RootLink("l_foot"), engine.compute(cache.q)[engine.link_index("l_foot")], atol=1e-12)
+    with pytest.raises(ValueError):
+        cache.update({"no_such_joint": 0.})
+    with pytest.raises(ValueError):
+        cache.update((["l_knee", "r_knee"], [0.1]))
+    with pytest.raises(ValueError):
+        cache.X_RootLink[0, 0, 0] = 2.
+
+@pytest.mark.parametrize("with_fixed_joint", (False, True))
+def test_zero_dof(with_fixed_joint):
+    """ a single link, or only fixed joints (e.g. after merging) """
+    urdf_str = '<robot name="r"><link name="base"/>'
+    if with_fixed_joint:
+        urdf_str += ('<link name="tool"/><joint name="j" type="fixed"><parent link="base"/><child link="tool"/>'
+            '<origin xyz="0 0 0.5" rpy="0 0 1"/></joint>')
+    tree = kinematic_tree(ET.fromstring(urdf_str + '</robot>'))
+    engine = fk_engine(tree)
+    assert engine.n_dof == 0
+    expected = fk_reference(tree, engine, np.zeros(0))
+    assert_allclose(engine.compute(np.zeros(0)), expected, atol=1e-12)
+    assert_allclose(engine.compute(np.zeros((3, 0))), np.broadcast_to(expected, (3,) + expected.shape), atol=1e-12)
+    assert engine.jacobian(np.zeros(0), engine.link_names[-1]).shape == (6, 0)
+    with pytest.raises(ValueError):
+        engine.compute(np.zeros(1))
@@ -1,8 +1,14 @@
 from urdf_kit.graph import params as robot_params
+from urdf_kit.graph.tree import kinematic_tree
+import json
+import pytest
 import numpy as np
 import yaml
+import xml.etree.ElementTree as ET
 from pathlib import Path
 
+data_dir = (Path(__file__).resolve().parent/".."/".."/"data").resolve()
+
 def test_compositional_asdict(generate_oracle = False):
     """
     TODO split up this test
@@ -36,5 +42,51 @@ def test_compositional_asdict(generate_oracle = False):
             # https://stackoverflow.com/questions/23716531/python-yaml-dump-format-list-in-other-yaml-format
 
 
+@pytest.mark.parametrize("suffix", (".npz", ".json", ".yaml"))
+@pytest.mark.parametrize("base_is_mobile", (True, False))
+@pytest.mark.parametrize("num_joints", ("some", "none"))
+def test_export_roundtrip(tmp_path, suffix, base_is_mobile, num_joints):
+    if num_joints == "some":
+        urdf_root = ET.parse(data_dir/"kuka_iiwa"/"model.urdf").getroot()
+    else: # e.g. a single link, or everything merged by `merge_fixed_joints`
+        urdf_root = ET.fromstring('<robot name="one"><link name="base"><inertial><mass value="2"/>'
+            '<inertia ixx="0.1" iyy="0.1" izz="0.1" ixy="0" iyz="0" ixz="0"/></inertial></link></robot>')
+    tree = kinematic_tree(urdf_root)
+    for model in (tree.extract_kinematics(), tree.extract_dynamics(base_is_mobile=base_is_mobile)):
+        assert (len(model.joints) > 0) == (num_joints == "some")
+        fpath = tmp_path/f"params{suffix}"
+        robot_params.save_params(model, fpath)
+        res = robot_params.load_params(fpath)
+        assert type(res) is type(model)
+        assert res.as_dict() == model.as_dict()
+
+def test_load_as_dict_yaml():
+    """ the YAML layout is the one of `as_dict` """
+    res = robot_params.load_params(Path(__file__).parent/".."/".."/"test_output_expected"/"extracted_params_for_dummyBot.yaml")
+    assert isinstance(res, robot_params.robot_kinematics)
+    assert [joint.joint_name for joint in res.joints] == ["eta1", "eta2"]
+    assert res.joints[0].screw_axis == [1, 0, 0, 0, 0, 1]
+
+def test_load_validates(tmp_path):
+    tree = kinematic_tree(ET.parse(data_dir/"kuka_iiwa"/"model.urdf").getroot())
+    robot_params.save_params(tree.extract_dynamics(), tmp_path/"params.json")
+    data = json.loads((tmp_path/"params.json").read_text())
+    data["mass"][2] = 0.
+    (tmp_path/"params.json").write_text(json.dumps(data))
+    with pytest.raises(ValueError):
+        robot_params.load_params(tmp_path/"params.json")
+    data["mass"][2] = 1.
+    data["screw_axis"][1] = data["screw_axis"][1][:5]
+    (tmp_path/"params.json").write_text(json.dumps(data))
+    with pytest.raises(ValueError):
+        robot_params.load_params(tmp_path/"params.json")
+    with pytest.raises(ValueError):
+        robot_params.save_params(tree.extract_kinematics(), tmp_path/"params.txt")
+    with pytest.raises(ValueError):
+        robot_params.save_params(tree.extract_kinematics(), tmp_path/"params.json", fmt="xml")
+    with pytest.raises(ValueError):
+        robot_params.load_params(tmp_path/"params.json", fmt="xml")
+
+
 if __name__ == "__main__":
-    test_compositional_asdict(generate_oracle=True)
\ No newline at end of file
+    test_compositional_asdict(generate_oracle=True)
@@ -0,0 +1,42 @@
+from urdf_kit.graph.tree import kinematic_tree
+from urdf_kit.graph.kinematics import fk_engine
+from urdf_kit.graph.poe import poe_kinematics
+from urdf_kit.graph.params import robot_kinematics
+
+import pytest
+import numpy as np
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from numpy.testing import assert_allclose
+
+data_dir = (Path(__file__).resolve().parent/".."/".."/"data").resolve()
+
+@pytest.mark.parametrize("urdf_path", (
+    data_dir/"kuka_iiwa"/"model.urdf",
+    data_dir/"biped2d_pybullet.urdf",
+))
+def test_poe_matches_fk(urdf_path):
+    tree = kinematic_tree(ET.parse(urdf_path).getroot())
+    tree.links[tree.compile().link_names[-1]].joint_elem.attrib["type"] = "fixed" # also cover a fixed joint
+    params = tree.extract_kinematics()
+    assert isinstance(params, robot_kinematics)
+    assert len(params.joints) == len(tree) - 1
+
+    poe = poe_kinematics(params)
+    engine = fk_engine(tree)
+    assert poe.joint_names == list(engine.joint_names)
+
+    rng = np.random.default_rng(1)
+    q = rng.uniform(-1, 1, size=(6, engine.n_dof))
+    res_poe = poe.compute(q)
+    res_fk = engine.compute(q)
+    for i, link_name in enumerate(poe.link_names):
+        # the home poses/ screw axes are rounded to 1e-6 during the extraction
+        assert_allclose(res_poe[:, i], res_fk[:, engine.link_index(link_name)], atol=1e-5)
+    assert_allclose(poe.compute(q[0]), res_poe[0])
+
+def test_extract_kinematics_fixed_joint_screw():
+    tree = kinematic_tree(ET.parse(data_dir/"kuka_iiwa"/"joint4_fixed_at_0.urdf").getroot())
+    joint_params = {joint.joint_name: joint for joint in tree.extract_kinematics().joints}
+    assert joint_params["lbr_iiwa_joint_4"].screw_axis == [0.]*6
+    assert_allclose(joint_params["lbr_iiwa_joint_1"].screw_axis, [0, 0, 0, 0, 0, 1])
@@ -0,0 +1,59 @@
+from urdf_kit.graph.shared import publish_shared, publish_memmap, attach_shared
+from urdf_kit.graph.tree import kinematic_tree
+from urdf_kit.graph.kinematics import fk_engine
+
+import pickle
+import pytest
+import numpy as np
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from numpy.testing import assert_array_equal
+
+data_dir = (Path(__file__).resolve().parent/".."/".."/"data").resolve()
+FIELDS = ("parent", "depth", "joint_type", "dof_index", "axis", "X_ParentJoint", "mass", "X_LinkCom", "inertia", "lower", "upper", "velocity_limit", "effort_limit")
+
+def load_model():
+    return kinematic_tree(ET.parse(data_dir/"kuka_iiwa"/"model.urdf").getroot()).compile()
+
+def worker_fk(spec, q):
+    """ runs in another process """
+    model = attach_shared(spec)
+    return fk_engine(model).compute(q)
+
+def test_shared_memory_views():
+    model = load_model()
+    with publish_shared(model) as published:
+        spec = pickle.loads(pickle.dumps(published.spec))
+        attached = attach_shared(spec)
+        assert attached.link_names == model.link_names
+        assert attached.joint_names == model.joint_names
+        for field_name in FIELDS:
+            data = getattr(attached, field_name)
+            assert_array_equal(data, getattr(model, field_name))
+            assert not data.flags.writeable
+            assert not data.flags.owndata # a view, no copy
+        assert_array_equal(attached.screw_axis, model.screw_axis)
+        del attached, data
+
+def test_memmap_views(tmp_path):
+    model = load_model()
+    published = publish_memmap(model, tmp_path/"kuka.bin")
+    attached = attach_shared(published.spec)
+    for field_name in FIELDS:
+        assert_array_equal(getattr(attached, field_name), getattr(model, field_name))
+    with pytest.raises(ValueError):
+        attached.mass[0] = 1.
+    del attached
+    published.close()
+    assert not (tmp_path/"kuka.bin").exists()
+
+def test_process_pool():
+    model = load_model()
+    q = np.random.default_rng(0).uniform(-1, 1, (4, model.n_dof))
+    expected = fk_engine(model).compute(q)
+    with publish_shared(model) as published:
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            results = list(pool.map(worker_fk, [published.spec]*3, [q]*3))
+    for res in results:
+        assert_array_equal(res, expected)
@@ -1,9 +1,11 @@
-from urdf_kit.graph.tree import body_entry, kinematic_tree
+from urdf_kit.graph.tree import body_entry, kinematic_tree, calc_descendent_adjacency
 
 import pytest
 import xml.etree.ElementTree as ET
 from math import pi
 from numpy.testing import assert_allclose
+from urdf_kit.maths import get_origin, write_origins
+from urdf_kit.maths.inertial import body_inertial_urdf
 
 def prepare_data_biped() -> dict:
     from pathlib import Path
@@ -53,7 +55,8 @@ def test_print_graph(biped_fixture, link_sorting: str, show_SE3: bool):
         [], # fuse all fixed joint whenever found
     )
 )
-def test_merge_fixed_joints(biped_fixture, whitelist):
+@pytest.mark.parametrize("scheduled", (False, True))
+def test_merge_fixed_joints(biped_fixture, whitelist, scheduled):
     test_data = biped_fixture
     my_tree = kinematic_tree(test_data['urdf_root'])
     # more specific test preparation (roughly about freezing the left leg)
@@ -68,7 +71,7 @@ def test_merge_fixed_joints(biped_fixture, whitelist):
     #   the whitelist must be specific, i.e. it must be valid link name, which is also fixed wrt the parent.
 
     # TODO maybe dump it to somewhere else instead
-    my_tree.merge_fixed_joints(link_whitelist=whitelist) # shouldn't crash
+    my_tree.merge_fixed_joints(link_whitelist=whitelist, scheduled=scheduled) # shouldn't crash
     my_tree.print_graph(link_sorting='depth_first',show_SE3=False) # shouldn't crash
     assert len(my_tree.links.keys()) == expected_new_num_links
 
@@ -81,6 +84,117 @@ def test_merge_fixed_joints(biped_fixture, whitelist):
         new_total_mass += link_mass
     assert_allclose([new_total_mass], [test_data['expected_total_mass']] )
 
+def _merged_model_summary(my_tree: kinematic_tree) -> dict:
+    out = dict()
+    for link_name, entry in my_tree.links.items():
+        link_elem = my_tree.index.link(link_name)
+        data = dict()
+        if entry is not None:
+            data['parent'] = entry.parentLink_name
+            data['X_ParentJoint'] = entry.X_ParentJoint.A
+        if link_elem.find("inertial") is not None:
+            data['mass'] = float(link_elem.find("inertial/mass").get("value"))
+            data['X_LinkCom'] = get_origin(link_elem.find("inertial/origin")).A
+            data['inertia'] = body_inertial_urdf.inertia_urdf_to_np_array(link_elem.find("inertial/inertia"))
+        data['geoms'] = sorted(
+            (geom_elem.tag, tuple(get_origin(geom_elem.find("origin")).A.round(9).ravel()))
+            for geom_elem in link_elem if geom_elem.tag in ("visual", "collision")
+        )
+        out[link_name] = data
+    return out
+
+def test_merge_fixed_joints_scheduled_matches_sequential(biped_fixture):
+    fixed_angles = dict(torso=0.0, l_upperleg=0.3, l_lowerleg=-pi/2.05, l_foot=pi/4)
+    summaries = []
+    for scheduled in (False, True):
+        my_tree = kinematic_tree(prepare_data_biped()['urdf_root'])
+        for link_name, angle in fixed_angles.items():
+            my_tree.links[link_name].fix_revolute_joint(angle)
+        my_tree.merge_fixed_joints(scheduled=scheduled)
+        assert my_tree.get_adjacency() == calc_descendent_adjacency(my_tree.urdf_root)
+        summaries.append(_merged_model_summary(my_tree))
+    sequential, scheduled = summaries
+    assert sequential.keys() == scheduled.keys()
+    for link_name in sequential.keys():
+        assert sequential[link_name].keys() == scheduled[link_name].keys()
+        for key, val in sequential[link_name].items():
+            if key == 'parent':
+                assert val == scheduled[link_name][key]
+            elif key == 'geoms':
+                assert [tag for tag, _ in val] == [tag for tag, _ in scheduled[link_name][key]]
+                assert_allclose([X for _, X in val], [X for _, X in scheduled[link_name][key]], atol=1e-8)
+            else:
+                assert_allclose(val, scheduled[link_name][key], atol=1e-10)
+
+def test_merge_fixed_joints_sequential_writes_in_bulk(biped_fixture, monkeypatch):
+    """ one `write_origins` call, also for geometries without <origin> """
+    import urdf_kit.graph.tree as tree_module
+    fixed_angles = dict(torso=0.0, l_upperleg=0.3, l_lowerleg=-pi/2.05, l_foot=pi/4)
+    summaries = []
+    for scheduled in (False, True):
+        my_tree = kinematic_tree(prepare_data_biped()['urdf_root'])
+        for link_name, angle in fixed_angles.items():
+            my_tree.links[link_name].fix_revolute_joint(angle)
+        for geom_elem in my_tree.index.link("l_foot").findall("visual"):
+            geom_elem.remove(geom_elem.find("origin"))
+        if not scheduled:
+            calls = []
+            def forbidden(*args, **kwargs):
+                raise AssertionError("expect bulk writes only")
+            def counted(origin_elems, X_stack):
+                calls.append(len(origin_elems))
+                return write_origins(origin_elems, X_stack)
+            monkeypatch.setattr(tree_module, "write_origin", forbidden)
+            monkeypatch.setattr(tree_module, "write_origins", counted)
+        my_tree.merge_fixed_joints(scheduled=scheduled)
+        monkeypatch.undo()
+        summaries.append(_merged_model_summary(my_tree))
+    assert len(calls) == 1 and calls[0] > 0
+    sequential, scheduled = summaries
+    for link_name in sequential.keys():
+        assert [tag for tag, _ in sequential[link_name]['geoms']] == [tag for tag, _ in scheduled[link_name]['geoms']]
+        assert_allclose([X for _, X in sequential[link_name]['geoms']], [X for _, X in scheduled[link_name]['geoms']], atol=1e-8)
+
+@pytest.mark.parametrize("scheduled", (False, True))
+def test_merge_fixed_joints_sweeps_once(biped_fixture, scheduled, monkeypatch):
+    """ the XML data is swept once, not once per removed link """
+    my_tree = kinematic_tree(biped_fixture['urdf_root'])
+    for link_name in ("torso", "l_upperleg", "l_lowerleg", "l_foot"):
+        my_tree.links[link_name].fix_revolute_joint(0.1)
+    sweeps = []
+    remove_dead_elems = kinematic_tree._remove_dead_elems
+    def counted(self, dead_elems):
+        sweeps.append(len(dead_elems))
+        return remove_dead_elems(self, dead_elems)
+    monkeypatch.setattr(kinematic_tree, "_remove_dead_elems", counted)
+    my_tree.merge_fixed_joints(scheduled=scheduled)
+    assert sweeps == [8] # 4 links + 4 joints
+    assert [elem.get("name") for elem in my_tree.urdf_root.findall("link")] == list(my_tree.index.links.keys())
+    assert my_tree.get_adjacency() == calc_descendent_adjacency(my_tree.urdf_root)
+
+def test_adjacency_stays_consistent_while_merging(biped_fixture):
+    test_data = biped_fixture
+    my_tree = kinematic_tree(test_data['urdf_root'])
+    assert my_tree.get_adjacency() == calc_descendent_adjacency(my_tree.urdf_root)
+    assert my_tree.is_leaf_link('l_foot')
+    assert [str(entry) for entry in my_tree.get_children_entries('torso')] == ['r_upperleg', 'l_upperleg']
+
+    my_tree.links['torso'].fix_revolute_joint(0.0)
+    my_tree.links['l_lowerleg'].fix_revolute_joint(-pi/2.05)
+    my_tree.merge_fixed_joints()
+
+    expected = calc_descendent_adjacency(my_tree.urdf_root)
+    result = my_tree.get_adjacency()
+    assert result.keys() == expected.keys()
+    for link_name in expected.keys():
+        assert sorted(result[link_name]) == sorted(expected[link_name])
+    for link_name, entry in my_tree.links.items():
+        if link_name == my_tree.root_name:
+            continue
+        assert my_tree.get_parent_name(link_name) == entry.parentLink_name
+        assert entry.parent_link_elem.get("name") == entry.parentLink_name
+    assert sorted(my_tree.get_children_names('z_prismatic')) == ['l_upperleg', 'r_upperleg']
+
 
 if __name__ == "__main__":
     from urdf_kit.misc import format_then_write
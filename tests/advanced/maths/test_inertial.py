@@ -51,8 +51,9 @@ def test_inertia_fuse():
     assert np.allclose([link3_inertia.m] , [5.7], atol=1e-6)
 
     expected_new_inertia = np.zeros((3,3))
-    np.fill_diagonal(expected_new_inertia, [0.165439, 0.151137, 0.028302])
-    expected_new_inertia[1,2] = expected_new_inertia[2,1] = 0.019782
+    # Huygens-Steiner's theorem: each body is shifted with its own mass
+    np.fill_diagonal(expected_new_inertia, [0.148869, 0.137048, 0.025821])
+    expected_new_inertia[1,2] = expected_new_inertia[2,1] = 0.013869
     np.testing.assert_allclose(link3_inertia.I, expected_new_inertia, rtol=1e-4)
 
     # look at the modified xml (also to check the serialization)
@@ -104,6 +104,75 @@ def test_write_origin_catchInvalidInput(standalone_joint_fixture):
     with pytest.raises(ValueError) as e:
         write_origin(not_really_origin_elem, X)
 
+def test_get_origin_cache(standalone_joint_fixture):
+    from urdf_kit.maths import origin_cache_info, clear_origin_cache, set_origin_cache_size
+    from spatialmath import SE3
+    origin_elem = standalone_joint_fixture[0].find("origin")
+    clear_origin_cache()
+    X1 = get_origin(origin_elem)
+    X2 = get_origin(origin_elem)
+    info = origin_cache_info()
+    assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+    assert X1 == X2 and X1 is not X2
+    # returned objects are independent of the cache
+    X1.A[0, 3] = 100.
+    assert get_origin(origin_elem) == X2
+    # editing the element invalidates naturally
+    write_origin(origin_elem, SE3.Tz(0.5))
+    assert get_origin(origin_elem) == SE3.Tz(0.5)
+    assert origin_cache_info().misses == 2
+    # same result without the cache
+    set_origin_cache_size(0)
+    assert get_origin(origin_elem) == SE3.Tz(0.5)
+    assert origin_cache_info().currsize == 0
+    set_origin_cache_size(4096)
+
+@pytest.mark.parametrize("joint_type", ("revolute", "prismatic", "fixed"))
+def test_numpy_backend_matches_spatialmath(standalone_joint_fixture, joint_type):
+    joint_elem = standalone_joint_fixture[0]
+    joint_elem.set("type", joint_type)
+    np.testing.assert_allclose(get_X_ParentJoint(joint_elem, backend="numpy"), get_X_ParentJoint(joint_elem).A)
+    np.testing.assert_allclose(get_X_JointChild(joint_elem, 0.3, backend="numpy"), get_X_JointChild(joint_elem, 0.3).A, atol=1e-15)
+    assert isinstance(get_origin(None, backend="numpy"), np.ndarray)
+    with pytest.raises(AssertionError):
+        get_origin(joint_elem.find("origin"), backend="torch")
+
+def test_numpy_backend_CparentCchild(kuka_iiwa_joint4):
+    elems = grab_elems_dict_by_joint_name(kuka_iiwa_joint4['urdf_root'], kuka_iiwa_joint4['joint_name'])
+    np.testing.assert_allclose(get_X_CparentCchild(**elems, backend="numpy"), kuka_iiwa_joint4["X_CparentCchild"].A, atol=1e-10)
+
+@pytest.mark.parametrize("rpy", ("0 0.01 0.2", "0.3 1.5707963267948966 -0.2", "0.1 -1.5707963267948966 2.0", "3.0 -0.5 -3.1"))
+def test_write_origin_from_array(standalone_joint_fixture, rpy):
+    """ same strings as with SE3 """
+    origin_elem = standalone_joint_fixture[0].find("origin")
+    origin_elem.set("rpy", rpy)
+    X = get_origin(origin_elem)
+    write_origin(origin_elem, X)
+    expected = dict(origin_elem.attrib)
+    write_origin(origin_elem, get_origin(origin_elem, backend="numpy"))
+    for key in ("xyz", "rpy"):
+        np.testing.assert_allclose(floatList_from_vec3String(origin_elem.get(key)), floatList_from_vec3String(expected[key]), atol=1e-15)
+
+def test_write_origins_matches_write_origin():
+    from urdf_kit.maths import write_origins
+    from urdf_kit.maths.batch import transform_from_xyz_rpy
+    rng = np.random.default_rng(0)
+    n = 50
+    rpy = rng.uniform(-3, 3, size=(n, 3))
+    rpy[:5, 1] = np.pi/2 # singular
+    X_stack = transform_from_xyz_rpy(rng.uniform(-1, 1, size=(n, 3)), rpy)
+    bulk = [Element("origin") for _ in range(n)]
+    one_by_one = [Element("origin") for _ in range(n)]
+    write_origins(bulk, X_stack)
+    for elem, X in zip(one_by_one, X_stack):
+        write_origin(elem, X)
+    assert [elem.attrib for elem in bulk] == [elem.attrib for elem in one_by_one]
+    np.testing.assert_allclose(np.array([get_origin(elem, backend="numpy") for elem in bulk]), X_stack, atol=1e-12)
+    with pytest.raises(ValueError):
+        write_origins(bulk[:-1], X_stack)
+    with pytest.raises(ValueError):
+        write_origins([Element("axis")], X_stack[:1])
+
 
 if __name__ == "__main__":
     test_this = standalone_joint()[0]
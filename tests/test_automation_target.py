@@ -0,0 +1,31 @@
+import os
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from urdf_kit.automation.base import export_target_spec
+from urdf_kit.misc import format_then_write
+
+test_dir = Path(__file__).resolve().parent
+
+def test_make_target_skips_unchanged(tmp_path):
+    urdf_root = ET.parse(test_dir/"dummy.urdf").getroot()
+    before = ET.tostring(urdf_root)
+    for macro_name in (None, "dummy"):
+        target = export_target_spec(tmp_path/f"{macro_name}.urdf.xacro", macro_name)
+        assert target.make_target(urdf_root)
+        os.utime(target.path, ns=(0, 0))
+        assert not target.make_target(urdf_root)
+        assert target.path.stat().st_mtime_ns == 0 # untouched
+        assert target.make_target(urdf_root, force=True)
+        assert ET.tostring(urdf_root) == before # not modified
+
+        urdf_root.find("link").set("name", "renamed")
+        assert target.make_target(urdf_root)
+        urdf_root.find("link").set("name", ET.fromstring(before).find("link").get("name"))
+
+def test_make_target_matches_format_then_write(tmp_path):
+    """ the files written by the previous versions are recognized as unchanged """
+    urdf_root = ET.parse(test_dir/"dummy.urdf").getroot()
+    target = export_target_spec(tmp_path/"robot.urdf", None)
+    format_then_write(ET.fromstring(ET.tostring(urdf_root)), target.path)
+    assert not target.make_target(urdf_root)
@@ -0,0 +1,76 @@
+import pytest
+import copy
+import numpy as np
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from urdf_kit.cleanup import cleanup_small_values, DEFAULT_THRESHOLDS
+from urdf_kit.misc import clean_vec3_string, clean_inertia_tensor, vec3String_from_floatList
+
+data_dir = Path(__file__).resolve().parent/"data"
+
+def cleanup_element_by_element(urdf_root: ET.Element):
+    """ the reference implementation """
+    for path, xyz_threshold, rpy_threshold in (
+        ("joint/origin", 1e-9, 1e-8),
+        ("link/inertial/origin", 1e-9, 1e-8),
+        ("link/visual/origin", 1e-9, 1e-8),
+        ("link/collision/origin", 1e-9, 1e-8),
+    ):
+        for elem in urdf_root.findall(path):
+            elem.attrib['xyz'] = clean_vec3_string(elem.attrib['xyz'], threshold=xyz_threshold)
+            elem.attrib['rpy'] = clean_vec3_string(elem.attrib['rpy'], threshold=rpy_threshold)
+    for elem in urdf_root.findall("joint/axis"):
+        elem.attrib['xyz'] = clean_vec3_string(elem.attrib['xyz'], threshold=1e-6)
+    for elem in urdf_root.findall("link/inertial/inertia"):
+        clean_inertia_tensor(elem, threshold=1e-12)
+
+def noisy_kuka() -> ET.Element:
+    urdf_root = ET.parse(data_dir/"kuka_iiwa"/"model.urdf").getroot()
+    rng = np.random.default_rng(0)
+    for elem in urdf_root.iter("origin"):
+        for attrib_name in ("xyz", "rpy"):
+            values = np.array([float(x) for x in elem.get(attrib_name, "0 0 0").split()])
+            values += rng.choice([0., 1e-13, -3e-9, 1e-3], size=3)
+            elem.set(attrib_name, vec3String_from_floatList(values) + "  ") # some nasty whitespace
+    for elem in urdf_root.iter("inertia"):
+        elem.set("ixy", "-1.2e-15")
+    return urdf_root
+
+def test_cleanup_matches_element_by_element():
+    urdf_root = noisy_kuka()
+    expected = copy.deepcopy(urdf_root)
+    cleanup_element_by_element(expected)
+    summary = cleanup_small_values(urdf_root)
+    assert ET.tostring(urdf_root) == ET.tostring(expected)
+    assert summary.zeroed["link/inertial/inertia"] == len(urdf_root.findall("link/inertial/inertia"))
+    assert summary.num_zeroed > 0
+    assert summary.num_rewritten_attributes > 0
+    # nothing left to do
+    summary = cleanup_small_values(urdf_root)
+    assert summary.num_zeroed == 0 and summary.num_rewritten_attributes == 0
+
+def test_cleanup_thresholds_and_missing_attributes():
+    urdf_root = ET.fromstring(
+        '<robot name="r">'
+        '<joint name="j" type="revolute"><origin xyz="0 1e-7 1"/><axis xyz="1e-7 0 1"/></joint>'
+        '<link name="l"><visual><origin rpy="0 0 1e-9"/></visual></link>'
+        '</robot>'
+    )
+    summary = cleanup_small_values(urdf_root, thresholds={"joint/origin/@xyz": 1e-6})
+    assert urdf_root.find("joint/origin").get("xyz") == "0 0 1"
+    assert urdf_root.find("joint/origin").get("rpy") is None
+    assert urdf_root.find("joint/axis").get("xyz") == "0 0 1"
+    assert urdf_root.find("link/visual/origin").get("rpy") == "0 0 0"
+    assert summary.zeroed["joint/origin/@xyz"] == 1
+    assert summary.num_rewritten_attributes == 3
+    with pytest.raises(ValueError):
+        cleanup_small_values(urdf_root, thresholds={"joint/limit": 1e-6})
+
+def test_cleanup_invalid_input():
+    urdf_root = ET.fromstring('<robot name="r"><joint name="j"><origin xyz="1,0 0 1"/></joint></robot>')
+    with pytest.raises(ValueError):
+        cleanup_small_values(urdf_root)
+    urdf_root = ET.fromstring('<robot name="r"><link name="l"><inertial><inertia ixx="-1" iyy="1" izz="1" ixy="0" iyz="0" ixz="0"/></inertial></link></robot>')
+    with pytest.raises(AssertionError):
+        cleanup_small_values(urdf_root)
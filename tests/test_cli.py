@@ -0,0 +1,107 @@
+import json
+import shutil
+import numpy as np
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from urdf_kit.cli import main, collect_inputs
+from urdf_kit.graph.params import load_params
+
+data_dir = Path(__file__).resolve().parent/"data"
+
+def make_inputs(tmp_path: Path) -> Path:
+    input_dir = tmp_path/"robots"
+    input_dir.mkdir()
+    shutil.copy(data_dir/"kuka_iiwa"/"model.urdf", input_dir/"kuka.urdf")
+    shutil.copy(data_dir/"biped2d_pybullet.urdf", input_dir/"biped.urdf")
+    (input_dir/"broken.urdf").write_text("<robot name='broken'><link name='a'/>")
+    (input_dir/"notes.txt").write_text("not a URDF")
+    return input_dir
+
+def run(capsys, argv: list[str]) -> tuple[int, dict]:
+    exit_code = main(argv + ["-q"])
+    return exit_code, json.loads(capsys.readouterr().out)
+
+def test_collect_inputs(tmp_path):
+    input_dir = make_inputs(tmp_path)
+    paths = collect_inputs([str(input_dir), str(input_dir/"kuka.urdf")])
+    assert [path.name for path in paths] == ["biped.urdf", "broken.urdf", "kuka.urdf"]
+
+def test_validate_parallel(tmp_path, capsys):
+    input_dir = make_inputs(tmp_path)
+    exit_code, summary = run(capsys, ["validate", str(input_dir), "-j", "2"])
+    assert exit_code == 1
+    assert summary["num_files"] == 3 and summary["num_ok"] == 2
+    statuses = {Path(record["input"]).name: record["status"] for record in summary["files"]}
+    assert statuses == {"biped.urdf": "ok", "broken.urdf": "error", "kuka.urdf": "ok"}
+    assert all(record["elapsed"] >= 0 for record in summary["files"])
+
+def test_clean_and_merge(tmp_path, capsys):
+    input_dir = make_inputs(tmp_path)
+    out_dir = tmp_path/"out"
+    exit_code, summary = run(capsys, ["clean", str(input_dir/"kuka.urdf"), "-o", str(out_dir), "-j", "1"])
+    assert exit_code == 0
+    assert (out_dir/"kuka.urdf").exists()
+    assert summary["files"][0]["output"] == str(out_dir/"kuka.urdf")
+
+    shutil.copy(Path(__file__).resolve().parent/"dummy.urdf", out_dir/"dummy.urdf")
+    assert main(["merge-fixed", str(out_dir/"dummy.urdf"), "--in-place", "--summary", str(tmp_path/"summary.json"), "-q"]) == 0
+    summary = json.loads((tmp_path/"summary.json").read_text())
+    record = summary["files"][0]
+    assert record["links_after"] < record["links_before"]
+    assert len(ET.parse(out_dir/"dummy.urdf").getroot().findall("link")) == record["links_after"]
+
+def test_extract_dynamics(tmp_path, capsys):
+    input_dir = make_inputs(tmp_path)
+    out_dir = tmp_path/"params"
+    exit_code, summary = run(capsys, ["extract-dynamics", str(input_dir/"kuka.urdf"), "-o", str(out_dir), "--fixed-base", "--merge-fixed", "-f", "npz"])
+    assert exit_code == 0, summary
+    dynamics = load_params(out_dir/"kuka_dynamics.npz")
+    assert len(dynamics.joints) == summary["files"][0]["num_joints"]
+    assert not dynamics.base_is_mobile
+
+def test_output_options(tmp_path, capsys):
+    import argparse
+    import pytest
+    from urdf_kit.cli import run_batch
+    input_path = make_inputs(tmp_path)/"kuka.urdf"
+    with pytest.raises(SystemExit): # argparse
+        main(["clean", str(input_path), "--in-place", "-o", str(tmp_path/"out"), "-q"])
+    with pytest.raises(SystemExit):
+        main(["clean", str(input_path), "-q"])
+    capsys.readouterr()
+    # same checks when bypassing argparse
+    args = argparse.Namespace(in_place=True, output_dir=str(tmp_path/"out"), jobs=1, verbose=False, quiet=True)
+    with pytest.raises(ValueError):
+        run_batch("clean", [input_path], args)
+    args.in_place, args.output_dir = False, None
+    with pytest.raises(ValueError):
+        run_batch("clean", [input_path], args)
+    args.in_place = True
+    summary = run_batch("clean", [input_path], args)
+    assert summary["files"][0]["status"] == "ok" and summary["files"][0]["output"] == str(input_path)
+
+def test_same_file_names(tmp_path, capsys):
+    """ r/a/model.urdf and r/b/model.urdf shall not overwrite each other """
+    input_dir = tmp_path/"r"
+    for robot_name, fpath in (("a", data_dir/"kuka_iiwa"/"model.urdf"), ("b", data_dir/"biped2d_pybullet.urdf")):
+        (input_dir/robot_name).mkdir(parents=True)
+        shutil.copy(fpath, input_dir/robot_name/"model.urdf")
+    out_dir = tmp_path/"out"
+    for jobs in ("1", "2"):
+        exit_code, summary = run(capsys, ["clean", "-r", str(input_dir), "-o", str(out_dir), "-j", jobs])
+        assert exit_code == 0, summary
+        assert [record["output"] for record in summary["files"]] == [str(out_dir/"a"/"model.urdf"), str(out_dir/"b"/"model.urdf")]
+        for robot_name in ("a", "b"):
+            assert ET.parse(out_dir/robot_name/"model.urdf").getroot().get("name") == ET.parse(input_dir/robot_name/"model.urdf").getroot().get("name")
+
+    exit_code, summary = run(capsys, ["extract-dynamics", "-r", str(input_dir), "-o", str(tmp_path/"params"), "--fixed-base", "-f", "json"])
+    assert exit_code == 0, summary
+    assert (tmp_path/"params"/"a"/"model_dynamics.json").exists() and (tmp_path/"params"/"b"/"model_dynamics.json").exists()
+
+    # given explicitly, they would share their output: both fail, nothing is written
+    exit_code, summary = run(capsys, ["clean", str(input_dir/"a"/"model.urdf"), str(input_dir/"b"/"model.urdf"), "-o", str(tmp_path/"flat")])
+    assert exit_code == 1
+    assert [record["status"] for record in summary["files"]] == ["error", "error"]
+    assert "shared by 2 inputs" in summary["files"][0]["error"]
+    assert not (tmp_path/"flat"/"model.urdf").exists()
@@ -0,0 +1,65 @@
+import pytest
+from pathlib import Path
+from urdf_kit.index import urdf_index
+from urdf_kit.edit_links import rename_link, grab_link_elem_by_name, grab_elems_dict_by_joint_name
+from urdf_kit.edit_joints import grab_expected_joints_handle
+from urdf_kit.edit_transmission import make_simple_transmission_elem
+from xml.etree import ElementTree as ET
+
+@pytest.fixture(scope="function")
+def dummy_urdf_root():
+    this_dir = Path(__file__).resolve().parent
+    test_file = this_dir/"dummy.urdf"
+    tree = ET.parse(test_file)
+    root = tree.getroot()
+    return root
+
+def test_index_tables(dummy_urdf_root):
+    urdf_root = dummy_urdf_root
+    urdf_root.append(make_simple_transmission_elem("j13", "effort"))
+    index = urdf_index(urdf_root)
+    assert set(index.links.keys()) == {"l1", "l2", "l3"}
+    assert set(index.joints.keys()) == {"j12", "j13"}
+    assert list(index.transmissions.keys()) == ["j13_transmission"]
+    assert index.parent_joint == {"l2": "j12", "l3": "j13"}
+    assert index.child_link_names("l1") == ["l2", "l3"]
+    assert index.child_link_names("l3") == []
+    assert index.root_link_names() == ["l1"]
+
+def test_index_duplicated_names(dummy_urdf_root):
+    urdf_root = dummy_urdf_root
+    ET.SubElement(urdf_root, "link", name="l2")
+    with pytest.raises(ValueError):
+        urdf_index(urdf_root)
+
+def test_lookup_with_index(dummy_urdf_root):
+    urdf_root = dummy_urdf_root
+    index = urdf_index(urdf_root)
+    assert grab_link_elem_by_name(urdf_root, "l2", index=index) is grab_link_elem_by_name(urdf_root, "l2")
+    with pytest.raises(ValueError):
+        grab_link_elem_by_name(urdf_root, "funny", index=index)
+    assert grab_expected_joints_handle(urdf_root, ["j13", "j12"], index=index) == grab_expected_joints_handle(urdf_root, ["j13", "j12"])
+    with pytest.raises(ValueError):
+        grab_expected_joints_handle(urdf_root, ["j13", "j42"], index=index)
+    assert grab_elems_dict_by_joint_name(urdf_root, "j13", index=index) == grab_elems_dict_by_joint_name(urdf_root, "j13")
+
+def test_rename_with_index(dummy_urdf_root):
+    urdf_root = dummy_urdf_root
+    index = urdf_index(urdf_root)
+    rename_link(urdf_root, link_name_old="l1", link_name_new="l1b", index=index)
+    rename_link(urdf_root, link_name_old="l2", link_name_new="link_two", index=index)
+
+    # same XML data as the scan-based implementation ...
+    reference_root = ET.parse(Path(__file__).resolve().parent/"dummy.urdf").getroot()
+    rename_link(reference_root, link_name_old="l1", link_name_new="l1b")
+    rename_link(reference_root, link_name_old="l2", link_name_new="link_two")
+    assert ET.tostring(urdf_root) == ET.tostring(reference_root)
+
+    # ... and the index is still consistent with it
+    fresh_index = urdf_index(urdf_root)
+    assert index.links == fresh_index.links
+    assert index.parent_joint == fresh_index.parent_joint
+    assert index.child_joints == fresh_index.child_joints
+
+    with pytest.raises(ValueError):
+        rename_link(urdf_root, link_name_old="l3", link_name_new="l1b", index=index)
@@ -33,3 +33,71 @@ def test_floatList_from_vec3String(test_preinput):
     expected_res = np.array(test_preinput)
     res = np.array(floatList_from_vec3String(test_input))
     np.testing.assert_allclose(expected_res, res)
+
+from urdf_kit.misc import array_from_vec3Strings, collect_vec3_attributes
+def test_array_from_vec3Strings():
+    test_input = ["-0.1 0.2 0", "+0.1  0.01 0.0", "1e-3 2 3 ", "1 2 3"]
+    expected_res = np.array([floatList_from_vec3String(input_str) for input_str in test_input])
+    np.testing.assert_array_equal(array_from_vec3Strings(test_input), expected_res)
+    # fast path only
+    np.testing.assert_array_equal(array_from_vec3Strings(test_input[-1:]*5), np.tile([1., 2., 3.], (5, 1)))
+    assert array_from_vec3Strings([]).shape == (0, 3)
+
+@pytest.mark.parametrize("bad_input,bad_indices",(
+        (["1 2 3", "1 2"], [1]),
+        (["1,0 2 3", "1 2 3", "- 1 2"], [0, 2]),
+        (["1 2 3", None], [1]),
+        (["1\t2 3", "1 2 3 4"], [0, 1]), # only spaces separate the numbers
+    )
+)
+def test_array_from_vec3Strings_reports_offending_indices(bad_input, bad_indices):
+    for input_str in (bad_input[i] for i in bad_indices):
+        with pytest.raises((AssertionError, ValueError)):
+            floatList_from_vec3String(input_str) # same validation
+    with pytest.raises(ValueError) as e:
+        array_from_vec3Strings(bad_input)
+    assert f"{len(bad_indices)} offending" in str(e.value)
+    for i in bad_indices:
+        assert f"{i}: {bad_input[i]!r}" in str(e.value)
+
+def test_collect_vec3_attributes():
+    import xml.etree.ElementTree as ET
+    urdf_root = ET.fromstring(
+        '<robot name="r"><joint name="j1"><origin xyz="0 0 1" rpy="0 0 0"/><axis xyz="0 1 0"/></joint>'
+        '<joint name="j2"><origin rpy="0.1 0 0"/></joint></robot>'
+    )
+    elems, xyz = collect_vec3_attributes(urdf_root, "joint/origin", "xyz", default="0 0 0")
+    assert len(elems) == 2
+    np.testing.assert_array_equal(xyz, [[0, 0, 1], [0, 0, 0]])
+    with pytest.raises(ValueError):
+        collect_vec3_attributes(urdf_root, "joint/origin", "xyz")
+
+from urdf_kit.misc import collect_all_vec3_attributes
+def test_collect_all_vec3_attributes():
+    import xml.etree.ElementTree as ET
+    urdf_root = ET.parse("tests/dummy.urdf").getroot()
+    out = collect_all_vec3_attributes(urdf_root)
+    assert set(out.keys()) == {("origin", "xyz"), ("origin", "rpy"), ("axis", "xyz")}
+    # same as one `collect_vec3_attributes` per path
+    for (tag, attrib_name), default in (
+            (("origin", "xyz"), "0 0 0"), (("origin", "rpy"), "0 0 0"), (("axis", "xyz"), "1 0 0")):
+        elems, values = collect_vec3_attributes(urdf_root, f".//{tag}", attrib_name, default=default)
+        assert out[(tag, attrib_name)][0] == elems
+        np.testing.assert_array_equal(out[(tag, attrib_name)][1], values)
+    assert len(out[("origin", "xyz")][0]) > 0
+
+def test_collect_all_vec3_attributes_reports_the_bucket():
+    import xml.etree.ElementTree as ET
+    urdf_root = ET.fromstring(
+        '<robot name="r"><joint name="j1"><origin xyz="0 0 1"/><axis xyz="0 1"/></joint>'
+        '<link name="l"><inertial><origin rpy="0 0 0"/></inertial></link></robot>'
+    )
+    with pytest.raises(ValueError) as e:
+        collect_all_vec3_attributes(urdf_root)
+    assert "<axis xyz=...>" in str(e.value) and "0: '0 1'" in str(e.value)
+    out = collect_all_vec3_attributes(urdf_root, defaults={("origin", "xyz"): "0 0 0"})
+    assert list(out.keys()) == [("origin", "xyz")]
+    np.testing.assert_array_equal(out[("origin", "xyz")][1], [[0, 0, 1], [0, 0, 0]])
+    with pytest.raises(ValueError) as e:
+        collect_all_vec3_attributes(urdf_root, defaults={("origin", "rpy"): None}) # the joint origin has none
+    assert "1 offending" in str(e.value)
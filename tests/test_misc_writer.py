@@ -0,0 +1,61 @@
+import io
+import copy
+import pytest
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from urdf_kit.misc import format_then_write, stream_write_formatted
+
+test_dir = Path(__file__).resolve().parent
+URDF_FILES = [
+    test_dir/"dummy.urdf",
+    test_dir/"data"/"kuka_iiwa"/"model.urdf",
+    test_dir/"data"/"biped2d_pybullet.urdf",
+    test_dir/"test_output_expected"/"dummy.urdf.xacro", # namespaces
+]
+
+def reference_bytes(urdf_root: ET.Element, tmp_path: Path) -> bytes:
+    fpath = tmp_path/"reference.urdf"
+    format_then_write(copy.deepcopy(urdf_root), fpath)
+    return fpath.read_bytes()
+
+@pytest.mark.parametrize("fpath", URDF_FILES, ids=lambda fpath: fpath.name)
+def test_byte_identical(fpath, tmp_path):
+    urdf_root = ET.parse(fpath).getroot()
+    before = ET.tostring(urdf_root)
+    stream_write_formatted(urdf_root, tmp_path/"streamed.urdf")
+    assert (tmp_path/"streamed.urdf").read_bytes() == reference_bytes(urdf_root, tmp_path)
+    assert ET.tostring(urdf_root) == before # not modified
+
+def test_byte_identical_corner_cases(tmp_path):
+    urdf_root = ET.fromstring(
+        '<robot name="r&amp;d">  <!-- a comment --><link name="café"><visual>keep me<geometry/>tail</visual></link>'
+        '<?pi data?><joint name="j" type="fixed"><parent link="a"/><child link="b"/>\n\n</joint>'
+        '<empty></empty><text>  </text></robot>'
+    )
+    urdf_root.tail = "\n"
+    urdf_root.append(ET.Comment("last"))
+    buffer = io.BytesIO()
+    stream_write_formatted(urdf_root, buffer)
+    assert buffer.getvalue() == reference_bytes(urdf_root, tmp_path)
+
+    leaf = ET.Element("robot", name="leaf")
+    buffer = io.BytesIO()
+    stream_write_formatted(ET.ElementTree(leaf), buffer)
+    assert buffer.getvalue() == reference_bytes(leaf, tmp_path)
+
+def test_byte_identical_namespaces(tmp_path):
+    xacro = "http://www.ros.org/wiki/xacro"
+    ET.register_namespace("xacro", xacro)
+    urdf_root = ET.fromstring(
+        f'<robot xmlns:xacro="{xacro}" xmlns:a="urn:a" xmlns:b="urn:b" name="ns">'
+        '<xacro:property name="l" value="1 &lt; 2"/>'
+        '<xacro:macro name="m" params="x"><b:link a:note="&quot;x&quot;&#10;&#9;y" name="${x}"/></xacro:macro>'
+        '<link xml:lang="en" name="plain"/><a:link name="other">text &amp; more</a:link></robot>'
+    )
+    urdf_root.append(ET.Element(ET.QName("urn:c", "tag"), {ET.QName("urn:a", "attr"): ET.QName("urn:d", "value")}))
+    buffer = io.BytesIO()
+    stream_write_formatted(urdf_root, buffer)
+    expected = reference_bytes(urdf_root, tmp_path)
+    assert buffer.getvalue() == expected
+    assert b"<xacro:macro" in expected and b"<ns1:link" in expected # a registered prefix and generated ones
@@ -0,0 +1,66 @@
+import pytest
+import numpy as np
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from urdf_kit.streaming import iterparse_urdf
+from urdf_kit.graph.tree import calc_descendent_adjacency
+from urdf_kit.misc import floatList_from_vec3String
+
+data_dir = Path(__file__).resolve().parent/"data"
+
+@pytest.mark.parametrize("fname", ("kuka_iiwa/model.urdf", "biped2d_pybullet.urdf"))
+def test_iterparse_matches_parse(fname):
+    urdf_root = ET.parse(data_dir/fname).getroot()
+    res = iterparse_urdf(data_dir/fname)
+    assert ET.tostring(res.urdf_root) == ET.tostring(urdf_root)
+    assert res.adjacency == calc_descendent_adjacency(urdf_root)
+    assert list(res.index.links.keys()) == [elem.get("name") for elem in urdf_root.findall("link")]
+    assert res.joint_names == [elem.get("name") for elem in urdf_root.findall("joint")]
+    assert res.link_names == list(res.index.links.keys())
+    for i, joint_elem in enumerate(urdf_root.findall("joint")):
+        assert res.joint_types[i] == joint_elem.get("type")
+        np.testing.assert_array_equal(res.joint_origin_xyz[i], floatList_from_vec3String(joint_elem.find("origin").get("xyz")))
+    for i, link_elem in enumerate(urdf_root.findall("link")):
+        inertial_elem = link_elem.find("inertial")
+        if inertial_elem is None:
+            assert res.mass[i] == 0
+        else:
+            assert res.mass[i] == float(inertial_elem.find("mass").get("value"))
+            assert res.inertia[i, 0] == float(inertial_elem.find("inertia").get("ixx"))
+    assert res.peak_memory is None
+
+def test_iterparse_discard(tmp_path):
+    urdf_path = tmp_path/"robot.urdf"
+    urdf_path.write_text(
+        '<robot name="r">'
+        '<link name="a"><visual><geometry><mesh filename="a.stl"/></geometry></visual><collision/></link>'
+        '<link name="b"><inertial><mass value="2"/><inertia ixx="1" iyy="2" izz="3" ixy="0" iyz="0" ixz="0"/></inertial></link>'
+        '<joint name="j" type="revolute"><parent link="a"/><child link="b"/><axis xyz="0 0 1"/></joint>'
+        '<gazebo reference="a"><material>Gazebo/Red</material></gazebo>'
+        '</robot>'
+    )
+    res = iterparse_urdf(urdf_path, discard=("link/visual", "gazebo"), track_memory=True)
+    assert res.num_discarded == {"link/visual": 1, "gazebo": 1}
+    assert res.urdf_root.find("link/visual") is None
+    assert res.urdf_root.find("gazebo") is None
+    assert res.urdf_root.find("link/collision") is not None
+    assert res.adjacency == {"a": ["b"]}
+    assert res.index.parent_joint == {"b": "j"}
+    np.testing.assert_array_equal(res.joint_origin_xyz, [[0, 0, 0]])
+    np.testing.assert_array_equal(res.joint_axis, [[0, 0, 1]])
+    np.testing.assert_array_equal(res.mass, [0, 2])
+    np.testing.assert_array_equal(res.inertia[1], [1, 2, 3, 0, 0, 0])
+    assert res.peak_memory > 0
+
+def test_iterparse_invalid(tmp_path):
+    urdf_path = tmp_path/"not_a_robot.xml"
+    urdf_path.write_text('<world name="w"/>')
+    with pytest.raises(ValueError):
+        iterparse_urdf(urdf_path)
+    # the memory tracking never outlives a failed parsing
+    import tracemalloc
+    urdf_path.write_text('<robot name="r"><link name="a"/><link name="a"/></robot>')
+    with pytest.raises(Exception):
+        iterparse_urdf(urdf_path, track_memory=True)
+    assert not tracemalloc.is_tracing()
@@ -1,3 +1,5 @@
+__version__ = "0.4" # keep in sync with setup.py
+
 from .edit_joints import grab_all_joints
 from . import misc
 from .misc import color_code
@@ -5,6 +7,11 @@ from .misc import color_code
 from . import maths
 from . import graph
 
+from . import cleanup
+from . import streaming
+from . import index
+from .index import urdf_index
+
 from . import edit_joints 
 from . import edit_links
 from . import edit_transmission
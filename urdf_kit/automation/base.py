@@ -1,10 +1,13 @@
+import hashlib
 import xml.etree.ElementTree as ET
 from pathlib import Path
 
-from .. misc import format_then_write, clean_vec3_string, clean_inertia_tensor
+from .. misc import stream_write_formatted
+from .. cleanup import cleanup_small_values
 from .. edit_joints import grab_all_joints
 from .. edit_links import rename_link, purge_nonprimitive_collision_geom
 from .. composition import make_component_def_macro
+from .. index import urdf_index
 
 from typing import Union
 from sys import exit
@@ -52,11 +55,19 @@ class export_target_spec:
             exit()
 
 
-    def make_target(self, xml_root: ET.Element):
-        """wrap into reusable macro (if needed) --> format --> write file
+    def make_target(self, xml_root: ET.Element, force: bool = False) -> bool:
+        """wrap into reusable macro (if needed) --> format --> write file (only if changed)
+
+        The formatted output is hashed first (streamed, nothing is materialized)
+        and compared with the existing file, which is left untouched (mtime included)
+        if identical, so that downstream xacro/ colcon builds are not retriggered.
 
         Args:
             xml_root (ET.Element) --- won't be modified
+            force (bool) --- write even if unchanged
+
+        Returns:
+            whether the file has been (re)written
         """
         if self.make_reusable:
             # Be assured: this operation won't mutate `xml_root`
@@ -68,10 +79,40 @@ class export_target_spec:
             )
         else:
             product = xml_root
+        # TODO write a warning that the file is generated???
+        if not force and self.path.is_file():
+            new_hash = hashlib.sha256()
+            stream_write_formatted(product, _hashing_sink(new_hash))
+            old_hash = hashlib.sha256()
+            with open(self.path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    old_hash.update(chunk)
+            if new_hash.digest() == old_hash.digest():
+                print("   unchanged, skip writing:", self.path)
+                return False
         print("   beautifying --> writing the file into:")
-        # TODO write a warning that the file is generated???                    
-        format_then_write(product, self.path)
+        stream_write_formatted(product, self.path)
         print("   ", self.path)
+        return True
+
+class _hashing_sink:
+    """ a binary file object that only feeds a hash """
+    def __init__(self, hash_obj):
+        self._hash = hash_obj
+    def write(self, data: bytes) -> int:
+        self._hash.update(data)
+        return len(data)
+    def writable(self) -> bool:
+        return True
+    def readable(self) -> bool:
+        return False
+    def seekable(self) -> bool:
+        return False
+    @property
+    def closed(self) -> bool:
+        return False
+    def flush(self):
+        pass
 
 class generic_xacro_export:
     def __init__(
@@ -208,10 +249,17 @@ class generic_xacro_export:
         
         If you have multiple targets, you probably need to overload this method,
         specifically you may need to individualize the `xml_root` argument
+
+        The paths of the targets actually (re)written are kept in `self.updated_targets`.
         """
+        self.updated_targets = []
         for i, target in enumerate(self.xacro_output_list):
             print(f"outputting target {i+1}...")
-            target.make_target(xml_root = self.urdf_root)
+            if target.make_target(xml_root = self.urdf_root):
+                self.updated_targets.append(target.path)
+        print(f"{len(self.updated_targets)} of {len(self.xacro_output_list)} target(s) updated")
+        for path in self.updated_targets:
+            print("  ", path)
 
 
     # ---------------------
@@ -226,24 +274,8 @@ class generic_xacro_export:
         2. avoid the diff being cluttered by rounding differences
         """
         print("Attempting to enforce structural zeros")
-        for elem in self.urdf_root.findall("joint/origin"):
-            elem.attrib['xyz'] = clean_vec3_string(elem.attrib['xyz'], threshold=1e-9)
-            elem.attrib['rpy'] = clean_vec3_string(elem.attrib['rpy'], threshold=1e-8)
-        for elem in self.urdf_root.findall("joint/axis"):
-            elem.attrib['xyz'] = clean_vec3_string(elem.attrib['xyz'], threshold=1e-6)
-
-        for elem in self.urdf_root.findall("link/inertial/origin"):
-            elem.attrib['xyz'] = clean_vec3_string(elem.attrib['xyz'], threshold=1e-9)
-            elem.attrib['rpy'] = clean_vec3_string(elem.attrib['rpy'], threshold=1e-8)    
-        for elem in self.urdf_root.findall("link/visual/origin"):
-            elem.attrib['xyz'] = clean_vec3_string(elem.attrib['xyz'], threshold=1e-9)
-            elem.attrib['rpy'] = clean_vec3_string(elem.attrib['rpy'], threshold=1e-8)
-        for elem in self.urdf_root.findall("link/collision/origin"):
-            elem.attrib['xyz'] = clean_vec3_string(elem.attrib['xyz'], threshold=1e-9)
-            elem.attrib['rpy'] = clean_vec3_string(elem.attrib['rpy'], threshold=1e-8)
-        
-        for elem in self.urdf_root.findall("link/inertial/inertia"):
-            clean_inertia_tensor(elem, threshold=1e-12)
+        summary = cleanup_small_values(self.urdf_root) # thresholds: see `cleanup.DEFAULT_THRESHOLDS`
+        print(summary)
 
     def _reroute_to_base_link(self):
         """Flatten the default tf tree
@@ -307,13 +339,17 @@ class generic_xacro_export:
         for joint_T in list_joint_T:
             joint_T.joint_ptr.attrib["name"] = r"${ns}/"+joint_T.joint_ptr.attrib["name"]
         
+        # the index turns each renaming into a constant-time update
+        # (built after renaming the joints so that it sees the new joint names)
+        index = urdf_index(self.urdf_root)
         for elem_link in self.urdf_root.findall("link"):
             # ONLY modify the contents of the elem_link, 
             # not adding/ removing elem from urdf_root.
             rename_link(
                 self.urdf_root, 
                 link_name_old = elem_link.get("name"), 
-                link_name_new = r"${ns}/"+elem_link.get("name")
+                link_name_new = r"${ns}/"+elem_link.get("name"),
+                index = index
             )
 
  
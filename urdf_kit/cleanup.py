@@ -0,0 +1,138 @@
+from __future__ import annotations
+import dataclasses
+import numpy as np
+from xml.etree import ElementTree as ET
+
+from .misc import stringList_from_vec3String, vec3String_from_stringList
+
+"""
+Reinstate structural zeros in a whole URDF in one go.
+
+Same results as applying `misc.clean_vec3_string` and `misc.clean_inertia_tensor`
+element by element (see `automation.base.generic_xacro_export._cleanup_small_values`),
+but
+* the tree is walked once,
+* the values are thresholded in one NumPy operation, and
+* only the attributes whose string actually changes are rewritten.
+"""
+
+# category ---> threshold
+DEFAULT_THRESHOLDS = {
+    "joint/origin/@xyz": 1e-9,
+    "joint/origin/@rpy": 1e-8,
+    "joint/axis/@xyz": 1e-6,
+    "link/inertial/origin/@xyz": 1e-9,
+    "link/inertial/origin/@rpy": 1e-8,
+    "link/visual/origin/@xyz": 1e-9,
+    "link/visual/origin/@rpy": 1e-8,
+    "link/collision/origin/@xyz": 1e-9,
+    "link/collision/origin/@rpy": 1e-8,
+    "link/inertial/inertia": 1e-12,
+}
+_MOMENTS_OF_INERTIA = ("ixx", "iyy", "izz")
+_PRODUCTS_OF_INERTIA = ("ixy", "iyz", "ixz")
+
+@dataclasses.dataclass
+class cleanup_summary:
+    zeroed: dict[str, int] # category ---> number of values made structural zeros
+    num_rewritten_attributes: int
+    @property
+    def num_zeroed(self) -> int:
+        return sum(self.zeroed.values())
+    def __str__(self) -> str:
+        out = f"  {self.num_zeroed} value(s) made structural zeros, {self.num_rewritten_attributes} attribute(s) rewritten"
+        for category, num in self.zeroed.items():
+            if num > 0:
+                out += f"\n    {category}: {num}"
+        return out
+
+def _gather(urdf_root: ET.Element) -> tuple[list, list]:
+    """ one walk over the tree
+
+    Return
+    ---------
+    vec3_entries: (element, attribute name, category)
+    inertia_elems: <inertia> elements
+    """
+    vec3_entries = []
+    inertia_elems = []
+    def add_origin(origin_elem: ET.Element, prefix: str):
+        for attrib_name in ("xyz", "rpy"):
+            if attrib_name in origin_elem.attrib:
+                vec3_entries.append((origin_elem, attrib_name, f"{prefix}/origin/@{attrib_name}"))
+    for elem in urdf_root:
+        if elem.tag == "joint":
+            for subelem in elem:
+                if subelem.tag == "origin":
+                    add_origin(subelem, "joint")
+                elif subelem.tag == "axis" and "xyz" in subelem.attrib:
+                    vec3_entries.append((subelem, "xyz", "joint/axis/@xyz"))
+        elif elem.tag == "link":
+            for subelem in elem:
+                if subelem.tag not in ("inertial", "visual", "collision"):
+                    continue
+                for subsubelem in subelem:
+                    if subsubelem.tag == "origin":
+                        add_origin(subsubelem, f"link/{subelem.tag}")
+                    elif subsubelem.tag == "inertia" and subelem.tag == "inertial":
+                        inertia_elems.append(subsubelem)
+    return vec3_entries, inertia_elems
+
+def cleanup_small_values(urdf_root: ET.Element, thresholds: dict[str, float] = None) -> cleanup_summary:
+    """reinstate structural zeros of all origins, axes and inertia tensors in place
+
+    Arguments
+    ------------
+    urdf_root: the <robot> element
+    thresholds: overrides of `DEFAULT_THRESHOLDS` (category ---> threshold)
+
+    Remarks
+    ------------
+    * Attributes that are absent (e.g. optional `rpy`) are skipped.
+    * Like `clean_vec3_string`, the vec3 strings are also stripped of redundant whitespaces.
+    * Invalid strings raise as in `clean_vec3_string`/ `clean_inertia_tensor`.
+    """
+    thresholds = {**DEFAULT_THRESHOLDS, **(dict() if thresholds is None else thresholds)}
+    unknown = set(thresholds.keys()) - set(DEFAULT_THRESHOLDS.keys())
+    if unknown:
+        raise ValueError(f"Unknown categories {unknown}, expect some of {list(DEFAULT_THRESHOLDS.keys())}")
+    for category, threshold in thresholds.items():
+        if category == "link/inertial/inertia":
+            assert 1e-8 >= threshold >= 1e-30, "The threshold has to be slightly larger than zero but neither too large!"
+        else:
+            assert 1e-6 >= threshold >= 1e-19, f"The threshold has to be slightly larger than zero but neither too large! Got {threshold:.3f}"
+    vec3_entries, inertia_elems = _gather(urdf_root)
+    zeroed = {category: 0 for category in DEFAULT_THRESHOLDS.keys()}
+    num_rewritten = 0
+
+    # ------ vec3 attributes ------
+    if vec3_entries:
+        tokens = [stringList_from_vec3String(elem.attrib[attrib_name]) for elem, attrib_name, _ in vec3_entries]
+        values = np.array(tokens, dtype=float) # (N, 3), raises ValueError like `float`
+        threshold = np.array([thresholds[category] for _, _, category in vec3_entries])
+        is_zero = np.abs(values) <= threshold[:, None]
+        is_new_zero = is_zero & (np.array(tokens) != "0")
+        for (elem, attrib_name, category), val_list, row, new_row in zip(vec3_entries, tokens, is_zero.tolist(), is_new_zero.tolist()):
+            zeroed[category] += sum(new_row)
+            new_str = vec3String_from_stringList(["0" if z else val for val, z in zip(val_list, row)])
+            if new_str != elem.attrib[attrib_name]:
+                elem.attrib[attrib_name] = new_str
+                num_rewritten += 1
+
+    # ------ inertia tensors ------
+    if inertia_elems:
+        attrib_names = _MOMENTS_OF_INERTIA + _PRODUCTS_OF_INERTIA
+        strings = [[elem.attrib[attrib_name] for attrib_name in attrib_names] for elem in inertia_elems] # may throw KeyError
+        values = np.array(strings, dtype=float) # (N, 6)
+        moments = values[:, :3]
+        if np.any(moments < 0):
+            i, j = np.argwhere(moments < 0)[0]
+            raise AssertionError(f"moment of inertia shall never be -ve!, got {moments[i, j]:.4e} for {attrib_names[j]}")
+        is_zero = np.abs(values) <= thresholds["link/inertial/inertia"]
+        for elem, row_strings, row in zip(inertia_elems, strings, is_zero.tolist()):
+            for attrib_name, old_str, z in zip(attrib_names, row_strings, row):
+                if z and old_str != "0":
+                    elem.attrib[attrib_name] = "0" # make sure to write as string, not fp!!!
+                    zeroed["link/inertial/inertia"] += 1
+                    num_rewritten += 1
+    return cleanup_summary(zeroed=zeroed, num_rewritten_attributes=num_rewritten)
@@ -0,0 +1,291 @@
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import numpy as np
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from xml.etree import ElementTree as ET
+
+from . import __version__
+from .misc import stream_write_formatted
+from .cleanup import cleanup_small_values
+from .index import urdf_index
+from .graph.tree import kinematic_tree
+from .graph.params import save_params
+
+"""
+The `urdf-kit` command line interface: batch processing of many URDF files.
+
+    urdf-kit clean            -o out/ robots/            # reinstate structural zeros
+    urdf-kit merge-fixed      -o out/ --keep tool0 a.urdf b.urdf
+    urdf-kit extract-dynamics -o params/ --format npz robots/
+    urdf-kit validate robots/ --summary report.json
+
+Inputs are files and/or directories (scanned for *.urdf, see `--recursive`),
+the outputs mirror the layout of the scanned directories under `--output-dir`.
+The files are processed independently across a pool of `--jobs` worker processes;
+each file gets a record (status, error, elapsed time, command-specific details)
+in the JSON summary (stdout by default), and the exit code is 1 if any file failed.
+"""
+
+# ======================= the jobs =======================
+# each one processes a single file in a worker process and returns a JSON-serializable dict
+
+def _check_output(command: str, args: argparse.Namespace):
+    """ exactly one of `--output-dir` and `--in-place` (argparse enforces it, but `run_batch` may be called directly) """
+    in_place = getattr(args, "in_place", False)
+    if in_place and args.output_dir is not None:
+        raise ValueError("--in-place and --output-dir are mutually exclusive!")
+    if command != "validate" and not in_place and args.output_dir is None:
+        raise ValueError("Either --output-dir or --in-place is required!")
+
+def _output_path(input_path: Path, args: argparse.Namespace, suffix: str = None) -> Path:
+    """ the input file itself with `--in-place`, otherwise in `--output-dir`
+    at the same relative path as below its scanned directory (cf. `scan_inputs`, `args.relative_paths`)
+    """
+    if getattr(args, "in_place", False):
+        out = input_path
+    elif args.output_dir is not None:
+        relative_paths = getattr(args, "relative_paths", None) or dict()
+        out = Path(args.output_dir)/relative_paths.get(input_path, input_path.name)
+    else:
+        return None # validate
+    return out if suffix is None else out.with_name(input_path.stem + suffix)
+
+def _job_clean(input_path: Path, args: argparse.Namespace) -> dict:
+    urdf_root = ET.parse(input_path).getroot()
+    summary = cleanup_small_values(urdf_root)
+    output_path = args.output_path # planned by `run_batch`
+    stream_write_formatted(urdf_root, output_path)
+    return dict(output=str(output_path), zeroed=summary.num_zeroed, rewritten_attributes=summary.num_rewritten_attributes)
+
+def _job_merge_fixed(input_path: Path, args: argparse.Namespace) -> dict:
+    tree = kinematic_tree(ET.parse(input_path).getroot())
+    num_links = len(tree.links)
+    tree.merge_fixed_joints(link_whitelist=list(args.keep), scheduled=True)
+    output_path = args.output_path # planned by `run_batch`
+    stream_write_formatted(tree.urdf_root, output_path)
+    return dict(output=str(output_path), links_before=num_links, links_after=len(tree.links))
+
+def _job_extract_dynamics(input_path: Path, args: argparse.Namespace) -> dict:
+    tree = kinematic_tree(ET.parse(input_path).getroot())
+    if args.merge_fixed:
+        tree.merge_fixed_joints(link_whitelist=list(args.keep), scheduled=True)
+    dynamics = tree.extract_dynamics(base_is_mobile=not args.fixed_base)
+    output_path = args.output_path
+    save_params(dynamics, output_path, fmt=args.format)
+    return dict(output=str(output_path), num_joints=len(dynamics.joints))
+
+def _job_validate(input_path: Path, args: argparse.Namespace) -> dict:
+    """ the issues are collected instead of raising at the first one """
+    urdf_root = ET.parse(input_path).getroot()
+    issues = []
+    index = urdf_index(urdf_root) # duplicated names raise
+    for joint_name, joint_elem in index.joints.items():
+        for tag in ("parent", "child"):
+            link_name = joint_elem.find(tag).get("link")
+            if link_name not in index.links:
+                issues.append(f"joint [{joint_name}]: unknown {tag} link [{link_name}]")
+    for link_name, link_elem in index.links.items():
+        inertial_elem = link_elem.find("inertial")
+        if inertial_elem is None:
+            continue
+        mass = float(inertial_elem.find("mass").get("value"))
+        if mass < 0:
+            issues.append(f"link [{link_name}]: negative mass {mass}")
+        inertia_elem = inertial_elem.find("inertia")
+        ixx, iyy, izz, ixy, iyz, ixz = (float(inertia_elem.get(attrib_name, "0")) for attrib_name in ("ixx", "iyy", "izz", "ixy", "iyz", "ixz"))
+        eigvals = np.linalg.eigvalsh(np.array([[ixx, ixy, ixz], [ixy, iyy, iyz], [ixz, iyz, izz]]))
+        if eigvals[0] < -1e-12:
+            issues.append(f"link [{link_name}]: the inertia tensor is not positive semi-definite")
+        elif eigvals[2] > eigvals[0] + eigvals[1] + 1e-12:
+            issues.append(f"link [{link_name}]: the principal moments of inertia violate the triangle inequality")
+    if not issues:
+        try:
+            kinematic_tree(urdf_root).compile() # the topology (single root, no loop) and the joint types
+        except (AssertionError, ValueError, NotImplementedError) as e:
+            issues.append(f"{type(e).__name__}: {e}")
+    return dict(valid=not issues, issues=issues)
+
+COMMANDS = {
+    "clean": _job_clean,
+    "merge-fixed": _job_merge_fixed,
+    "extract-dynamics": _job_extract_dynamics,
+    "validate": _job_validate,
+}
+
+def _run_one(command: str, input_path: Path, args: argparse.Namespace) -> dict:
+    """ never raises: the failures are reported in the record """
+    record = dict(input=str(input_path))
+    t_start = time.perf_counter()
+    log = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(log if not args.verbose else sys.stdout):
+            record.update(COMMANDS[command](input_path, args))
+        record["status"] = "ok"
+        if command == "validate" and not record["valid"]:
+            record["status"] = "invalid"
+    except Exception as e: # one broken file shall not abort the batch
+        record["status"] = "error"
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["elapsed"] = time.perf_counter() - t_start
+    return record
+
+# ======================= the driver =======================
+def scan_inputs(paths: list[str], recursive: bool = False, pattern: str = "*.urdf") -> dict[Path, Path]:
+    """ expand the directories, keep the order, drop duplicates
+
+    Return
+    --------
+    resolved input path ---> its path relative to the scanned directory (the file name for a file given as is)
+    """
+    out = dict()
+    for path in map(Path, paths):
+        if path.is_dir():
+            for fpath in sorted(path.rglob(pattern) if recursive else path.glob(pattern)):
+                out.setdefault(fpath.resolve(), fpath.relative_to(path))
+        elif path.is_file():
+            out.setdefault(path.resolve(), Path(path.name))
+        else:
+            raise FileNotFoundError(f"{path} does not exist!")
+    return out
+
+def collect_inputs(paths: list[str], recursive: bool = False, pattern: str = "*.urdf") -> list[Path]:
+    """ the input paths of `scan_inputs` """
+    return list(scan_inputs(paths, recursive=recursive, pattern=pattern).keys())
+
+def _plan_outputs(command: str, input_paths: list[Path], args: argparse.Namespace) -> tuple[dict[Path, Path], dict[Path, str]]:
+    """ Return
+    --------
+    * input path ---> output path (None for `validate`), the output directories are created
+    * input path ---> error, for the inputs sharing their output path with another input
+      (e.g. two files of the same name given explicitly), which would silently overwrite each other
+    """
+    suffix = f"_dynamics.{args.format}" if command == "extract-dynamics" else None
+    output_paths = {input_path: _output_path(input_path, args, suffix) for input_path in input_paths}
+    inputs_of = dict() # output path ---> input paths
+    for input_path, output_path in output_paths.items():
+        if output_path is not None:
+            inputs_of.setdefault(output_path, []).append(input_path)
+    errors = dict()
+    for output_path, inputs in inputs_of.items():
+        if len(inputs) > 1:
+            for input_path in inputs:
+                errors[input_path] = f"ValueError: the output {output_path} is shared by {len(inputs)} inputs: " + ", ".join(map(str, inputs))
+        else:
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+    return output_paths, errors
+
+def run_batch(command: str, input_paths: list[Path], args: argparse.Namespace) -> dict:
+    """ process the files, in parallel if `args.jobs > 1`
+
+    With `--output-dir`, each output mirrors the path of its input relative to the scanned directory
+    (`args.relative_paths`, cf. `scan_inputs`, default: the file name), the inputs that would share
+    an output path anyway fail without being processed.
+
+    Return
+    --------
+    the summary, the records are in the input order
+    """
+    t_start = time.perf_counter()
+    _check_output(command, args)
+    output_paths, errors = _plan_outputs(command, input_paths, args) # the colliding ones fail up front, they never run
+    records = [dict(input=str(input_path), status="error", error=errors[input_path], elapsed=0.) if input_path in errors else None
+        for input_path in input_paths]
+    todo = [i for i, record in enumerate(records) if record is None]
+    # each job gets its own output path instead of the (possibly large) `args.relative_paths`
+    task_args = {k: v for k, v in vars(args).items() if k != "relative_paths"}
+    def task(i: int) -> tuple:
+        return command, input_paths[i], argparse.Namespace(**task_args, output_path=output_paths[input_paths[i]])
+    num_jobs = max(1, min(args.jobs, len(todo)))
+    if num_jobs == 1:
+        for i in todo:
+            records[i] = _run_one(*task(i))
+    else:
+        with ProcessPoolExecutor(max_workers=num_jobs) as pool:
+            futures = {pool.submit(_run_one, *task(i)): i for i in todo}
+            for num_done, future in enumerate(as_completed(futures), start=1):
+                records[futures[future]] = future.result()
+                if not args.quiet:
+                    record = records[futures[future]]
+                    print(f"[{num_done}/{len(todo)}] {record['status']:>7} {record['elapsed']:.3f}s {record['input']}", file=sys.stderr)
+    num_ok = sum(record["status"] == "ok" for record in records)
+    return dict(
+        command = command,
+        urdf_kit_version = __version__,
+        num_files = len(records),
+        num_ok = num_ok,
+        num_failed = len(records) - num_ok,
+        jobs = num_jobs,
+        elapsed = time.perf_counter() - t_start,
+        files = records,
+    )
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="urdf-kit", description="Batch processing of URDF files")
+    parser.add_argument("--version", action="version", version=f"%(prog)s {__version__}")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("inputs", nargs="+", help="URDF files and/or directories")
+    common.add_argument("-r", "--recursive", action="store_true", help="scan the directories recursively")
+    common.add_argument("--pattern", default="*.urdf", help="file pattern within the directories (default: %(default)s)")
+    common.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="number of worker processes (default: %(default)s)")
+    common.add_argument("--summary", default="-", help="path of the JSON summary, '-' for stdout (default)")
+    common.add_argument("-q", "--quiet", action="store_true", help="no progress report on stderr")
+    common.add_argument("-v", "--verbose", action="store_true", help="let the library print as usual (interleaved across workers)")
+
+    def add_output(subparser: argparse.ArgumentParser, in_place_allowed: bool):
+        group = subparser.add_mutually_exclusive_group(required=True)
+        group.add_argument("-o", "--output-dir", help="where to write the results (same file names)")
+        if in_place_allowed:
+            group.add_argument("--in-place", action="store_true", help="overwrite the input files")
+
+    subparser = subparsers.add_parser("clean", parents=[common], help="reinstate structural zeros (cf. urdf_kit.cleanup)")
+    add_output(subparser, True)
+    subparser = subparsers.add_parser("merge-fixed", parents=[common], help="merge the fixed joints")
+    add_output(subparser, True)
+    subparser.add_argument("-k", "--keep", action="append", default=[], metavar="LINK", help="link to keep (repeatable)")
+    subparser = subparsers.add_parser("extract-dynamics", parents=[common], help="export the dynamics parameters")
+    add_output(subparser, False)
+    subparser.add_argument("-f", "--format", choices=("yaml", "json", "npz"), default="yaml")
+    subparser.add_argument("--fixed-base", action="store_true", help="the root link is fixed")
+    subparser.add_argument("--merge-fixed", action="store_true", help="merge the fixed joints beforehand")
+    subparser.add_argument("-k", "--keep", action="append", default=[], metavar="LINK", help="link to keep when merging (repeatable)")
+    subparsers.add_parser("validate", parents=[common], help="check names, topology and inertia")
+    return parser
+
+def main(argv: list[str] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not hasattr(args, "output_dir"):
+        args.output_dir = None # validate
+    try:
+        _check_output(args.command, args)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        args.relative_paths = scan_inputs(args.inputs, recursive=args.recursive, pattern=args.pattern)
+    except FileNotFoundError as e:
+        parser.error(str(e))
+    input_paths = list(args.relative_paths.keys())
+    if not input_paths:
+        parser.error("No input file found!")
+
+    summary = run_batch(args.command, input_paths, args)
+    text = json.dumps(summary, indent=2)
+    if args.summary == "-":
+        print(text)
+    else:
+        Path(args.summary).write_text(text)
+    if not args.quiet:
+        print(f"{args.command}: {summary['num_ok']}/{summary['num_files']} ok in {summary['elapsed']:.2f}s with {summary['jobs']} job(s)", file=sys.stderr)
+    return 0 if summary["num_failed"] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,6 @@
 from __future__ import annotations
 from xml.etree import ElementTree as ET
+from .index import urdf_index
 
 __all__ = ("joint_entry_T", "grab_all_joints")
 
@@ -25,12 +26,14 @@ def grab_all_joints(urdf_root: ET.ElementTree) -> list[joint_entry_T]:
         ))
     return out
 
-def grab_expected_joints_handle(urdf_root: ET.ElementTree, joint_names: list[str]) -> list[ET.ElementTree]:
+def grab_expected_joints_handle(urdf_root: ET.ElementTree, joint_names: list[str], index: urdf_index = None) -> list[ET.ElementTree]:
     """ grab all the joint xml handle corresponding to the joint_names list (sorted in the same order)
     You might then want to iterate through the resultant list, for your own needs.
 
     I assume joint_names are all unique!!!
 
+    Pass an `urdf_index` of `urdf_root` to avoid scanning all the joints.
+
     raise 
     -----------
     ValueError if not all expected joints are found!
@@ -39,15 +42,18 @@ def grab_expected_joints_handle(urdf_root: ET.ElementTree, joint_names: list[str
     assert len(joint_names_set) == len(joint_names), "You have duplicated joints in joint_names, which should not happen (would result in incorrect behavior)!"
 
     out = [None]*len(joint_names)
-    # iterating through the "supply" is more efficient
-    # for this one-to-one matching.
-    # worst-case: iterate through all joints in the URDF
-    for joint_entry in urdf_root.findall("joint"):
+    if index is not None:
+        assert index.urdf_root is urdf_root, "The index belongs to another <robot>!"
         for ind, wanted_name in enumerate(joint_names):
-            if joint_entry.attrib["name"] == wanted_name:
+            out[ind] = index.joints.get(wanted_name)
+    else:
+        # build a lookup table once instead of a nested loop over joints x wanted names
+        wanted_indices = {wanted_name: ind for ind, wanted_name in enumerate(joint_names)}
+        for joint_entry in urdf_root.findall("joint"):
+            ind = wanted_indices.get(joint_entry.attrib["name"])
+            if ind is not None:
                 out[ind] = joint_entry
-                break # go search the next "supply"
-    
+
     # not_found_indices = [] # it doesn't matter in Python
     not_found_name_list = [] 
     for ind in range(len(joint_names)):
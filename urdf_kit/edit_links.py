@@ -1,17 +1,22 @@
 from . edit_joints import grab_all_joints, grab_expected_joints_handle
 from xml.etree import ElementTree as ET
+from .index import urdf_index
 
 ################################
 # reading stuff out
 ################################
-def grab_link_elem_by_name(urdf_root: ET.Element, link_name: str) -> ET.Element:
+def grab_link_elem_by_name(urdf_root: ET.Element, link_name: str, index: urdf_index = None) -> ET.Element:
+    """ Pass an `urdf_index` of `urdf_root` to avoid scanning all the links. """
     assert isinstance(link_name, str), f"got {type(link_name)}"
+    if index is not None:
+        assert index.urdf_root is urdf_root, "The index belongs to another <robot>!"
+        return index.link(link_name)
     for candidate in urdf_root.findall("link"):
         if candidate.get("name") == link_name:
             return candidate
     raise ValueError(f"The desired link [{link_name}] cannot be found!")   
 
-def grab_elems_dict_by_joint_name(urdf_root: ET.Element, joint_name: str) -> dict[ET.Element]:
+def grab_elems_dict_by_joint_name(urdf_root: ET.Element, joint_name: str, index: urdf_index = None) -> dict[ET.Element]:
     """a convenience function
     return
     ---------
@@ -22,26 +27,42 @@ def grab_elems_dict_by_joint_name(urdf_root: ET.Element, joint_name: str) -> dic
         Each "value" is actually a XML element handle.
     """
     assert isinstance(joint_name, str), f"got {type(joint_name)}"
-    joint_elem = grab_expected_joints_handle(urdf_root, [joint_name])[0]
+    joint_elem = grab_expected_joints_handle(urdf_root, [joint_name], index=index)[0]
     
     child_name = joint_elem.find("child").get("link")
     parent_name = joint_elem.find("parent").get("link")
 
-    parent_elem = grab_link_elem_by_name(urdf_root, link_name=parent_name)
-    child_elem = grab_link_elem_by_name(urdf_root, link_name=child_name)
+    parent_elem = grab_link_elem_by_name(urdf_root, link_name=parent_name, index=index)
+    child_elem = grab_link_elem_by_name(urdf_root, link_name=child_name, index=index)
     return dict(joint_elem=joint_elem, parent_elem=parent_elem, child_elem=child_elem)
 
 ################################
 # modifier
 ################################
-def rename_link(urdf_root_ptr: ET.ElementTree, link_name_old: str, link_name_new: str) -> None:
+def rename_link(urdf_root_ptr: ET.ElementTree, link_name_old: str, link_name_new: str, index: urdf_index = None) -> None:
     """update the entries in both <link> and <joint>(s) that reference that link
 
     The "old" name corresponds to exactly one link in the existing URDF!
 
     I am not going to consider transmission, gazebo stuff! 
     You should inject those information after you rename the links.
+
+    If you pass an `urdf_index`, only the affected elements are visited
+    and the index is updated accordingly.
     """
+    if index is not None:
+        assert index.urdf_root is urdf_root_ptr, "The index belongs to another <robot>!"
+        link_ptr = index.link(link_name_old)
+        if link_name_new in index.links.keys():
+            raise ValueError(f"link [{link_name_new}] already exists!")
+        link_ptr.attrib["name"] = link_name_new
+        if link_name_old in index.parent_joint.keys():
+            index.joint(index.parent_joint[link_name_old]).find("child").attrib["link"] = link_name_new
+        for joint_name in index.child_joints[link_name_old]:
+            index.joint(joint_name).find("parent").attrib["link"] = link_name_new
+        index.rename_link(link_name_old, link_name_new)
+        return
+
     link_ptr = None
     for entry in urdf_root_ptr.findall("link"):
         if entry.get("name") == link_name_old:
@@ -1,10 +1,17 @@
 from ..edit_joints import grab_all_joints
 from ..edit_links import grab_link_elem_by_name
 from ..maths import get_X_JointChild, get_X_ParentJoint, get_X_CparentCchild
-from ..maths import write_origin, get_origin
+from ..maths import write_origin, write_origins, get_origin
 from ..maths.transforms import _get_axis_xyz
 from ..maths.inertial import body_inertial_urdf
 from ..misc import remove_subelement_by_tag, floatList_from_vec3String
 from . import simplify
 from . import params
-from . import tree
\ No newline at end of file
+from . import tree
+from . import compiled
+from . import kinematics
+from . import poe
+from . import dynamics
+from . import codegen
+from . import cache
+from . import shared
@@ -0,0 +1,205 @@
+from __future__ import annotations
+import dataclasses
+import hashlib
+import json
+import os
+import numpy as np
+from pathlib import Path
+from xml.etree import ElementTree as ET
+
+from .. import __version__
+from .compiled import compiled_tree
+from .params import robot_dynamics, _as_arrays, _from_arrays
+
+"""
+A persistent, on-disk cache of the compiled models.
+
+Parsing a URDF, building a `kinematic_tree`, compiling it and extracting the
+dynamics parameters is repeated by every job although the input rarely changes.
+Each cache entry stores the numerical results of one URDF file as
+* `<key>.npz`: the arrays (no pickle), and
+* `<key>.json`: the metadata (names, source file, hashes, urdf_kit version).
+
+The key is derived from the SHA-256 of the file content, the urdf_kit version
+and the extraction options, so a modified file or an upgraded urdf_kit
+never hits a stale entry. Stale entries are evicted automatically:
+* when looked up with an outdated urdf_kit version,
+* when a new entry is stored for the same source file, and
+* via `model_cache.evict_stale` (e.g. sweeping a shared cache directory).
+
+Note: the XML data (hence the `kinematic_tree`) is NOT cached,
+only what the numerical algorithms consume.
+"""
+
+DEFAULT_CACHE_DIR = Path(os.environ.get("URDF_KIT_CACHE_DIR", Path.home()/".cache"/"urdf_kit"))
+
+@dataclasses.dataclass
+class cached_model:
+    compiled: compiled_tree
+    dynamics: robot_dynamics # None if not requested
+    sha256: str # of the URDF file content
+    hit: bool # whether it was loaded from the cache
+    def __repr__(self):
+        return f"cached_model({self.compiled}, dynamics={'yes' if self.dynamics is not None else 'no'}, hit={self.hit})"
+
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _entry_key(content_sha256: str, with_dynamics: bool, base_is_mobile: bool) -> str:
+    options = f"{__version__}|dynamics={with_dynamics}|mobile={base_is_mobile}"
+    return hashlib.sha256(f"{content_sha256}|{options}".encode()).hexdigest()[:32]
+
+# ------------ (de)serialization -----------
+_COMPILED_STRING_FIELDS = ("robot_name", "link_names", "link_joint_names")
+_COMPILED_ARRAY_FIELDS = tuple(f.name for f in dataclasses.fields(compiled_tree) if f.name not in _COMPILED_STRING_FIELDS)
+
+def _pack(model: compiled_tree, dynamics: robot_dynamics) -> tuple[dict, dict]:
+    """ Return: arrays, json-serializable names """
+    arrays = {f"compiled/{field_name}": getattr(model, field_name) for field_name in _COMPILED_ARRAY_FIELDS}
+    names = {"compiled": {field_name: getattr(model, field_name) for field_name in _COMPILED_STRING_FIELDS}}
+    if dynamics is not None:
+        names["dynamics"] = dict()
+        for key, value in _as_arrays(dynamics).items():
+            if isinstance(value, (np.ndarray, float)):
+                arrays[f"dynamics/{key}"] = value
+            else:
+                names["dynamics"][key] = value
+    return arrays, names
+
+def _unpack(arrays, names: dict) -> tuple[compiled_tree, robot_dynamics]:
+    model = compiled_tree(
+        robot_name = names["compiled"]["robot_name"],
+        link_names = tuple(names["compiled"]["link_names"]),
+        link_joint_names = tuple(names["compiled"]["link_joint_names"]),
+        **{field_name: arrays[f"compiled/{field_name}"] for field_name in _COMPILED_ARRAY_FIELDS},
+    )
+    if "dynamics" not in names:
+        return model, None
+    dynamics_arrays = {key[len("dynamics/"):]: arrays[key] for key in arrays.keys() if key.startswith("dynamics/")}
+    return model, _from_arrays({**names["dynamics"], **dynamics_arrays})
+
+def _build(urdf_path: Path, with_dynamics: bool, base_is_mobile: bool) -> tuple[compiled_tree, robot_dynamics]:
+    from .tree import kinematic_tree # avoid the circular import
+    tree = kinematic_tree(ET.parse(urdf_path).getroot())
+    dynamics = tree.extract_dynamics(base_is_mobile=base_is_mobile) if with_dynamics else None
+    return tree.compile(), dynamics
+
+class model_cache:
+    def __init__(self, cache_dir: str | Path = None):
+        """
+        Arguments
+        ------------
+        cache_dir: default to `DEFAULT_CACHE_DIR`
+            (`$URDF_KIT_CACHE_DIR` if set, otherwise ~/.cache/urdf_kit),
+            created if not existing
+        """
+        self.cache_dir = Path(DEFAULT_CACHE_DIR if cache_dir is None else cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+    def __repr__(self):
+        return f"model_cache({self.cache_dir}, {len(self.entries())} entries)"
+
+    def entries(self) -> dict[str, dict]:
+        """ key ---> metadata of all entries in the cache directory """
+        out = dict()
+        for meta_path in sorted(self.cache_dir.glob("*.json")):
+            try:
+                out[meta_path.stem] = json.loads(meta_path.read_text())
+            except (OSError, ValueError):
+                out[meta_path.stem] = None # corrupted, cf. `evict_stale`
+        return out
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        return self.cache_dir/f"{key}.npz", self.cache_dir/f"{key}.json"
+    def remove(self, key: str):
+        for path in self._paths(key):
+            path.unlink(missing_ok=True)
+    def clear(self):
+        for key in self.entries().keys():
+            self.remove(key)
+
+    def load(self, urdf_path: str | Path, with_dynamics: bool = True, base_is_mobile: bool = True) -> cached_model:
+        """ load the compiled tree (and the dynamics parameters) of a URDF file,
+        from the cache if possible, otherwise build and store them
+
+        Arguments
+        ------------
+        urdf_path: the URDF file
+        with_dynamics: also extract the dynamics parameters (cf. `kinematic_tree.extract_dynamics`),
+            this requires every link to have a non-negligible mass
+        base_is_mobile: see `kinematic_tree.extract_dynamics`
+        """
+        urdf_path = Path(urdf_path).resolve()
+        sha256 = _file_sha256(urdf_path)
+        key = _entry_key(sha256, with_dynamics, base_is_mobile)
+        npz_path, meta_path = self._paths(key)
+        if npz_path.exists() and meta_path.exists():
+            try:
+                meta = json.loads(meta_path.read_text())
+                if meta["urdf_kit_version"] == __version__ and meta["sha256"] == sha256:
+                    with np.load(npz_path, allow_pickle=False) as arrays:
+                        model, dynamics = _unpack(arrays, meta["names"])
+                    return cached_model(compiled=model, dynamics=dynamics, sha256=sha256, hit=True)
+            except (OSError, ValueError, KeyError, AssertionError) as e:
+                print(f"Discard the corrupted cache entry [{key}]: {e}")
+            self.remove(key)
+
+        model, dynamics = _build(urdf_path, with_dynamics, base_is_mobile)
+        self._store(key, urdf_path, sha256, model, dynamics)
+        return cached_model(compiled=model, dynamics=dynamics, sha256=sha256, hit=False)
+
+    def _store(self, key: str, urdf_path: Path, sha256: str, model: compiled_tree, dynamics: robot_dynamics):
+        # the previous entries of the same file are outdated by now
+        for other_key, meta in self.entries().items():
+            if other_key != key and meta is not None and meta.get("source") == str(urdf_path) \
+                and meta.get("with_dynamics") == (dynamics is not None) and meta.get("base_is_mobile") == (dynamics is not None and dynamics.base_is_mobile):
+                self.remove(other_key)
+        arrays, names = _pack(model, dynamics)
+        meta = dict(
+            source = str(urdf_path),
+            sha256 = sha256,
+            urdf_kit_version = __version__,
+            with_dynamics = dynamics is not None,
+            base_is_mobile = dynamics is not None and dynamics.base_is_mobile,
+            names = names,
+        )
+        npz_path, meta_path = self._paths(key)
+        # write then rename, so that concurrent jobs never see a partial entry
+        # (the metadata comes last as it marks the entry as complete)
+        # (one temporary file per final file, e.g. <key>.npz.<pid>.tmp, see also `evict_stale`)
+        npz_tmp_path, meta_tmp_path = (path.with_name(f"{path.name}.{os.getpid()}.tmp") for path in (npz_path, meta_path))
+        with open(npz_tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(npz_tmp_path, npz_path)
+        meta_tmp_path.write_text(json.dumps(meta))
+        os.replace(meta_tmp_path, meta_path)
+
+    def evict_stale(self) -> list[str]:
+        """ remove the entries that can no longer be hit, i.e.
+        * built by another urdf_kit version,
+        * whose source file is gone or has changed since, or
+        * corrupted
+
+        Return
+        ---------
+        the keys of the removed entries
+        """
+        removed = []
+        for key, meta in self.entries().items():
+            try:
+                is_stale = meta["urdf_kit_version"] != __version__ or _file_sha256(Path(meta["source"])) != meta["sha256"]
+            except (OSError, TypeError, KeyError):
+                is_stale = True
+            if is_stale:
+                self.remove(key)
+                removed.append(key)
+        # leftovers of interrupted writes
+        for path in self.cache_dir.glob("*.tmp"):
+            path.unlink(missing_ok=True)
+        return removed
+
+def load_cached(urdf_path: str | Path, cache_dir: str | Path = None, with_dynamics: bool = True, base_is_mobile: bool = True) -> cached_model:
+    """ shorthand of `model_cache(cache_dir).load(...)` """
+    return model_cache(cache_dir).load(urdf_path, with_dynamics=with_dynamics, base_is_mobile=base_is_mobile)
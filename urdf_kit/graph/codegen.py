@@ -0,0 +1,437 @@
+from __future__ import annotations
+import types
+import keyword
+import numpy as np
+from pathlib import Path
+
+from .compiled import compiled_tree, REVOLUTE, PRISMATIC
+from .params import robot_dynamics
+
+"""
+Generate standalone, robot-specific Python/NumPy modules.
+
+The expressions of the forward kinematics, the space Jacobians and the
+recursive Newton-Euler algorithm are unrolled at generation time,
+with all the numerical constants folded in. Structural zeros
+(see `misc.clean_vec3_string` and `generic_xacro_export._cleanup_small_values`),
+unit entries and identity rotations thus disappear from the generated code.
+
+The generated functions are vectorized over the leading dimensions of the joint arrays
+and only depend on NumPy.
+
+Typical use
+-----------------
+source = generate_module(tree.compile(), dynamics=tree.extract_dynamics(base_is_mobile=False))
+write_module("my_robot_kin.py", source)
+# or, without touching the disk
+my_robot = load_module(source, "my_robot_kin")
+X_RootLink = my_robot.fk(q)
+"""
+
+class _expr_writer:
+    """ emit straight-line code with constant folding
+
+    A scalar term is either a Python float (a constant known at generation time)
+    or a string (a NumPy expression evaluated at run time).
+    Non-trivial intermediate results are bound to temporaries.
+    """
+    def __init__(self, zero_threshold: float = 1e-9):
+        assert zero_threshold >= 0
+        self.zero_threshold = zero_threshold
+        self.lines = []
+        self._num_temps = 0
+        self._negations = dict() # temporary ---> the identifier it negates
+    def const(self, value: float) -> float:
+        value = float(value)
+        for structural in (0., 1., -1.):
+            if abs(value - structural) <= self.zero_threshold:
+                return structural
+        return value
+    @staticmethod
+    def is_const(term) -> bool:
+        return isinstance(term, float)
+    def emit(self, line: str):
+        self.lines.append(line)
+    def let(self, term, prefix: str = "t"):
+        if self.is_const(term) or term.isidentifier():
+            return term
+        name = f"{prefix}{self._num_temps}"
+        self._num_temps += 1
+        self.emit(f"{name} = {term}")
+        if term.startswith("(-") and term[2:-1].isidentifier():
+            self._negations[name] = term[2:-1]
+        return name
+    # ------ scalars -------
+    def neg(self, a):
+        if self.is_const(a):
+            return self.const(-a)
+        if a in self._negations:
+            return self._negations[a]
+        return f"(-{a})"
+    def mul(self, a, b):
+        if self.is_const(a) and self.is_const(b):
+            return self.const(a*b)
+        if self.is_const(a):
+            a, b = b, a
+        if self.is_const(b):
+            if b == 0.:
+                return 0.
+            if b == 1.:
+                return a
+            if b == -1.:
+                return self.neg(a)
+            return f"{a}*{b!r}"
+        return f"{a}*{b}"
+    def add(self, *terms):
+        constant = 0.
+        parts = []
+        for term in terms:
+            if self.is_const(term):
+                constant += term
+            else:
+                parts.append(term)
+        constant = self.const(constant)
+        if not parts:
+            return constant
+        if constant != 0.:
+            parts.append(repr(constant))
+        if len(parts) == 1:
+            return parts[0]
+        return "(" + " + ".join(parts) + ")"
+    def sub(self, a, b):
+        return self.add(a, self.neg(b))
+    # ------ vectors, matrices -------
+    def dot(self, u, v):
+        return self.let(self.add(*(self.mul(a, b) for a, b in zip(u, v))))
+    def cross(self, u, v) -> list:
+        return [
+            self.let(self.sub(self.mul(u[1], v[2]), self.mul(u[2], v[1]))),
+            self.let(self.sub(self.mul(u[2], v[0]), self.mul(u[0], v[2]))),
+            self.let(self.sub(self.mul(u[0], v[1]), self.mul(u[1], v[0]))),
+        ]
+    def vadd(self, *vectors) -> list:
+        return [self.let(self.add(*entries)) for entries in zip(*vectors)]
+    def vscale(self, u, scalar) -> list:
+        return [self.let(self.mul(a, scalar)) for a in u]
+    def matvec(self, R, v) -> list:
+        return [self.dot(row, v) for row in R]
+    def matmul(self, A, B) -> list:
+        B_T = list(zip(*B))
+        return [[self.dot(row, col) for col in B_T] for row in A]
+    @staticmethod
+    def transpose(R) -> list:
+        return [list(col) for col in zip(*R)]
+    # ------ rigid-body transforms (R, p) -------
+    def const_pose(self, X: np.ndarray) -> tuple:
+        return [[self.const(x) for x in row] for row in X[:3, :3]], [self.const(x) for x in X[:3, 3]]
+    def compose(self, X_AB: tuple, X_BC: tuple) -> tuple:
+        (R_AB, p_AB), (R_BC, p_BC) = X_AB, X_BC
+        return self.matmul(R_AB, R_BC), self.vadd(self.matvec(R_AB, p_BC), p_AB)
+    def inverse(self, X: tuple) -> tuple:
+        R_T = self.transpose(X[0])
+        return R_T, [self.let(self.neg(x)) for x in self.matvec(R_T, X[1])]
+    def rot_axis_angle(self, axis, c, s, v) -> list:
+        """ Rodrigues' formula with a constant unit axis, c = cos, s = sin, v = 1 - cos """
+        x, y, z = (self.const(a) for a in axis)
+        m = self.mul
+        def diagonal(a):
+            return 1. if self.const(a*a) == 1. else self.let(self.add(c, m(self.const(a*a), v))) # c + v == 1
+        return [
+            [diagonal(x), self.let(self.sub(m(self.const(x*y), v), m(z, s))), self.let(self.add(m(self.const(x*z), v), m(y, s)))],
+            [self.let(self.add(m(self.const(y*x), v), m(z, s))), diagonal(y), self.let(self.sub(m(self.const(y*z), v), m(x, s)))],
+            [self.let(self.sub(m(self.const(z*x), v), m(y, s))), self.let(self.add(m(self.const(z*y), v), m(x, s))), diagonal(z)],
+        ]
+    # ------ twists and wrenches (linear part first) -------
+    def transform_screw(self, X: tuple, screw) -> list:
+        R, p = X
+        w = self.matvec(R, screw[3:])
+        return self.vadd(self.matvec(R, screw[:3]), self.cross(p, w)) + w
+    def transform_wrench(self, X: tuple, wrench) -> list:
+        """ X: the pose of the NEW frame w.r.t. the old one, cf. `maths.batch.transform_wrench` """
+        R, p = X
+        R_T = self.transpose(R)
+        f, n = wrench[:3], wrench[3:]
+        return self.matvec(R_T, f) + self.matvec(R_T, self.vadd(n, [self.neg(x) for x in self.cross(p, f)]))
+    def lie_bracket(self, V, W) -> list:
+        v, w = V[:3], V[3:]
+        return self.vadd(self.cross(w, W[:3]), self.cross(v, W[3:])) + self.cross(w, W[3:])
+    def lie_bracket_transpose(self, V, F) -> list:
+        v, w = V[:3], V[3:]
+        f, n = F[:3], F[3:]
+        return [self.let(self.neg(x)) for x in self.cross(w, f)] + [self.let(self.neg(x)) for x in self.vadd(self.cross(v, f), self.cross(w, n))]
+    def spatial_inertia_times(self, mass: float, inertia: np.ndarray, V) -> list:
+        I = [[self.const(x) for x in row] for row in inertia]
+        return self.vscale(V[:3], self.const(mass)) + self.matvec(I, V[3:])
+
+class _joint_variables:
+    """ lazily emitted per-joint trigonometric terms """
+    def __init__(self, writer: _expr_writer, array_name: str = "q"):
+        self.writer = writer
+        self.array_name = array_name
+        self._emitted = set()
+    def _get(self, kind: str, dof: int, expression: str) -> str:
+        name = f"{kind}{dof}"
+        if name not in self._emitted:
+            self._emitted.add(name)
+            self.writer.emit(f"{name} = {expression}")
+        return name
+    def q(self, dof: int) -> str:
+        return self._get(self.array_name, dof, f"{self.array_name}[..., {dof}]")
+    def cos(self, dof: int) -> str:
+        return self._get("c", dof, f"np.cos({self.q(dof)})")
+    def sin(self, dof: int) -> str:
+        return self._get("s", dof, f"np.sin({self.q(dof)})")
+    def versin(self, dof: int) -> str:
+        return self._get("v", dof, f"1. - {self.cos(dof)}")
+    def q_minus_sin(self, dof: int) -> str:
+        return self._get("d", dof, f"{self.q(dof)} - {self.sin(dof)}")
+
+def _indent(lines: list[str], level: int = 1) -> list[str]:
+    return ["    "*level + line for line in lines]
+
+def _store(writer: _expr_writer, target: str, term, skip_zeros: bool = True) -> list[str]:
+    if skip_zeros and writer.is_const(term) and term == 0.:
+        return []
+    return [f"{target} = {term!r}" if writer.is_const(term) else f"{target} = {term}"]
+
+def _joint_motion(writer: _expr_writer, variables: _joint_variables, joint_type: int, axis: np.ndarray, dof: int) -> tuple:
+    """ X_JointChild(q) """
+    if joint_type == REVOLUTE:
+        R = writer.rot_axis_angle(axis, variables.cos(dof), variables.sin(dof), variables.versin(dof))
+        return R, [0., 0., 0.]
+    identity = [[1., 0., 0.], [0., 1., 0.], [0., 0., 1.]]
+    if joint_type == PRISMATIC:
+        return identity, writer.vscale([writer.const(a) for a in axis], variables.q(dof))
+    return identity, [0., 0., 0.]
+
+def _gen_fk_body(model: compiled_tree, writer: _expr_writer, link_indices: list[int]) -> list:
+    """ unrolled X_RootLink of the given links (and their ancestors), returns the symbolic poses by link index """
+    variables = _joint_variables(writer)
+    poses = {0: writer.const_pose(np.eye(4))}
+    needed = set()
+    for k in link_indices:
+        while k >= 0 and k not in needed:
+            needed.add(k)
+            k = model.parent[k]
+    for k in sorted(needed):
+        if k == 0:
+            continue
+        X_ParentJoint = writer.const_pose(model.X_ParentJoint[k])
+        X_JointChild = _joint_motion(writer, variables, model.joint_type[k], model.axis[k], model.dof_index[k])
+        # constants first
+        X_ParentChild = writer.compose(X_ParentJoint, X_JointChild)
+        poses[k] = writer.compose(poses[model.parent[k]], X_ParentChild)
+    return poses
+
+def _gen_fk(model: compiled_tree, zero_threshold: float) -> list[str]:
+    writer = _expr_writer(zero_threshold)
+    poses = _gen_fk_body(model, writer, list(range(model.n_links)))
+    for k in range(model.n_links):
+        R, p = poses[k]
+        for r in range(3):
+            for c in range(3):
+                writer.lines += _store(writer, f"out[..., {k}, {r}, {c}]", R[r][c])
+            writer.lines += _store(writer, f"out[..., {k}, {r}, 3]", p[r])
+    header = [
+        "def fk(q):",
+        '    """ (..., N_DOF) joint positions ---> (..., N_LINKS, 4, 4) link poses w.r.t. the root link, ordered as LINK_NAMES """',
+        "    q = np.asarray(q, dtype=float)",
+        "    out = np.zeros(q.shape[:-1]+(N_LINKS, 4, 4))",
+        "    out[..., 3, 3] = 1.",
+    ]
+    return header + _indent(writer.lines) + ["    return out", ""]
+
+def _gen_jacobian(model: compiled_tree, tip_index: int, function_name: str, zero_threshold: float) -> list[str]:
+    """ space Jacobian, cf. `fk_engine.jacobian(frame='space')` """
+    writer = _expr_writer(zero_threshold)
+    supporting = []
+    k = tip_index
+    while k > 0:
+        if model.dof_index[k] >= 0:
+            supporting.append(k)
+        k = model.parent[k]
+    poses = _gen_fk_body(model, writer, [model.parent[k] for k in supporting])
+    for k in supporting:
+        R_RootJoint, p_RootJoint = writer.compose(poses[model.parent[k]], writer.const_pose(model.X_ParentJoint[k]))
+        axis = writer.matvec(R_RootJoint, [writer.const(a) for a in model.axis[k]])
+        if model.joint_type[k] == REVOLUTE:
+            column = writer.cross(p_RootJoint, axis) + axis
+        else:
+            column = axis + [0., 0., 0.]
+        for r in range(6):
+            writer.lines += _store(writer, f"out[..., {r}, {model.dof_index[k]}]", column[r])
+    header = [
+        f"def {function_name}(q):",
+        f'    """ (..., N_DOF) joint positions ---> (..., 6, N_DOF) space Jacobian of [{model.link_names[tip_index]}] """',
+        "    q = np.asarray(q, dtype=float)",
+        "    out = np.zeros(q.shape[:-1]+(6, N_DOF))",
+    ]
+    return header + _indent(writer.lines) + ["    return out", ""]
+
+def _gen_rnea(params: robot_dynamics, zero_threshold: float) -> list[str]:
+    """ unrolled counterpart of `multibody_dynamics.inverse_dynamics` """
+    from .dynamics import multibody_dynamics # numerical preprocessing only
+    dyn = multibody_dynamics(params)
+    writer = _expr_writer(zero_threshold)
+    variables = _joint_variables(writer)
+    dof_of = {i: k for k, i in enumerate(dyn._movable)}
+    qd = [f"qd[..., {k}]" for k in range(dyn.n_dof)]
+    qdd = [f"qdd[..., {k}]" for k in range(dyn.n_dof)]
+    # the base
+    writer.emit("g = np.asarray(gravity, dtype=float)")
+    minus_g = [writer.let(writer.neg(f"g[..., {r}]")) for r in range(3)]
+    if dyn.base_is_mobile:
+        writer.emit("base_twist = np.zeros(6) if base_twist is None else np.asarray(base_twist, dtype=float)")
+        writer.emit("base_accel = np.zeros(6) if base_accel is None else np.asarray(base_accel, dtype=float)")
+        V0 = [writer.let(f"base_twist[..., {r}]") for r in range(6)]
+        Vd0 = [writer.let(writer.add(f"base_accel[..., {r}]", minus_g[r] if r < 3 else 0.)) for r in range(6)]
+    else:
+        V0 = [0.]*6
+        Vd0 = minus_g + [0.]*3
+    # forward pass
+    V, Vd, X_ChildParent = [], [], []
+    for i in range(dyn.n_bodies):
+        p = dyn.parent[i]
+        V_parent, Vd_parent = (V0, Vd0) if p < 0 else (V[p], Vd[p])
+        A = [writer.const(a) for a in dyn.body_screw_axis[i]]
+        if i in dof_of:
+            dof = dof_of[i]
+            S = dyn.screw_axis[i]
+            w, v = S[3:], S[:3]
+            if np.any(w != 0):
+                R = writer.rot_axis_angle(w, variables.cos(dof), variables.sin(dof), variables.versin(dof))
+                t = writer.vadd(
+                    writer.vscale([writer.const(x) for x in v], variables.q(dof)),
+                    writer.vscale([writer.const(x) for x in np.cross(w, v)], variables.versin(dof)),
+                    writer.vscale([writer.const(x) for x in np.cross(w, np.cross(w, v))], variables.q_minus_sin(dof)),
+                )
+            else:
+                R = [[1., 0., 0.], [0., 1., 0.], [0., 0., 1.]]
+                t = writer.vscale([writer.const(x) for x in v], variables.q(dof))
+            X_ParentChild = writer.compose((R, t), writer.const_pose(dyn.home_pose[i]))
+            X_ChildParent.append(writer.inverse(X_ParentChild))
+            V.append(writer.vadd(writer.transform_screw(X_ChildParent[i], V_parent), writer.vscale(A, qd[dof])))
+            Vd.append(writer.vadd(
+                writer.transform_screw(X_ChildParent[i], Vd_parent),
+                writer.vscale(writer.lie_bracket(V[i], A), qd[dof]),
+                writer.vscale(A, qdd[dof]),
+            ))
+        else:
+            X_ChildParent.append(writer.const_pose(dyn.inv_home_pose[i]))
+            V.append(writer.transform_screw(X_ChildParent[i], V_parent))
+            Vd.append(writer.transform_screw(X_ChildParent[i], Vd_parent))
+    # backward pass
+    def body_wrench(G: np.ndarray, V_i, Vd_i) -> list:
+        mass, inertia = G[0, 0], G[3:, 3:]
+        GV = writer.spatial_inertia_times(mass, inertia, V_i)
+        return writer.vadd(writer.spatial_inertia_times(mass, inertia, Vd_i), [writer.neg(x) for x in writer.lie_bracket_transpose(V_i, GV)])
+    contributions = [[] for _ in range(dyn.n_bodies)]
+    base_contributions = []
+    tau = [None]*dyn.n_dof
+    for i in reversed(range(dyn.n_bodies)):
+        F = writer.vadd(body_wrench(dyn.spatial_inertia[i], V[i], Vd[i]), *contributions[i])
+        if i in dof_of:
+            tau[dof_of[i]] = writer.dot([writer.const(a) for a in dyn.body_screw_axis[i]], F)
+        p = dyn.parent[i]
+        if p >= 0:
+            contributions[p].append(writer.transform_wrench(X_ChildParent[i], F))
+        elif dyn.base_is_mobile:
+            base_contributions.append(writer.transform_wrench(X_ChildParent[i], F))
+    outputs = tau
+    if dyn.base_is_mobile:
+        outputs = writer.vadd(body_wrench(dyn.base_spatial_inertia, V0, Vd0), *base_contributions) + tau
+
+    if dyn.base_is_mobile:
+        signature = "def rnea(q, qd, qdd, gravity=GRAVITY, base_twist=None, base_accel=None):"
+        shape_doc = "(..., 6 + N_DOF), the base wrench first"
+    else:
+        signature = "def rnea(q, qd, qdd, gravity=GRAVITY):"
+        shape_doc = "(..., N_DOF)"
+    header = [
+        signature,
+        f'    """ inverse dynamics, cf. `urdf_kit.graph.dynamics.multibody_dynamics.inverse_dynamics`: ---> {shape_doc} """',
+        "    q, qd, qdd = np.asarray(q, dtype=float), np.asarray(qd, dtype=float), np.asarray(qdd, dtype=float)",
+    ]
+    body = writer.lines + [
+        "return _stack([" + ", ".join(repr(x) if writer.is_const(x) else x for x in outputs) + "], q[..., 0])",
+    ]
+    return header + _indent(body) + [""]
+
+def _python_name(link_name: str) -> str:
+    name = "".join(char if char.isalnum() else "_" for char in link_name)
+    if not name.isidentifier() or keyword.iskeyword(name):
+        name = "_" + name
+    return name
+
+def generate_module(model: compiled_tree, dynamics: robot_dynamics = None, tip_links: list[str] = None, zero_threshold: float = 1e-9) -> str:
+    """ source code of a standalone robot-specific module
+
+    Arguments
+    --------------------
+    model: a `compiled_tree` (a `kinematic_tree` will be compiled)
+    dynamics: (optional) the parameters for the `rnea` function,
+        from the same robot, see `kinematic_tree.extract_dynamics`
+    tip_links: the links to generate a space Jacobian for, default: all leaf links
+    zero_threshold: constants closer than this to 0/ +-1 are folded as such
+
+    Generated API
+    --------------------
+    LINK_NAMES, JOINT_NAMES, N_LINKS, N_DOF
+    fk(q) ---> (..., N_LINKS, 4, 4)
+    jacobian(q, link_name) ---> (..., 6, N_DOF), for the `tip_links` only
+    rnea(q, qd, qdd, gravity=GRAVITY, ...) if `dynamics` is given
+    """
+    if not isinstance(model, compiled_tree):
+        model = model.compile()
+    if tip_links is None:
+        tip_links = [name for i, name in enumerate(model.link_names) if i > 0 and not np.any(model.parent == i)]
+    lines = [
+        f'"""',
+        f"Kinematics{' and dynamics' if dynamics is not None else ''} of [{model.robot_name}],",
+        f"generated by `urdf_kit.graph.codegen`, do not edit.",
+        f'"""',
+        "import numpy as np",
+        "",
+        f"LINK_NAMES = {model.link_names!r}",
+        f"JOINT_NAMES = {model.joint_names!r}",
+        f"N_LINKS = {model.n_links}",
+        f"N_DOF = {model.n_dof}",
+        "GRAVITY = (0., 0., -9.81)",
+        "",
+        "def _stack(entries, reference):",
+        "    return np.stack(np.broadcast_arrays(*entries, reference)[:-1], axis=-1)",
+        "",
+    ]
+    lines += _gen_fk(model, zero_threshold)
+
+    jacobian_functions = {}
+    for link_name in tip_links:
+        function_name = f"jacobian_{_python_name(link_name)}"
+        while function_name in jacobian_functions.values(): # e.g. "a-b" and "a_b"
+            function_name += f"_{model.link_index(link_name)}"
+        jacobian_functions[link_name] = function_name
+        lines += _gen_jacobian(model, model.link_index(link_name), function_name, zero_threshold)
+    lines += [
+        "JACOBIANS = {" + ", ".join(f"{name!r}: {func}" for name, func in jacobian_functions.items()) + "}",
+        "",
+        "def jacobian(q, link_name):",
+        "    return JACOBIANS[link_name](q)",
+        "",
+    ]
+    if dynamics is not None:
+        joint_names = tuple(joint.joint_name for joint in dynamics.joints if any(x != 0 for x in joint.screw_axis))
+        if set(joint_names) != set(model.joint_names):
+            raise ValueError("The kinematics and the dynamics don't describe the same joints!")
+        lines += [f"RNEA_JOINT_NAMES = {joint_names!r}", ""]
+        lines += _gen_rnea(dynamics, zero_threshold)
+    return "\n".join(lines)
+
+def write_module(path: str | Path, source: str):
+    Path(path).write_text(source)
+    print(f"Generated code written to {path}")
+
+def load_module(source: str, module_name: str = "generated_robot") -> types.ModuleType:
+    """ import the generated source without writing it to the disk """
+    module = types.ModuleType(module_name)
+    exec(compile(source, f"<{module_name}>", "exec"), module.__dict__)
+    return module
@@ -0,0 +1,247 @@
+from __future__ import annotations
+import dataclasses
+import numpy as np
+
+from ..maths import get_origin
+from ..maths.transforms import _get_axis_xyz
+from ..maths.inertial import body_inertial_urdf
+
+"""
+A frozen, numerical snapshot of a kinematic tree.
+
+Everything the numerical algorithms need is parsed from the XML data once
+and stored as contiguous arrays (struct-of-arrays),
+one row per link in topological (depth-first) order, root link first.
+Row i also describes the joint owning link i (a dummy one for the root link).
+
+See `kinematic_tree.compile`.
+"""
+
+# joint type codes
+FIXED = 0
+REVOLUTE = 1 # also continuous
+PRISMATIC = 2
+JOINT_TYPE_CODES = {
+    "fixed": FIXED,
+    "revolute": REVOLUTE,
+    "continuous": REVOLUTE,
+    "prismatic": PRISMATIC,
+}
+
+@dataclasses.dataclass(frozen=True, eq=False)
+class compiled_tree:
+    robot_name: str
+    link_names: tuple[str]
+    link_joint_names: tuple[str] # the joint owning each link ("" for the root link)
+    parent: np.ndarray # (n,) int, -1 for the root link
+    depth: np.ndarray # (n,) int
+    joint_type: np.ndarray # (n,) int, see the type codes above
+    dof_index: np.ndarray # (n,) int, column of the joint positions, -1 if fixed
+    axis: np.ndarray # (n, 3), normalized, zeros if fixed
+    X_ParentJoint: np.ndarray # (n, 4, 4) joint origins
+    mass: np.ndarray # (n,), 0 for dummy links
+    X_LinkCom: np.ndarray # (n, 4, 4) inertial origins
+    inertia: np.ndarray # (n, 3, 3) w.r.t. the CoM-aligned frame
+    lower: np.ndarray # (n,) -inf if unbounded
+    upper: np.ndarray # (n,) +inf if unbounded
+    velocity_limit: np.ndarray # (n,) nan if unspecified
+    effort_limit: np.ndarray # (n,) nan if unspecified
+    # derived in `__post_init__`: 
+    #   screw_axis (n, 6), joint_names (the movable joints, ordered by `dof_index`),
+    #   subtree_end (n,), an index for the lowest common ancestor queries
+
+    def __post_init__(self):
+        n = len(self.link_names)
+        assert len(self.link_joint_names) == n
+        expected_shapes = dict(
+            parent=(n,), depth=(n,), joint_type=(n,), dof_index=(n,), axis=(n, 3),
+            X_ParentJoint=(n, 4, 4), mass=(n,), X_LinkCom=(n, 4, 4), inertia=(n, 3, 3),
+            lower=(n,), upper=(n,), velocity_limit=(n,), effort_limit=(n,),
+        )
+        for field_name, shape in expected_shapes.items():
+            dtype = int if field_name in ("parent", "depth", "joint_type", "dof_index") else float
+            data = np.ascontiguousarray(getattr(self, field_name), dtype=dtype)
+            assert data.shape == shape, f"{field_name}: expect {shape}, got {data.shape}"
+            data.flags.writeable = False # it's a snapshot
+            object.__setattr__(self, field_name, data)
+        assert n == 0 or self.parent[0] == -1, "The root link should come first"
+        assert np.all(self.parent[1:] < np.arange(1, n)), "The links should be in topological order"
+        object.__setattr__(self, "_link_indices", {name: i for i, name in enumerate(self.link_names)})
+        object.__setattr__(self, "screw_axis", self._calc_screw_axis())
+        object.__setattr__(self, "joint_names", tuple(
+            self.link_joint_names[i] for i in np.flatnonzero(self.dof_index >= 0)[np.argsort(self.dof_index[self.dof_index >= 0])]
+        ))
+        object.__setattr__(self, "subtree_end", self._calc_subtree_end())
+        self._build_lca_index()
+
+    def _calc_subtree_end(self) -> np.ndarray:
+        """ (n,) the links [i, subtree_end[i]) are link i and its descendants
+
+        i.e. the links are expected in depth-first pre-order, so that each subtree is contiguous
+        """
+        n = self.n_links
+        subtree_size = np.ones(n, dtype=int)
+        for i in range(n-1, 0, -1):
+            subtree_size[self.parent[i]] += subtree_size[i]
+        next_child_position = np.arange(n) + 1
+        for i in range(1, n):
+            p = self.parent[i]
+            assert i == next_child_position[p], "The links should be in depth-first pre-order"
+            next_child_position[p] += subtree_size[i]
+        out = np.arange(n) + subtree_size
+        out.flags.writeable = False
+        return out
+
+    def _build_lca_index(self):
+        """ Euler tour + sparse table for O(1) lowest common ancestor queries
+
+        Reference: Bender & Farach-Colton, "The LCA Problem Revisited" (2000)
+        """
+        n = self.n_links
+        children = [[] for _ in range(n)]
+        for i in range(1, n):
+            children[self.parent[i]].append(i)
+        tour = []
+        first_visit = np.zeros(n, dtype=int)
+        stack = [(0, 0)] if n > 0 else []
+        while stack:
+            i, num_visited = stack.pop()
+            if num_visited == 0:
+                first_visit[i] = len(tour)
+            tour.append(i)
+            if num_visited < len(children[i]):
+                stack.append((i, num_visited+1))
+                stack.append((children[i][num_visited], 0))
+        tour = np.array(tour, dtype=int)
+        # sparse_table[j][k]: the shallowest link among tour[k : k + 2**j]
+        sparse_table = [tour]
+        j = 1
+        while (1 << j) <= len(tour):
+            prev = sparse_table[-1]
+            half = 1 << (j-1)
+            left, right = prev[:len(prev)-half], prev[half:]
+            sparse_table.append(np.where(self.depth[left] <= self.depth[right], left, right))
+            j += 1
+        object.__setattr__(self, "_first_visit", first_visit)
+        object.__setattr__(self, "_sparse_table", sparse_table)
+
+    def _calc_screw_axis(self) -> np.ndarray:
+        """ (n, 6) screw axes of the joints expressed in the parent link frames 
+        (linear part first, all zeros for fixed joints),
+        cf. `body_entry.screwAx_ParentChild_Parent`
+        """
+        ax_Parent = np.einsum('kij,kj->ki', self.X_ParentJoint[:, :3, :3], self.axis)
+        pos_JointParent_Parent = -self.X_ParentJoint[:, :3, 3]
+        out = np.zeros((self.n_links, 6))
+        is_revolute = self.joint_type == REVOLUTE
+        out[is_revolute, :3] = np.cross(ax_Parent[is_revolute], pos_JointParent_Parent[is_revolute])
+        out[is_revolute, 3:] = ax_Parent[is_revolute]
+        is_prismatic = self.joint_type == PRISMATIC
+        out[is_prismatic, :3] = ax_Parent[is_prismatic]
+        out.flags.writeable = False
+        return out
+
+    @property
+    def n_links(self) -> int:
+        return len(self.link_names)
+    @property
+    def n_dof(self) -> int:
+        return len(self.joint_names)
+    def __repr__(self):
+        return f"compiled_tree(robot={self.robot_name}, {self.n_links} links, {self.n_dof} DoF)"
+    def link_index(self, link_name: str) -> int:
+        try:
+            return self._link_indices[link_name]
+        except KeyError:
+            raise ValueError(f"The desired link [{link_name}] cannot be found!") from None
+
+    def _lca(self, i: int, j: int) -> int:
+        lo, hi = sorted((int(self._first_visit[i]), int(self._first_visit[j])))
+        level = (hi - lo + 1).bit_length() - 1
+        a, b = self._sparse_table[level][lo], self._sparse_table[level][hi - (1 << level) + 1]
+        return int(a if self.depth[a] <= self.depth[b] else b)
+    def lowest_common_ancestor(self, link_name_a: str, link_name_b: str) -> str:
+        """ the deepest link having both links as descendants (a link is a descendant of itself) """
+        return self.link_names[self._lca(self.link_index(link_name_a), self.link_index(link_name_b))]
+    def path_between(self, link_name_a: str, link_name_b: str) -> tuple[list[int], int, list[int]]:
+        """ the (indices of the) links on the path from link A to link B
+
+        Return
+        -----------
+        up: from link A (inclusive) up to the common ancestor (exclusive)
+        lca: the lowest common ancestor
+        down: from the common ancestor (exclusive) down to link B (inclusive)
+        """
+        i, j = self.link_index(link_name_a), self.link_index(link_name_b)
+        lca = self._lca(i, j)
+        up, down = [], []
+        while i != lca:
+            up.append(i)
+            i = int(self.parent[i])
+        while j != lca:
+            down.append(j)
+            j = int(self.parent[j])
+        return up, lca, down[::-1]
+
+    @classmethod
+    def from_tree(cls, tree) -> compiled_tree:
+        """ use `kinematic_tree.compile` instead """
+        link_names = [tree.root_name] + list(tree.gen_sorted_list_topdown('depth_first'))
+        n = len(link_names)
+        link_indices = {name: i for i, name in enumerate(link_names)}
+
+        out = dict(
+            parent = np.full(n, -1, dtype=int),
+            depth = np.zeros(n, dtype=int),
+            joint_type = np.full(n, FIXED, dtype=int),
+            dof_index = np.full(n, -1, dtype=int),
+            axis = np.zeros((n, 3)),
+            X_ParentJoint = np.tile(np.eye(4), (n, 1, 1)),
+            mass = np.zeros(n),
+            X_LinkCom = np.tile(np.eye(4), (n, 1, 1)),
+            inertia = np.zeros((n, 3, 3)),
+            lower = np.full(n, -np.inf),
+            upper = np.full(n, np.inf),
+            velocity_limit = np.full(n, np.nan),
+            effort_limit = np.full(n, np.nan),
+        )
+        link_joint_names = [""]
+        num_dof = 0
+        for i, link_name in enumerate(link_names):
+            link_elem = tree.index.link(link_name)
+            inertial_elem = link_elem.find("inertial")
+            if inertial_elem is not None:
+                # not `body_inertial_urdf` because massless links are legit here
+                out['mass'][i] = float(inertial_elem.find("mass").get("value"))
+                out['X_LinkCom'][i] = get_origin(inertial_elem.find("origin"), backend="numpy")
+                out['inertia'][i] = body_inertial_urdf.inertia_urdf_to_np_array(inertial_elem.find("inertia"))
+            if i == 0:
+                continue # the root link is not owned by any joint
+
+            entry = tree.links[link_name]
+            link_joint_names.append(entry.joint_name)
+            out['parent'][i] = link_indices[entry.parentLink_name]
+            out['depth'][i] = out['depth'][out['parent'][i]] + 1 # parents come first
+            out['X_ParentJoint'][i] = entry.X_ParentJoint.A
+            if entry.joint_type not in JOINT_TYPE_CODES.keys():
+                raise NotImplementedError(f"joint [{entry.joint_name}] is of type {entry.joint_type}, which is not supported yet.")
+            out['joint_type'][i] = JOINT_TYPE_CODES[entry.joint_type]
+            if out['joint_type'][i] == FIXED:
+                continue
+            out['axis'][i] = _get_axis_xyz(entry.joint_elem)
+            out['dof_index'][i] = num_dof
+            num_dof += 1
+            limit_elem = entry.joint_elem.find("limit")
+            if limit_elem is not None:
+                if entry.joint_type != "continuous":
+                    out['lower'][i] = float(limit_elem.get("lower", "0"))
+                    out['upper'][i] = float(limit_elem.get("upper", "0"))
+                for attrib_name, field_name in (("velocity", "velocity_limit"), ("effort", "effort_limit")):
+                    if limit_elem.get(attrib_name) is not None:
+                        out[field_name][i] = float(limit_elem.get(attrib_name))
+        return cls(
+            robot_name = tree.urdf_root.get("name"),
+            link_names = tuple(link_names),
+            link_joint_names = tuple(link_joint_names),
+            **out
+        )
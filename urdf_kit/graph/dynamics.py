@@ -0,0 +1,445 @@
+from __future__ import annotations
+import dataclasses
+import numpy as np
+
+from .params import robot_dynamics
+from ..maths.batch import exp_twist, inverse_transform, transform_screw, transform_wrench
+from ..maths.batch import lie_bracket, lie_bracket_transpose, spatial_inertia, adjoint, exp_se3
+
+"""
+Rigid-body dynamics algorithms evaluating extracted `robot_dynamics` parameters.
+
+Conventions (cf. `joint_body_dynamics_param`)
+----------------------
+* body i is the child link of joint i, its frame is the CoM-aligned frame
+* the base frame is the CoM-aligned frame of the root link
+* X_ParentChild(theta) = exp([S] theta) @ M, S expressed in the parent frame
+* twists/ wrenches are linear part first, expressed in the body frames
+* gravity is given in the base frame
+
+All routines are vectorized over a batch (e.g. the time steps of a trajectory),
+the Python loops only run over the bodies.
+
+Reference: the "Modern Robotics" textbook, Chapter 8
+"""
+
+STANDARD_GRAVITY = np.array([0., 0., -9.81])
+INTEGRATORS = ("semi_implicit_euler", "rk4")
+
+@dataclasses.dataclass
+class rollout_state:
+    """ the state of T independent rollouts, see `multibody_dynamics.step`
+
+    q, qd: (T, n_dof)
+    X_WorldBase: (T, 4, 4) pose of the base frame (mobile base only, otherwise None)
+    base_twist: (T, 6) in the base frame (mobile base only, otherwise None)
+    """
+    q: np.ndarray
+    qd: np.ndarray
+    X_WorldBase: np.ndarray = None
+    base_twist: np.ndarray = None
+    @property
+    def batch_size(self) -> int:
+        return self.q.shape[0]
+
+class multibody_dynamics:
+    def __init__(self, params: robot_dynamics):
+        """ prepare the dynamics computation of a `robot_dynamics`
+
+        The joints must be sorted top-down (as by `kinematic_tree.extract_dynamics`).
+        Joints with an all-zero screw axis are rigid,
+        the others are the degrees of freedom in the given order.
+
+        With a mobile base (`params.base_is_mobile`), the generalized forces are
+        [base wrench (6), joint torques (n_dof)].
+        """
+        assert isinstance(params, robot_dynamics), f"got {type(params)}"
+        self.robot_name = params.robot_name
+        self.base_is_mobile = params.base_is_mobile
+        n = len(params.joints)
+        if n == 0:
+            raise ValueError("No joints to evaluate!")
+        child_link_names = {joint.child_link_name for joint in params.joints}
+        root_candidates = {joint.parent_link_name for joint in params.joints} - child_link_names
+        if len(root_candidates) != 1:
+            raise ValueError(f"Expect exactly one root link, got {root_candidates}")
+        self.base_link_name = root_candidates.pop()
+        body_indices = {self.base_link_name: -1}
+
+        self.parent = np.empty(n, dtype=int) # -1 means the base
+        self.home_pose = np.empty((n, 4, 4))
+        self.screw_axis = np.empty((n, 6))
+        mass = np.empty(n)
+        inertia = np.empty((n, 3, 3))
+        for i, joint in enumerate(params.joints):
+            if joint.parent_link_name not in body_indices.keys():
+                raise ValueError(f"joint [{joint.joint_name}] comes before its parent link [{joint.parent_link_name}], please sort the joints top-down!")
+            self.parent[i] = body_indices[joint.parent_link_name]
+            body_indices[joint.child_link_name] = i
+            self.home_pose[i] = joint.home_pose
+            self.screw_axis[i] = joint.screw_axis
+            mass[i] = joint.mass
+            inertia[i] = joint.inertia
+        self.body_names = [joint.child_link_name for joint in params.joints]
+        self.spatial_inertia = spatial_inertia(mass, inertia) # (n, 6, 6)
+        if self.base_is_mobile:
+            self.base_spatial_inertia = spatial_inertia(np.array(params.base_mass), np.array(params.base_inertia))
+        else:
+            self.base_spatial_inertia = None
+
+        # the screw axes expressed in the child (body) frames: A = Ad_{M^-1} S
+        self.inv_home_pose = inverse_transform(self.home_pose)
+        self.body_screw_axis = transform_screw(self.inv_home_pose, self.screw_axis)
+
+        self._movable = np.flatnonzero(np.any(self.screw_axis != 0, axis=1))
+        self.joint_names = [params.joints[i].joint_name for i in self._movable]
+        self._movable_set = set(self._movable.tolist())
+        self.children = [np.flatnonzero(self.parent == i) for i in range(n)]
+
+    @property
+    def n_bodies(self) -> int:
+        return len(self.body_names)
+    @property
+    def n_dof(self) -> int:
+        return len(self.joint_names)
+    def __repr__(self):
+        base = "mobile" if self.base_is_mobile else "fixed"
+        return f"multibody_dynamics(robot={self.robot_name}, {base} base, {self.n_bodies} bodies, {self.n_dof} DoF)"
+
+    # --------------------------------
+    # helpers
+    # --------------------------------
+    def _as_batch(self, *arrays) -> tuple[list[np.ndarray], bool]:
+        """ joint-space arrays of shape (T, n_dof) or (n_dof,) ---> (T, n_dof) """
+        is_single = np.ndim(arrays[0]) == 1
+        out = []
+        for data in arrays:
+            data = np.asarray(data, dtype=float)
+            data = data[np.newaxis] if is_single else data # not `reshape(-1, n_dof)`, which fails for n_dof == 0
+            if data.ndim != 2 or data.shape[1] != self.n_dof:
+                raise ValueError(f"Expect arrays of shape (T, {self.n_dof}), got {data.shape}")
+            out.append(data)
+        if any(data.shape[0] != out[0].shape[0] for data in out):
+            raise ValueError("Inconsistent batch sizes!")
+        return out, is_single
+    def _per_body(self, joint_space_data: np.ndarray) -> np.ndarray:
+        """ (T, n_dof) ---> (T, n_bodies), zeros for the rigid joints """
+        out = np.zeros((joint_space_data.shape[0], self.n_bodies))
+        out[:, self._movable] = joint_space_data
+        return out
+    def _base_motion(self, batch_size: int, base_twist, base_accel, gravity) -> tuple[np.ndarray, np.ndarray]:
+        """ the base's twist and its acceleration (gravity folded in, cf. Modern Robotics Section 8.3.2) """
+        gravity = np.broadcast_to(np.asarray(gravity, dtype=float), (batch_size, 3))
+        V0 = np.zeros((batch_size, 6))
+        Vd0 = np.zeros((batch_size, 6))
+        if self.base_is_mobile:
+            if base_twist is not None:
+                V0[:] = base_twist
+            if base_accel is not None:
+                Vd0[:] = base_accel
+        elif base_twist is not None or base_accel is not None:
+            raise ValueError("The base is fixed, don't specify its motion!")
+        Vd0[:, :3] -= gravity
+        return V0, Vd0
+    def calc_X_ChildParent(self, theta: np.ndarray) -> np.ndarray:
+        """ (T, n_bodies) joint positions ---> (T, n_bodies, 4, 4) pose of each parent w.r.t. the child """
+        return exp_twist(-self.body_screw_axis, theta) @ self.inv_home_pose
+
+    # --------------------------------
+    # inverse dynamics
+    # --------------------------------
+    def inverse_dynamics(
+        self, q: np.ndarray, qd: np.ndarray, qdd: np.ndarray,
+        gravity: np.ndarray = STANDARD_GRAVITY,
+        base_twist: np.ndarray = None, base_accel: np.ndarray = None,
+    ) -> np.ndarray:
+        """ recursive Newton-Euler algorithm (RNEA)
+
+        Arguments
+        ---------------
+        q, qd, qdd: (T, n_dof) or (n_dof,) joint positions, velocities and accelerations
+        gravity: (3,) or (T, 3) in the base frame
+        base_twist, base_accel: (T, 6) or (6,) mobile base only (default: at rest),
+            expressed in the base frame
+
+        Return
+        ---------------
+        fixed base: (T, n_dof) joint torques/ forces
+        mobile base: (T, 6 + n_dof), the first 6 entries being the wrench
+            needed at the base (in the base frame)
+        """
+        (q, qd, qdd), is_single = self._as_batch(q, qd, qdd)
+        T, n = q.shape[0], self.n_bodies
+        theta, dtheta, ddtheta = self._per_body(q), self._per_body(qd), self._per_body(qdd)
+        V0, Vd0 = self._base_motion(T, base_twist, base_accel, gravity)
+
+        X_ChildParent = self.calc_X_ChildParent(theta)
+        A = self.body_screw_axis
+        V = np.empty((T, n, 6))
+        Vd = np.empty((T, n, 6))
+        # forward pass: twists and accelerations
+        for i in range(n):
+            p = self.parent[i]
+            V_parent, Vd_parent = (V0, Vd0) if p < 0 else (V[:, p], Vd[:, p])
+            V[:, i] = transform_screw(X_ChildParent[:, i], V_parent) + A[i]*dtheta[:, i, None]
+            Vd[:, i] = (transform_screw(X_ChildParent[:, i], Vd_parent)
+                        + lie_bracket(V[:, i], A[i])*dtheta[:, i, None] + A[i]*ddtheta[:, i, None])
+        # backward pass: wrenches
+        G = self.spatial_inertia
+        F = np.einsum('kij,tkj->tki', G, Vd) - lie_bracket_transpose(V, np.einsum('kij,tkj->tki', G, V))
+        if self.base_is_mobile:
+            G0 = self.base_spatial_inertia
+            F0 = Vd0 @ G0.T - lie_bracket_transpose(V0, V0 @ G0.T)
+        for i in reversed(range(n)):
+            p = self.parent[i]
+            wrench_parent = transform_wrench(X_ChildParent[:, i], F[:, i])
+            if p >= 0:
+                F[:, p] += wrench_parent
+            elif self.base_is_mobile:
+                F0 += wrench_parent
+        tau = np.einsum('tki,ki->tk', F, A)[:, self._movable]
+        if self.base_is_mobile:
+            tau = np.concatenate((F0, tau), axis=1)
+        return tau[0] if is_single else tau
+
+    # --------------------------------
+    # mass matrix
+    # --------------------------------
+    def mass_matrix(self, q: np.ndarray) -> np.ndarray:
+        """ composite rigid body algorithm (CRBA)
+
+        Arguments
+        ---------------
+        q: (T, n_dof) or (n_dof,) joint positions
+
+        Return
+        ---------------
+        fixed base: (T, n_dof, n_dof)
+        mobile base: (T, 6 + n_dof, 6 + n_dof), ordered as the output of `inverse_dynamics`
+            (base acceleration expressed in the base frame first)
+
+        Remarks
+        ---------------
+        Only the supporting joints of each joint are visited, 
+        i.e. the cost is O(n * depth) instead of O(n^2) for n calls to the RNEA.
+        """
+        (q, ), is_single = self._as_batch(q)
+        T, n = q.shape[0], self.n_bodies
+        X_ChildParent = self.calc_X_ChildParent(self._per_body(q))
+        Ad_ChildParent = adjoint(X_ChildParent) # (T, n, 6, 6)
+        A = self.body_screw_axis
+        # composite inertias, bottom-up
+        Ic = np.broadcast_to(self.spatial_inertia, (T, n, 6, 6)).copy()
+        if self.base_is_mobile:
+            Ic0 = np.broadcast_to(self.base_spatial_inertia, (T, 6, 6)).copy()
+        for i in reversed(range(n)):
+            p = self.parent[i]
+            Ic_parent = np.swapaxes(Ad_ChildParent[:, i], -1, -2) @ Ic[:, i] @ Ad_ChildParent[:, i]
+            if p >= 0:
+                Ic[:, p] += Ic_parent
+            elif self.base_is_mobile:
+                Ic0 += Ic_parent
+        # walk up from each joint
+        offset = 6 if self.base_is_mobile else 0
+        col = np.full(n, -1, dtype=int)
+        col[self._movable] = offset + np.arange(self.n_dof)
+        M = np.zeros((T, offset+self.n_dof, offset+self.n_dof))
+        for i in self._movable:
+            F = np.einsum('tij,j->ti', Ic[:, i], A[i])
+            M[:, col[i], col[i]] = F @ A[i]
+            j = i
+            while self.parent[j] >= 0:
+                F = transform_wrench(X_ChildParent[:, j], F)
+                j = self.parent[j]
+                if col[j] >= 0:
+                    M[:, col[i], col[j]] = M[:, col[j], col[i]] = F @ A[j]
+            if self.base_is_mobile:
+                F = transform_wrench(X_ChildParent[:, j], F)
+                M[:, :6, col[i]] = M[:, col[i], :6] = F
+        if self.base_is_mobile:
+            M[:, :6, :6] = Ic0
+        return M[0] if is_single else M
+
+    # --------------------------------
+    # forward dynamics
+    # --------------------------------
+    def forward_dynamics(
+        self, q: np.ndarray, qd: np.ndarray, tau: np.ndarray,
+        gravity: np.ndarray = STANDARD_GRAVITY,
+        base_twist: np.ndarray = None,
+    ) -> np.ndarray:
+        """ articulated body algorithm (ABA), the inverse of `inverse_dynamics`
+
+        Arguments
+        ---------------
+        q, qd: (T, n_dof) or (n_dof,) joint positions and velocities
+        tau: generalized forces, ordered as the output of `inverse_dynamics`,
+            i.e. (T, n_dof) or (T, 6 + n_dof) with a mobile base
+        gravity: (3,) or (T, 3) in the base frame
+        base_twist: (T, 6) or (6,) mobile base only (default: at rest), in the base frame
+
+        Return
+        ---------------
+        fixed base: (T, n_dof) joint accelerations
+        mobile base: (T, 6 + n_dof), the first 6 entries being the base acceleration
+        """
+        (q, qd), is_single = self._as_batch(q, qd)
+        T, n = q.shape[0], self.n_bodies
+        offset = 6 if self.base_is_mobile else 0
+        tau = np.asarray(tau, dtype=float).reshape(T, -1)
+        if tau.shape[1] != offset + self.n_dof:
+            raise ValueError(f"Expect generalized forces of shape (T, {offset + self.n_dof}), got {tau.shape}")
+        dtheta = self._per_body(qd)
+        tau_body = self._per_body(tau[:, offset:])
+        V0, Vd0 = self._base_motion(T, base_twist, None, gravity)
+        gravity_accel = -Vd0 # [-g, 0] to be undone for the base acceleration
+
+        X_ChildParent = self.calc_X_ChildParent(self._per_body(q))
+        Ad_ChildParent = adjoint(X_ChildParent)
+        A = self.body_screw_axis
+        G = self.spatial_inertia
+        # forward pass: velocities and velocity-product terms
+        V = np.empty((T, n, 6))
+        for i in range(n):
+            p = self.parent[i]
+            V[:, i] = transform_screw(X_ChildParent[:, i], V0 if p < 0 else V[:, p]) + A[i]*dtheta[:, i, None]
+        c = lie_bracket(V, A)*dtheta[..., None]
+        # backward pass: articulated inertias and bias wrenches
+        IA = np.broadcast_to(G, (T, n, 6, 6)).copy()
+        pA = -lie_bracket_transpose(V, np.einsum('kij,tkj->tki', G, V))
+        if self.base_is_mobile:
+            G0 = self.base_spatial_inertia
+            IA0 = np.broadcast_to(G0, (T, 6, 6)).copy()
+            pA0 = -lie_bracket_transpose(V0, V0 @ G0.T) - tau[:, :6]
+        U = np.zeros((T, n, 6))
+        D = np.ones((T, n))
+        u = np.zeros((T, n))
+        for i in reversed(range(n)):
+            p = self.parent[i]
+            Ia, pa = IA[:, i], pA[:, i]
+            if i in self._movable_set:
+                U[:, i] = Ia @ A[i]
+                D[:, i] = U[:, i] @ A[i]
+                u[:, i] = tau_body[:, i] - pA[:, i] @ A[i]
+                Ia = Ia - np.einsum('ti,tj->tij', U[:, i], U[:, i])/D[:, i, None, None]
+                pa = pa + U[:, i]*(u[:, i]/D[:, i])[:, None]
+            pa = pa + np.einsum('tij,tj->ti', Ia, c[:, i])
+            Ad = Ad_ChildParent[:, i]
+            Ad_T = np.swapaxes(Ad, -1, -2)
+            if p >= 0:
+                IA[:, p] += Ad_T @ Ia @ Ad
+                pA[:, p] += np.einsum('tij,tj->ti', Ad_T, pa)
+            elif self.base_is_mobile:
+                IA0 += Ad_T @ Ia @ Ad
+                pA0 += np.einsum('tij,tj->ti', Ad_T, pa)
+        if self.base_is_mobile:
+            Vd0 = np.linalg.solve(IA0, -pA0[..., None])[..., 0]
+        # forward pass: accelerations
+        ddtheta = np.zeros((T, n))
+        Vd = np.empty((T, n, 6))
+        for i in range(n):
+            p = self.parent[i]
+            Vd_i = transform_screw(X_ChildParent[:, i], Vd0 if p < 0 else Vd[:, p]) + c[:, i]
+            if i in self._movable_set:
+                ddtheta[:, i] = (u[:, i] - np.einsum('ti,ti->t', U[:, i], Vd_i))/D[:, i]
+            Vd[:, i] = Vd_i + A[i]*ddtheta[:, i, None]
+        qdd = ddtheta[:, self._movable]
+        if self.base_is_mobile:
+            qdd = np.concatenate((Vd0 + gravity_accel, qdd), axis=1)
+        return qdd[0] if is_single else qdd
+
+    # --------------------------------
+    # time integration
+    # --------------------------------
+    def _state_derivative(self, state: rollout_state, tau: np.ndarray, gravity_World: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """ (qdd, base acceleration or None) """
+        if not self.base_is_mobile:
+            return self.forward_dynamics(state.q, state.qd, tau, gravity=gravity_World), None
+        # gravity in the (moving) base frame
+        gravity_Base = np.einsum('tji,j->ti', state.X_WorldBase[:, :3, :3], gravity_World)
+        acc = self.forward_dynamics(state.q, state.qd, tau, gravity=gravity_Base, base_twist=state.base_twist)
+        return acc[:, 6:], acc[:, :6]
+    def _advance(self, state: rollout_state, dt: float, qd: np.ndarray, qdd: np.ndarray, twist: np.ndarray, base_accel: np.ndarray) -> rollout_state:
+        """ explicit update of the state with the given rates """
+        if not self.base_is_mobile:
+            return rollout_state(q=state.q + dt*qd, qd=state.qd + dt*qdd)
+        return rollout_state(
+            q = state.q + dt*qd,
+            qd = state.qd + dt*qdd,
+            X_WorldBase = state.X_WorldBase @ exp_se3(dt*twist),
+            base_twist = state.base_twist + dt*base_accel,
+        )
+    def initial_state(self, q: np.ndarray, qd: np.ndarray = None, X_WorldBase: np.ndarray = None, base_twist: np.ndarray = None) -> rollout_state:
+        """ a `rollout_state` of T rollouts, the mobile base defaults to the origin at rest """
+        (q, ), _ = self._as_batch(q)
+        T = q.shape[0]
+        qd = np.zeros_like(q) if qd is None else self._as_batch(np.broadcast_to(qd, q.shape))[0][0].copy()
+        if not self.base_is_mobile:
+            if X_WorldBase is not None or base_twist is not None:
+                raise ValueError("The base is fixed, don't specify its motion!")
+            return rollout_state(q=q.copy(), qd=qd)
+        X_WorldBase = np.tile(np.eye(4), (T, 1, 1)) if X_WorldBase is None else np.broadcast_to(X_WorldBase, (T, 4, 4)).copy()
+        base_twist = np.zeros((T, 6)) if base_twist is None else np.broadcast_to(base_twist, (T, 6)).copy()
+        return rollout_state(q=q.copy(), qd=qd, X_WorldBase=X_WorldBase, base_twist=base_twist)
+
+    def step(self, state: rollout_state, tau: np.ndarray, dt: float, method: str = "semi_implicit_euler", gravity: np.ndarray = STANDARD_GRAVITY) -> rollout_state:
+        """ advance all rollouts by one fixed time step
+
+        Arguments
+        ---------------
+        state: see `initial_state`
+        tau: (T, n_dof) or (T, 6 + n_dof) generalized forces, held constant during the step
+        dt: time step [s]
+        method: one of `INTEGRATORS`
+            'semi_implicit_euler': update the velocities first, then the positions with the new velocities
+            'rk4': the classical Runge-Kutta scheme
+        gravity: (3,) in the world frame (= the base frame for a fixed base)
+
+        Remarks
+        ---------------
+        The base pose is updated by the exponential of the (averaged) body twist times dt,
+        hence it stays on SE(3).
+        """
+        assert dt > 0, f"got {dt}"
+        if method == "semi_implicit_euler":
+            qdd, base_accel = self._state_derivative(state, tau, gravity)
+            qd_next = state.qd + dt*qdd
+            twist_next = None if base_accel is None else state.base_twist + dt*base_accel
+            return self._advance(state, dt, qd_next, qdd, twist_next, base_accel)
+        elif method == "rk4":
+            rates = []
+            stage = state
+            for stage_dt in (0.5*dt, 0.5*dt, dt, None):
+                qdd, base_accel = self._state_derivative(stage, tau, gravity)
+                rates.append((stage.qd, qdd, stage.base_twist, base_accel))
+                if stage_dt is not None:
+                    stage = self._advance(state, stage_dt, *rates[-1])
+            def averaged(k):
+                if rates[0][k] is None:
+                    return None
+                return (rates[0][k] + 2*rates[1][k] + 2*rates[2][k] + rates[3][k])/6.
+            return self._advance(state, dt, *(averaged(k) for k in range(4)))
+        else:
+            raise ValueError(f"Unknown integrator {method}, expect one of {INTEGRATORS}")
+
+    def rollout(self, state: rollout_state, tau, dt: float, n_steps: int, method: str = "semi_implicit_euler", gravity: np.ndarray = STANDARD_GRAVITY) -> tuple[np.ndarray, rollout_state]:
+        """ simulate T independent rollouts for `n_steps` fixed time steps
+
+        Arguments
+        ---------------
+        tau: either (n_steps, T, ...) generalized forces, 
+            or a callable (step index, state) ---> (T, ...) e.g. a feedback controller
+        others: see `step`
+
+        Return
+        ---------------
+        q: (n_steps+1, T, n_dof) the joint positions, the initial ones included
+        state: the final state
+        """
+        q_log = np.empty((n_steps+1,)+state.q.shape)
+        q_log[0] = state.q
+        for k in range(n_steps):
+            tau_k = tau(k, state) if callable(tau) else tau[k]
+            state = self.step(state, tau_k, dt, method=method, gravity=gravity)
+            q_log[k+1] = state.q
+        return q_log, state
@@ -0,0 +1,289 @@
+from __future__ import annotations
+import numpy as np
+from collections.abc import Iterable, Mapping
+
+from .compiled import compiled_tree, REVOLUTE, PRISMATIC
+from ..maths.batch import rot_from_axis_angle, transform_screw, inverse_transform
+
+"""
+Forward kinematics for many configurations at once.
+
+The numerical data come from a `compiled_tree` 
+(parent indices in topological order, joint origins, axes, ...).
+Evaluating the link poses is then a handful of NumPy operations
+per depth level of the tree, vectorized over the batch of configurations.
+
+For a stream of joint states, `incremental_fk` only updates
+the subtrees below the joints that have moved.
+"""
+
+class fk_engine:
+    def __init__(self, model: compiled_tree):
+        """forward kinematics of a compiled tree 
+
+        Arguments
+        --------------------
+        model: a `compiled_tree` (a `kinematic_tree` will be compiled first)
+
+        Data members (links in topological order, the root link first)
+        --------------------
+        link_names: tuple[str]
+        joint_names: tuple[str] --- the movable joints, i.e. the columns of `q`
+        model: the underlying `compiled_tree`
+        """
+        if not isinstance(model, compiled_tree):
+            model = model.compile()
+        self.model = model
+        self.robot_name = model.robot_name
+        self.link_names = model.link_names
+        self.joint_names = model.joint_names
+        self.parent = model.parent
+        self.dof_index = model.dof_index
+
+        # links sharing the same depth can be processed together
+        self._levels = [np.flatnonzero(model.depth == d) for d in range(1, model.depth.max(initial=0)+1)]
+        self._revolute = np.flatnonzero(model.joint_type == REVOLUTE)
+        self._prismatic = np.flatnonzero(model.joint_type == PRISMATIC)
+        self._supporting_joints = dict() # cache for `jacobian`
+
+    @property
+    def n_links(self) -> int:
+        return len(self.link_names)
+    @property
+    def n_dof(self) -> int:
+        return len(self.joint_names)
+    def __repr__(self):
+        return f"fk_engine(robot={self.robot_name}, {self.n_links} links, {self.n_dof} DoF)"
+
+    def link_index(self, link_name: str) -> int:
+        return self.model.link_index(link_name)
+
+    def _as_batch(self, q: np.ndarray) -> tuple[np.ndarray, bool]:
+        q = np.asarray(q, dtype=float)
+        is_single = q.ndim == 1
+        q = q[np.newaxis] if is_single else q # not `reshape(-1, n_dof)`, which fails for n_dof == 0
+        if q.ndim != 2 or q.shape[1] != self.n_dof:
+            raise ValueError(f"Expect joint positions of shape (N, {self.n_dof}), got {q.shape}")
+        return q, is_single
+
+    def compute_X_ParentChild(self, q: np.ndarray, link_indices: np.ndarray = None) -> np.ndarray:
+        """ (N, n_dof) joint positions ---> (N, n_links, 4, 4) poses of each link w.r.t. its parent link
+
+        (the entry of the root link is the identity)
+        If `link_indices` is given, only those links are evaluated: (N, len(link_indices), 4, 4)
+        """
+        q, _ = self._as_batch(q)
+        if link_indices is None:
+            revolute, prismatic = self._revolute, self._prismatic
+            link_indices = slice(None)
+            n = self.n_links
+        else:
+            link_indices = np.asarray(link_indices, dtype=int)
+            joint_type = self.model.joint_type[link_indices]
+            revolute, prismatic = np.flatnonzero(joint_type == REVOLUTE), np.flatnonzero(joint_type == PRISMATIC)
+            n = len(link_indices)
+        axis = self.model.axis[link_indices]
+        dof_index = self.dof_index[link_indices]
+        X_JointChild = np.zeros((q.shape[0], n, 4, 4))
+        X_JointChild[:, :] = np.eye(4)
+        if len(revolute) > 0:
+            X_JointChild[:, revolute, :3, :3] = rot_from_axis_angle(axis[revolute], q[:, dof_index[revolute]])
+        if len(prismatic) > 0:
+            # (3:4 rather than 3 to keep the batch dimensions in place)
+            X_JointChild[:, prismatic, :3, 3:4] = axis[prismatic, :, None] * q[:, dof_index[prismatic], None, None]
+        return self.model.X_ParentJoint[link_indices] @ X_JointChild
+
+    def compute(self, q: np.ndarray) -> np.ndarray:
+        """ the forward kinematics
+
+        Arguments
+        -----------
+        q: (N, n_dof) or (n_dof,) joint positions, columns ordered as `joint_names`
+
+        Return
+        -----------
+        (N, n_links, 4, 4) poses of all links w.r.t. the root link, ordered as `link_names`
+        (or (n_links, 4, 4) for a single configuration)
+        """
+        q, is_single = self._as_batch(q)
+        X_RootLink = self.compute_X_ParentChild(q) # to be overwritten level by level
+        for level in self._levels:
+            X_RootLink[:, level] = X_RootLink[:, self.parent[level]] @ X_RootLink[:, level]
+        return X_RootLink[0] if is_single else X_RootLink
+
+    def _get_supporting_joints(self, link_index: int) -> np.ndarray:
+        """ the (indices of the) links owned by the movable joints between the root and this link """
+        if link_index not in self._supporting_joints.keys():
+            chain = []
+            i = link_index
+            while i > 0:
+                if self.dof_index[i] >= 0:
+                    chain.append(i)
+                i = self.parent[i]
+            self._supporting_joints[link_index] = np.array(chain[::-1], dtype=int)
+        return self._supporting_joints[link_index]
+
+    _jacobian_frames = ("space", "body")
+    def jacobian(self, q: np.ndarray, link_name: str, frame: str = "space", X_RootLink: np.ndarray = None) -> np.ndarray:
+        """ geometric Jacobian of a link (linear part first)
+
+        Arguments
+        -----------
+        q: (N, n_dof) or (n_dof,) joint positions
+        link_name: the link of interest
+        frame: 
+            'space' --- the twist expressed in the root link frame
+            'body' --- the twist expressed in the frame of this link
+        X_RootLink: (optional) the output of `compute(q)`, if you already have it
+
+        Return
+        -----------
+        (N, 6, n_dof) or (6, n_dof); the columns of joints not supporting this link are zeros.
+        """
+        assert frame in fk_engine._jacobian_frames, f"got {frame}, supported: {fk_engine._jacobian_frames}"
+        q, is_single = self._as_batch(q)
+        if X_RootLink is None:
+            X_RootLink = self.compute(q)
+        X_RootLink = X_RootLink.reshape(q.shape[0], self.n_links, 4, 4)
+        k = self.link_index(link_name)
+        chain = self._get_supporting_joints(k)
+
+        # a joint's screw axis is constant in its parent link frame 
+        # so only the pose of the parent link matters
+        J = np.zeros((q.shape[0], self.n_dof, 6))
+        J[:, self.dof_index[chain]] = transform_screw(X_RootLink[:, self.parent[chain]], self.model.screw_axis[chain])
+        if frame == "body":
+            # Ad of the inverse pose of this link
+            R, p = X_RootLink[:, k, :3, :3], X_RootLink[:, k, :3, 3]
+            w = J[..., 3:]
+            v = J[..., :3] - np.cross(p[:, None, :], w)
+            J = np.concatenate((np.einsum('nji,nkj->nki', R, v), np.einsum('nji,nkj->nki', R, w)), axis=-1)
+        J = J.transpose(0, 2, 1)
+        return J[0] if is_single else J
+
+    def relative_transform(self, q: np.ndarray, link_name_a: str, link_name_b: str) -> np.ndarray:
+        """ X_AB, the pose of link B w.r.t. link A
+
+        Only the joints on the path between both links are evaluated,
+        the path is found via the lowest common ancestor, 
+        see `compiled_tree.path_between`.
+
+        Arguments
+        -----------
+        q: (N, n_dof) or (n_dof,) joint positions
+
+        Return
+        -----------
+        (N, 4, 4) or (4, 4)
+        """
+        q, is_single = self._as_batch(q)
+        up, _, down = self.model.path_between(link_name_a, link_name_b)
+        X_ParentChild = self.compute_X_ParentChild(q, up[::-1] + down)
+        # X_CommonA, X_CommonB
+        X = [np.tile(np.eye(4), (q.shape[0], 1, 1)) for _ in range(2)]
+        for k in range(len(up)):
+            X[0] = X[0] @ X_ParentChild[:, k]
+        for k in range(len(up), len(up) + len(down)):
+            X[1] = X[1] @ X_ParentChild[:, k]
+        X_AB = inverse_transform(X[0]) @ X[1]
+        return X_AB[0] if is_single else X_AB
+
+
+class incremental_fk:
+    def __init__(self, model: compiled_tree, q: np.ndarray = None):
+        """stateful forward kinematics for a stream of single configurations
+
+        Only the links below the joints whose positions changed are recomputed.
+        Since the links of a `compiled_tree` are in depth-first pre-order,
+        each affected subtree is a contiguous range of links (cf. `compiled_tree.subtree_end`).
+
+        Arguments
+        --------------------
+        model: a `compiled_tree` (a `kinematic_tree` will be compiled first)
+        q: (n_dof,) initial joint positions, default: zeros
+        """
+        self.engine = fk_engine(model)
+        self.model = self.engine.model
+        self.link_names = self.engine.link_names
+        self.joint_names = self.engine.joint_names
+        self._joint_indices = {name: k for k, name in enumerate(self.joint_names)}
+        self._dof_link = np.empty(self.engine.n_dof, dtype=int) # the link owned by each movable joint
+        self._dof_link[self.model.dof_index[self.model.dof_index >= 0]] = np.flatnonzero(self.model.dof_index >= 0)
+
+        self._q = np.zeros(self.engine.n_dof) if q is None else self.engine._as_batch(q)[0][0].copy()
+        self._X_ParentChild = self.engine.compute_X_ParentChild(self._q)[0]
+        self._X_RootLink = self.engine.compute(self._q)
+        self._X_RootLink_view = self._X_RootLink.view()
+        self._X_RootLink_view.flags.writeable = False
+
+    def __repr__(self):
+        return f"incremental_fk(robot={self.engine.robot_name}, {len(self.link_names)} links, {len(self.joint_names)} DoF)"
+
+    @property
+    def q(self) -> np.ndarray:
+        return self._q.copy()
+    @property
+    def X_RootLink(self) -> np.ndarray:
+        """ (n_links, 4, 4) read-only view of the cached poses, updated in place by `update` """
+        return self._X_RootLink_view
+    def get_X_RootLink(self, link_name: str) -> np.ndarray:
+        return self._X_RootLink[self.engine.link_index(link_name)].copy()
+
+    def _parse_joint_state(self, joint_state) -> np.ndarray:
+        """ the new joint positions from
+        * an array of all joint positions
+        * a mapping joint name ---> position
+        * a message with `name` and `position` sequences (as sensor_msgs/JointState)
+        * a (names, positions) pair
+        joints left out keep their previous positions
+        """
+        if isinstance(joint_state, np.ndarray):
+            return self.engine._as_batch(joint_state)[0][0]
+        if isinstance(joint_state, Mapping):
+            names, positions = joint_state.keys(), joint_state.values()
+        elif hasattr(joint_state, "name") and hasattr(joint_state, "position"):
+            names, positions = joint_state.name, joint_state.position
+        else:
+            names, positions = joint_state
+        names, positions = list(names), list(positions)
+        if len(names) != len(positions):
+            raise ValueError(f"Got {len(names)} joint names but {len(positions)} positions!")
+        q = self._q.copy()
+        for name, position in zip(names, positions):
+            if name not in self._joint_indices.keys():
+                raise ValueError(f"The joint [{name}] is not a movable joint of this model!")
+            q[self._joint_indices[name]] = position
+        return q
+
+    def update(self, joint_state) -> np.ndarray:
+        """ apply a new joint state (see `_parse_joint_state` for the accepted formats)
+
+        Return
+        -----------
+        the indices of the links whose poses have been recomputed (in topological order)
+        """
+        q = self._parse_joint_state(joint_state)
+        changed_links = self._dof_link[np.flatnonzero(q != self._q)]
+        self._q[:] = q
+        if len(changed_links) == 0:
+            return changed_links
+        self._X_ParentChild[changed_links] = self.engine.compute_X_ParentChild(q, changed_links)[0]
+        # union of the contiguous subtree ranges
+        boundaries = np.zeros(len(self.link_names)+1, dtype=int)
+        np.add.at(boundaries, changed_links, 1)
+        np.add.at(boundaries, self.model.subtree_end[changed_links], -1)
+        dirty = np.flatnonzero(np.cumsum(boundaries[:-1]) > 0)
+        depth = self.model.depth[dirty]
+        for d in np.unique(depth):
+            level = dirty[depth == d]
+            self._X_RootLink[level] = self._X_RootLink[self.model.parent[level]] @ self._X_ParentChild[level]
+        return dirty
+
+    def stream(self, joint_states: Iterable) -> Iterable[tuple[np.ndarray, np.ndarray]]:
+        """ consume joint states lazily, yield (indices of the updated links, `X_RootLink`) for each of them
+
+        Memory stays constant: the same read-only buffer is yielded every time,
+        copy it if you need to keep the poses.
+        """
+        for joint_state in joint_states:
+            yield self.update(joint_state), self.X_RootLink
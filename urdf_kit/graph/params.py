@@ -2,7 +2,13 @@ from __future__ import annotations
 from . import body_inertial_urdf
 import numpy as np
 import dataclasses
+import json
 import yaml # for stream output/ dumping
+from pathlib import Path
+
+# the libyaml bindings are much faster, if available
+_YamlDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
 
 """
@@ -33,7 +39,7 @@ def _handle_polymorphic_array(data, expected_shape: tuple[int], keep_threshold:
     data[mask] = 0
     return data.tolist()
 def _nice_printout(data: dict) -> str:
-    return yaml.safe_dump(data, sort_keys=False, default_flow_style=None) # tested on Python 3.9 and Pyyaml 6.0
+    return yaml.dump(data, Dumper=_YamlDumper, sort_keys=False, default_flow_style=None) # tested on Python 3.9 and Pyyaml 6.0
 
 
 @dataclasses.dataclass
@@ -110,4 +116,162 @@ class robot_dynamics():
         """
         the default one can be hard to inspect, hence this override function
         """
-        return _nice_printout(self.as_dict())
\ No newline at end of file
+        return _nice_printout(self.as_dict())
+
+# ==========================================================
+#   array-native export/ import
+#
+#   All joints are stacked into one array per field, e.g. (n, 4, 4) home poses,
+#   so that the formats below are converted in bulk
+#   instead of joint by joint and element by element.
+#   * NPZ: the arrays as they are (compact and exact)
+#   * JSON: one (nested) list per field
+#   * YAML: same layout as `as_dict` (i.e. readable by the existing consumers),
+#     dumped/ loaded with libyaml if available
+# ==========================================================
+_KINDS = {"robot_kinematics": robot_kinematics, "robot_dynamics": robot_dynamics}
+_NAME_FIELDS = ("joint_name", "parent_link_name", "child_link_name")
+
+def _as_arrays(model: union[robot_kinematics, robot_dynamics]) -> dict:
+    """ the stacked representation (names as lists of str, numbers as arrays) """
+    joints = model.joints
+    out = {
+        "kind": type(model).__name__,
+        "robot_name": model.robot_name,
+        **{f"{field_name}s": [getattr(joint, field_name) for joint in joints] for field_name in _NAME_FIELDS},
+        "home_pose": np.array([joint.home_pose for joint in joints], dtype=float).reshape(-1, 4, 4),
+        "screw_axis": np.array([joint.screw_axis for joint in joints], dtype=float).reshape(-1, 6),
+    }
+    if isinstance(model, robot_dynamics):
+        out["mass"] = np.array([joint.mass for joint in joints], dtype=float)
+        out["inertia"] = np.array([joint.inertia for joint in joints], dtype=float).reshape(-1, 3, 3)
+        out["base_mass"] = np.nan if model.base_mass is None else float(model.base_mass)
+        out["base_inertia"] = np.full((3, 3), np.nan) if model.base_inertia is None else np.array(model.base_inertia, dtype=float)
+    return out
+
+def _stacked(data: dict, key: str, shape: tuple[int]) -> np.ndarray:
+    """ the stacked array of one field, raise ValueError if it has not the expected shape """
+    out = np.asarray(data[key], dtype=float)
+    if out.size == 0 and np.prod(shape) == 0:
+        out = out.reshape(shape) # no joint: JSON/ YAML store an empty list whatever the trailing dimensions
+    if out.shape != shape:
+        raise ValueError(f"[{key}]: expect the shape {shape}, got {out.shape}")
+    return out
+
+def _from_arrays(data: dict) -> union[robot_kinematics, robot_dynamics]:
+    """ inverse of `_as_arrays`, the stacked arrays are validated up front (ValueError) before building the joints """
+    kind = str(data["kind"])
+    if kind not in _KINDS.keys():
+        raise ValueError(f"Unknown kind [{kind}], expect one of {list(_KINDS.keys())}")
+    names = [[str(name) for name in data[f"{field_name}s"]] for field_name in _NAME_FIELDS]
+    n = len(names[0])
+    if any(len(field_names) != n for field_names in names):
+        raise ValueError(f"Got {[len(field_names) for field_names in names]} names for the fields {list(_NAME_FIELDS)}!")
+    home_pose = _stacked(data, "home_pose", (n, 4, 4))
+    screw_axis = _stacked(data, "screw_axis", (n, 6))
+    if kind == "robot_kinematics":
+        joints = [
+            joint_body_kinematics_param(**dict(zip(_NAME_FIELDS, joint_names)), home_pose=X, screw_axis=S)
+            for *joint_names, X, S in zip(*names, home_pose, screw_axis)
+        ]
+        return robot_kinematics(robot_name=str(data["robot_name"]), joints=joints)
+
+    mass = _stacked(data, "mass", (n,))
+    if np.any(mass <= 1e-6):
+        i = int(np.argmax(mass <= 1e-6))
+        raise ValueError(f"joint [{names[0][i]}]: got mass {mass[i]}")
+    inertia = _stacked(data, "inertia", (n, 3, 3))
+    joints = [
+        joint_body_dynamics_param(**dict(zip(_NAME_FIELDS, joint_names)), home_pose=X, screw_axis=S, mass=m, inertia=I)
+        for *joint_names, X, S, m, I in zip(*names, home_pose, screw_axis, mass.tolist(), inertia)
+    ]
+    base_mass = float(data["base_mass"]) if data.get("base_mass") is not None else np.nan
+    return robot_dynamics(
+        robot_name = str(data["robot_name"]),
+        base_mass = None if np.isnan(base_mass) else base_mass,
+        base_inertia = None if np.isnan(base_mass) else np.asarray(data["base_inertia"], dtype=float),
+        joints = joints,
+    )
+
+def _yaml_layout(model: union[robot_kinematics, robot_dynamics]) -> dict:
+    """ same as `as_dict` but without the deep copy """
+    out = {"robot_name": model.robot_name}
+    if isinstance(model, robot_dynamics):
+        out["base_mass"], out["base_inertia"] = model.base_mass, model.base_inertia
+    field_names = [field.name for field in dataclasses.fields(model.joints[0])] if model.joints else []
+    out["joints"] = [{field_name: getattr(joint, field_name) for field_name in field_names} for joint in model.joints]
+    return out
+
+class _NoAliasDumper(_YamlDumper):
+    def ignore_aliases(self, data):
+        return True
+
+EXPORT_FORMATS = {".npz": "npz", ".json": "json", ".yaml": "yaml", ".yml": "yaml"}
+
+def _format_of(path: Path, fmt: str) -> str:
+    if fmt is not None:
+        if fmt not in EXPORT_FORMATS.values():
+            raise ValueError(f"Unknown format [{fmt}], expect one of {sorted(set(EXPORT_FORMATS.values()))}")
+        return fmt
+    try:
+        return EXPORT_FORMATS[path.suffix.lower()]
+    except KeyError:
+        raise ValueError(f"Cannot infer the format of {path}, expect one of the suffixes {list(EXPORT_FORMATS.keys())}") from None
+
+def save_params(model: union[robot_kinematics, robot_dynamics], path: union[str, Path], fmt: str = None):
+    """ export the extracted parameters
+
+    Arguments
+    ------------
+    fmt: "npz", "json" or "yaml", default: inferred from the file suffix
+    """
+    assert isinstance(model, (robot_kinematics, robot_dynamics))
+    path = Path(path)
+    fmt = _format_of(path, fmt)
+    if fmt == "yaml":
+        with open(path, "w") as f:
+            yaml.dump(_yaml_layout(model), f, Dumper=_NoAliasDumper, sort_keys=False, default_flow_style=None)
+        return
+    data = _as_arrays(model)
+    if fmt == "npz":
+        for field_name in _NAME_FIELDS:
+            data[f"{field_name}s"] = np.array(data[f"{field_name}s"], dtype=str)
+        with open(path, "wb") as f: # no implicit ".npz" suffix
+            np.savez(f, **data)
+    else:
+        for key, value in data.items():
+            if isinstance(value, np.ndarray):
+                data[key] = value.tolist()
+        if "base_mass" in data and np.isnan(data["base_mass"]): # JSON has no NaN
+            data["base_mass"], data["base_inertia"] = None, None
+        with open(path, "w") as f:
+            json.dump(data, f)
+
+def load_params(path: union[str, Path], fmt: str = None) -> union[robot_kinematics, robot_dynamics]:
+    """ import the parameters exported by `save_params`
+
+    The YAML files dumped from `as_dict` (e.g. by previous versions) are supported as well.
+    """
+    path = Path(path)
+    fmt = _format_of(path, fmt)
+    if fmt == "npz":
+        with np.load(path, allow_pickle=False) as npz:
+            return _from_arrays({key: npz[key] for key in npz.files})
+    if fmt == "json":
+        with open(path, "r") as f:
+            return _from_arrays(json.load(f))
+    with open(path, "r") as f:
+        data = yaml.load(f, Loader=_YamlLoader)
+    joints = data["joints"]
+    stacked = {
+        "kind": "robot_dynamics" if "base_mass" in data else "robot_kinematics",
+        "robot_name": data["robot_name"],
+        **{f"{field_name}s": [joint[field_name] for joint in joints] for field_name in _NAME_FIELDS},
+        "home_pose": [joint["home_pose"] for joint in joints],
+        "screw_axis": [joint["screw_axis"] for joint in joints],
+    }
+    if stacked["kind"] == "robot_dynamics":
+        stacked["mass"] = [joint["mass"] for joint in joints]
+        stacked["inertia"] = [joint["inertia"] for joint in joints]
+        stacked["base_mass"], stacked["base_inertia"] = data["base_mass"], data["base_inertia"]
+    return _from_arrays(stacked)
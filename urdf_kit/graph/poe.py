@@ -0,0 +1,79 @@
+from __future__ import annotations
+import numpy as np
+
+from .params import robot_kinematics
+from ..maths.batch import exp_twist
+
+"""
+Product-of-exponentials (PoE) evaluation of extracted kinematic parameters.
+
+Each joint contributes
+    X_ParentChild(theta) = exp([S] theta) @ M
+where M is the home pose and S the screw axis expressed in the parent frame,
+cf. `joint_body_kinematics_param`.
+"""
+
+class poe_kinematics:
+    def __init__(self, params: robot_kinematics):
+        """ prepare the PoE evaluation of a `robot_kinematics` (or `robot_dynamics`) 
+
+        The joints must be sorted top-down (as by `kinematic_tree.extract_kinematics`).
+        Joints with an all-zero screw axis are fixed,
+        the others are the degrees of freedom (columns of `q`) in the given order.
+
+        Data members
+        -----------------
+        link_names: the root link, then the child link of each joint
+        joint_names: the movable joints
+        """
+        self.robot_name = params.robot_name
+        n_joints = len(params.joints)
+        if n_joints == 0:
+            raise ValueError("No joints to evaluate!")
+        root_candidates = {joint.parent_link_name for joint in params.joints} - {joint.child_link_name for joint in params.joints}
+        if len(root_candidates) != 1:
+            raise ValueError(f"Expect exactly one root link, got {root_candidates}")
+        self.link_names = [root_candidates.pop()]
+        link_indices = {self.link_names[0]: 0}
+
+        self.parent = np.empty(n_joints, dtype=int) # index into `link_names`
+        self.home_pose = np.empty((n_joints, 4, 4))
+        self.screw_axis = np.empty((n_joints, 6))
+        for i, joint in enumerate(params.joints):
+            if joint.parent_link_name not in link_indices.keys():
+                raise ValueError(f"joint [{joint.joint_name}] comes before its parent link [{joint.parent_link_name}], please sort the joints top-down!")
+            self.parent[i] = link_indices[joint.parent_link_name]
+            link_indices[joint.child_link_name] = i+1
+            self.link_names.append(joint.child_link_name)
+            self.home_pose[i] = joint.home_pose
+            self.screw_axis[i] = joint.screw_axis
+        self._movable = np.flatnonzero(np.any(self.screw_axis != 0, axis=1))
+        self.joint_names = [params.joints[i].joint_name for i in self._movable]
+    
+    @property
+    def n_dof(self) -> int:
+        return len(self.joint_names)
+    def __repr__(self):
+        return f"poe_kinematics(robot={self.robot_name}, {len(self.link_names)} links, {self.n_dof} DoF)"
+
+    def compute(self, q: np.ndarray) -> np.ndarray:
+        """ poses of all links w.r.t. the root link
+        
+        q: (N, n_dof) or (n_dof,)
+        return: (N, n_links, 4, 4) or (n_links, 4, 4), ordered as `link_names`
+        """
+        q = np.asarray(q, dtype=float)
+        is_single = q.ndim == 1
+        q = q[np.newaxis] if is_single else q # not `reshape(-1, n_dof)`, which fails for n_dof == 0
+        if q.ndim != 2 or q.shape[1] != self.n_dof:
+            raise ValueError(f"Expect joint positions of shape (N, {self.n_dof}), got {q.shape}")
+
+        theta = np.zeros((q.shape[0], len(self.parent)))
+        theta[:, self._movable] = q
+        # all the exponentials in one go, vectorized over the batch and the joints
+        X_ParentChild = exp_twist(self.screw_axis, theta) @ self.home_pose
+        out = np.empty((q.shape[0], len(self.link_names), 4, 4))
+        out[:, 0] = np.eye(4)
+        for i, parent in enumerate(self.parent):
+            out[:, i+1] = out[:, parent] @ X_ParentChild[:, i]
+        return out[0] if is_single else out
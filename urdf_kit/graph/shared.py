@@ -0,0 +1,173 @@
+from __future__ import annotations
+import dataclasses
+import sys
+import threading
+import numpy as np
+from pathlib import Path
+from multiprocessing import shared_memory
+
+from .compiled import compiled_tree
+
+"""
+Share a compiled model across processes without copying nor parsing.
+
+`kinematic_tree` holds `xml.etree` elements, which are expensive to pickle and rebuild
+in every worker of a process pool. Instead, the parent process publishes the
+arrays of a `compiled_tree` into ONE block, either
+* a `multiprocessing.shared_memory` segment, or
+* a memory-mapped file (e.g. on /dev/shm or a node-local disk),
+and sends the small, picklable `shared_model_spec` to the workers.
+Each worker attaches to the block and gets a `compiled_tree` whose arrays are
+read-only NumPy views into the block.
+
+Usage
+-----------
+    with publish_shared(tree.compile()) as published: # parent process
+        pool.map(job, [published.spec]*n_jobs)
+    ...
+    def job(spec): # worker process
+        model = attach_shared(spec)
+        engine = fk_engine(model)
+
+The publisher owns the block: keep it open until all the workers are done.
+Only the fields of `compiled_tree` are shared, the derived data
+(screw axes, LCA index, ...) are cheap to recompute on attachment.
+"""
+
+_ALIGNMENT = 64 # [bytes] cache line
+_STRING_FIELDS = ("robot_name", "link_names", "link_joint_names")
+_ARRAY_FIELDS = tuple(f.name for f in dataclasses.fields(compiled_tree) if f.name not in _STRING_FIELDS)
+
+@dataclasses.dataclass(frozen=True)
+class shared_model_spec:
+    """ everything needed to attach to a published model (small and picklable) """
+    robot_name: str
+    link_names: tuple[str]
+    link_joint_names: tuple[str]
+    layout: tuple[tuple[str, int, tuple[int], str]] # (field name, offset [bytes], shape, dtype)
+    size: int # [bytes]
+    shm_name: str = None # either this one
+    path: str = None # or this one
+
+def _calc_layout(model: compiled_tree) -> tuple[tuple, int]:
+    layout = []
+    offset = 0
+    for field_name in _ARRAY_FIELDS:
+        data = getattr(model, field_name)
+        layout.append((field_name, offset, data.shape, data.dtype.str))
+        offset += -(-data.nbytes // _ALIGNMENT)*_ALIGNMENT
+    return tuple(layout), max(offset, 1) # zero-size segments are not allowed
+
+def _views(buffer, layout: tuple) -> dict[str, np.ndarray]:
+    out = dict()
+    for field_name, offset, shape, dtype in layout:
+        view = np.ndarray(shape, dtype=np.dtype(dtype), buffer=buffer, offset=offset)
+        view.flags.writeable = False
+        out[field_name] = view
+    return out
+
+def _fill(buffer, model: compiled_tree, layout: tuple):
+    for field_name, offset, shape, dtype in layout:
+        np.ndarray(shape, dtype=np.dtype(dtype), buffer=buffer, offset=offset)[...] = getattr(model, field_name)
+
+class published_model:
+    def __init__(self, spec: shared_model_spec, shm: shared_memory.SharedMemory = None):
+        """ use `publish_shared`/ `publish_memmap` instead
+
+        Data members
+        ------------
+        spec: send it to the workers
+        """
+        self.spec = spec
+        self._shm = shm
+    def __repr__(self):
+        location = f"shm={self.spec.shm_name}" if self.spec.shm_name is not None else f"path={self.spec.path}"
+        return f"published_model(robot={self.spec.robot_name}, {location}, {self.spec.size} bytes)"
+    def __enter__(self) -> published_model:
+        return self
+    def __exit__(self, *args):
+        self.close()
+    def close(self):
+        """ release the block (the workers' views become invalid) """
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+        elif self.spec.path is not None:
+            Path(self.spec.path).unlink(missing_ok=True)
+
+def publish_shared(model: compiled_tree, name: str = None) -> published_model:
+    """ copy the arrays of a compiled model into a new shared memory segment
+
+    Arguments
+    ------------
+    name: name of the segment, default: a random one
+    """
+    assert isinstance(model, compiled_tree)
+    layout, size = _calc_layout(model)
+    shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+    _fill(shm.buf, model, layout)
+    spec = shared_model_spec(
+        robot_name=model.robot_name, link_names=model.link_names, link_joint_names=model.link_joint_names,
+        layout=layout, size=size, shm_name=shm.name,
+    )
+    return published_model(spec, shm)
+
+def publish_memmap(model: compiled_tree, path: str | Path) -> published_model:
+    """ write the arrays of a compiled model into a file to be memory-mapped by the workers
+
+    Unlike `publish_shared`, the file survives the publisher (until `close`),
+    so it can be attached to by unrelated processes as well.
+    """
+    assert isinstance(model, compiled_tree)
+    layout, size = _calc_layout(model)
+    path = Path(path).resolve()
+    buffer = np.memmap(path, dtype=np.uint8, mode="w+", shape=(size,))
+    _fill(buffer, model, layout)
+    buffer.flush()
+    del buffer
+    spec = shared_model_spec(
+        robot_name=model.robot_name, link_names=model.link_names, link_joint_names=model.link_joint_names,
+        layout=layout, size=size, path=str(path),
+    )
+    return published_model(spec)
+
+_TRACKER_LOCK = threading.Lock() # guards the temporary swap of `resource_tracker.register` below
+
+def _open_shm(name: str) -> shared_memory.SharedMemory:
+    """ attach without handing the segment over to the resource tracker of this process,
+    otherwise the segment gets unlinked (or warned about) when a worker exits
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # NOTE: unregistering afterwards is not an option since the tracker may be shared with the publisher (fork)
+    # The swap is process-wide: without the lock, two threads attaching concurrently could save each other's
+    # patched version as the "original" one and leave the tracker patched for good.
+    from multiprocessing import resource_tracker
+    with _TRACKER_LOCK:
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None if rtype == "shared_memory" else register(name, rtype)
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+def attach_shared(spec: shared_model_spec) -> compiled_tree:
+    """ a compiled model whose arrays are read-only views into the published block (no copy)
+
+    The block stays mapped as long as the returned model is alive.
+    """
+    assert isinstance(spec, shared_model_spec)
+    if spec.shm_name is not None:
+        owner = _open_shm(spec.shm_name)
+        buffer = owner.buf
+    elif spec.path is not None:
+        owner = buffer = np.memmap(spec.path, dtype=np.uint8, mode="r", shape=(spec.size,))
+    else:
+        raise ValueError("The spec has neither a shared memory name nor a file path!")
+    model = compiled_tree(
+        robot_name=spec.robot_name, link_names=tuple(spec.link_names), link_joint_names=tuple(spec.link_joint_names),
+        **_views(buffer, spec.layout),
+    )
+    object.__setattr__(model, "_shared_owner", owner) # keep the mapping alive
+    return model
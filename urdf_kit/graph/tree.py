@@ -6,13 +6,17 @@ from spatialmath import SE3
 from collections import deque
 from dataclasses import dataclass
 
-from . import get_X_ParentJoint, get_X_CparentCchild, get_origin, write_origin
+from . import get_X_ParentJoint, get_X_JointChild, get_X_CparentCchild, get_origin, write_origin, write_origins
 from . import grab_all_joints, grab_link_elem_by_name, floatList_from_vec3String, _get_axis_xyz
 from .simplify import fix_revolute_joint
 from . import body_inertial_urdf
+from ..maths.inertial import _make_dummy_inertial_elem
 from .params import joint_body_kinematics_param, robot_kinematics
 from .params import joint_body_dynamics_param, robot_dynamics
 from .. import color_code
+from ..index import urdf_index
+from .compiled import compiled_tree
+from .kinematics import fk_engine
 
 """
 Unlike the `edit_xxxx` modules,
@@ -123,11 +127,16 @@ class body_entry:
     @property
     def X_ParentJoint(self) -> SE3:
         return get_X_ParentJoint(self.joint_elem)
-    def get_X_ParentChild(self, *args) -> SE3:
+    def get_X_ParentChild(self, joint_position: float = 0.) -> SE3:
+        """ pose of the child link w.r.t. the parent link 
+        (the joint position is ignored for fixed joints)
+
+        See `urdf_kit.graph.kinematics.fk_engine` for many links/ configurations at once.
+        """
         if self.is_fixed_wrt_parent():
             return get_X_ParentJoint(self.joint_elem)
         else:
-            raise NotImplementedError("At the moment, only fixed-type joint. Yours is "+self.joint_type+".")
+            return get_X_ParentJoint(self.joint_elem) @ get_X_JointChild(self.joint_elem, joint_position)
 
     @property
     def screwAx_ParentChild_Parent(self) -> np.ndarray:
@@ -141,13 +150,15 @@ class body_entry:
 
         (linear part-first notation)
         """
-        X_ParentJoint = get_X_ParentJoint(self.joint_elem)
+        return self._screwAx_ParentChild_Parent(get_X_ParentJoint(self.joint_elem))
+    def _screwAx_ParentChild_Parent(self, X_ParentJoint: SE3) -> np.ndarray:
+        """ same as `screwAx_ParentChild_Parent` but reusing an already parsed joint origin """
         R_ParentJoint = X_ParentJoint.R
         ax_Joint = _get_axis_xyz(self.joint_elem)
         ax_Parent = R_ParentJoint@ax_Joint
-        if self.joint_type == "prisimatic":
+        if self.joint_type == "prismatic":
             return np.array([*ax_Parent, 0,0,0])
-        elif self.joint_type == "revolute":
+        elif self.joint_type in ("revolute", "continuous"):
             pos_JointParent_Parent = - X_ParentJoint.t
             return np.array([*(np.cross(ax_Parent, pos_JointParent_Parent)), *ax_Parent])
         else:
@@ -168,7 +179,21 @@ class body_entry:
             child_link_name = self.childLink_name, 
         )
     def extract_params_joint_body_kinematics(self) -> joint_body_kinematics_param:
-        raise NotImplementedError()
+        """ home pose and screw axis between the two link frames (not the CoM frames),
+        see `joint_body_kinematics_param` for the convention.
+
+        The screw axis of a fixed joint is all zeros.
+        """
+        X_ParentJoint = get_X_ParentJoint(self.joint_elem) # parsed once, used twice
+        if self.is_fixed_wrt_parent():
+            screw_axis = np.zeros(6)
+        else:
+            screw_axis = self._screwAx_ParentChild_Parent(X_ParentJoint)
+        return joint_body_kinematics_param(
+            home_pose = X_ParentJoint.A, # joint position := 0 means joint frame == child link frame
+            screw_axis = screw_axis,
+            **self.extract_names()
+        )
     def extract_params_joint_body_dynamics(self) -> joint_body_dynamics_param:
         inertial_param = body_inertial_urdf(self.this_link_elem)
         return joint_body_dynamics_param(
@@ -200,60 +225,110 @@ class kinematic_tree:
         self.urdf_root = urdf_root
 
         #------more simple input validation ----------------------
-        num_links = len(urdf_root.findall("link"))
-        num_joints = len(urdf_root.findall("joint"))
+        # one pass over <robot> for all the name lookups below
+        self.index = urdf_index(urdf_root)
+        num_links = len(self.index.links)
+        num_joints = len(self.index.joints)
         assert num_links == num_joints + 1, f"You have {num_links} links but {num_joints} joints."
         
         # ---------------------------
-        self.root_name = get_root_link_name(urdf_root)
+        for child_link_name in self.index.parent_joint.keys():
+            if child_link_name not in self.index.links.keys():
+                raise ValueError(f"Joint [{self.index.parent_joint[child_link_name]}] says its child link is '{child_link_name}', which is not found/ has already been claimed by any child link")
+        root_link_name_candidates = self.index.root_link_names()
+        assert len(root_link_name_candidates) == 1, f"but got {len(root_link_name_candidates)} 'root' link(s)"
+        self.root_name = root_link_name_candidates[0]
 
         # -----------------------------
         # build the tree by parsing all the joints
         self.links = dict() # dict[body_entry] 
         self.links[self.root_name] = None # special treatment for the root (TODO: a better way?)
-        # this list should not contain the root link
-        list_link_elems = list(urdf_root.findall("link"))
-        for link_elem in self.urdf_root.findall("link"):
-            if link_elem.get('name') == self.root_name:
-                list_link_elems.remove(link_elem)
-        for joint_elem in urdf_root.findall("joint"):
-            link_name = joint_elem.find("child").get("link")
-            assert link_name not in self.links.keys(), "Link ["+link_name+"] should only have one parent joint but found 2."
-            parent_link_elem = grab_link_elem_by_name(self.urdf_root, joint_elem.find("parent").get("link"))
-            child_link_elem_found = False
-            for link_elem in list_link_elems:
-                if link_elem.get("name") == link_name:
-                    self.links[link_name] = body_entry(
-                        joint_elem = joint_elem,
-                        this_link_elem = link_elem,
-                        parent_link_elem = parent_link_elem
-                    )
-                    list_link_elems.remove(link_elem) # to speed up
-                    child_link_elem_found = True
-                    break # goto processing the next joint
-            if not child_link_elem_found:
-                raise ValueError(f"Joint [{joint_elem.get('name')}] says its child link is '{link_name}', which is not found/ has already been claimed by any child link")
+        for joint_name, joint_elem in self.index.joints.items():
+            link_name = self.index.child_link_name(joint_name)
+            self.links[link_name] = body_entry(
+                joint_elem = joint_elem,
+                this_link_elem = self.index.link(link_name),
+                parent_link_elem = self.index.link(self.index.parent_link_name(joint_name))
+            )
+
+        # live adjacency, updated in-place whenever the topology is altered
+        self.children = {link_name: self.index.child_link_names(link_name) for link_name in self.links.keys()} # dict[list[str]]
+        self.parents = {link_name: self.index.parent_link_name(joint_name) for link_name, joint_name in self.index.parent_joint.items()} # dict[str]
+        self.parents[self.root_name] = None
     
+    def get_children_names(self, link_name: str) -> list[str]:
+        """ the direct descendents of this link (read-only please) 
+        
+        Unlike `calc_descendent_adjacency`, this is a lookup
+        of the adjacency maintained by this object.
+        """
+        assert isinstance(link_name,str)
+        assert link_name in self.links.keys(), "got "+link_name+", recognized links:"+str(self.links.keys())
+        return self.children[link_name]
+    def get_parent_name(self, link_name: str) -> str:
+        """ return None for the root link """
+        assert link_name in self.links.keys(), "got "+link_name+", recognized links:"+str(self.links.keys())
+        return self.parents[link_name]
     def get_children_entries(self, link_name: str) -> list[body_entry]:
         """ convenience function
         """
-        assert isinstance(link_name,str)
-        assert link_name in self.links.keys()
-        table = calc_descendent_adjacency(self.urdf_root)
-        return [self.links[descendent_link_name] for descendent_link_name in table[link_name] ]
+        return [self.links[descendent_link_name] for descendent_link_name in self.get_children_names(link_name)]
+    def get_adjacency(self) -> dict[list[str]]:
+        """ same format as `calc_descendent_adjacency` (leaf links are omitted) """
+        return {name: list(children) for name, children in self.children.items() if len(children) > 0}
 
     def _is_leaf_link(self, link_name: str, return_table: bool = False) -> tuple [bool, dict[list[str]] ]:
-        assert isinstance(link_name,str)
-        assert link_name in self.links.keys(), "got "+link_name+", recognized links:"+str(self.links.keys())
-        adjacency_table = calc_descendent_adjacency(self.urdf_root)
-        ans = not link_name in adjacency_table.keys()
+        ans = len(self.get_children_names(link_name)) == 0
         if return_table:
-            return ans, adjacency_table
+            return ans, self.get_adjacency()
         else:
             return ans
     def is_leaf_link(self, link_name: str)-> bool:
         return self._is_leaf_link(link_name, return_table=False)
 
+    # ------------------------------------------
+    # keeping the adjacency in sync with the XML data
+    # ------------------------------------------
+    def _reroute(self, link_name: str, new_parent_name: str) -> None:
+        """ let `link_name` hang under `new_parent_name` 
+        (only the book-keeping, the joint origin is untouched) 
+        """
+        entry = self.links[link_name]
+        entry.joint_elem.find("parent").attrib["link"] = new_parent_name
+        entry.parent_link_elem = self.index.link(new_parent_name)
+        self.index.reparent_joint(entry.joint_name, new_parent_name)
+        self.children[self.parents[link_name]].remove(link_name)
+        self.children[new_parent_name].append(link_name)
+        self.parents[link_name] = new_parent_name
+    def _forget_links(self, link_names: list[str], dead_elems: set[Element] = None) -> None:
+        """ remove the <link>s and their <joint>s from both the XML data and the adjacency 
+
+        The links must be given bottom-up, i.e. each one is a leaf by the time it is removed.
+        If `dead_elems` is given, the XML elements are only collected into it
+        (to be removed later in one sweep by `_remove_dead_elems`), 
+        otherwise they are removed right away.
+        """
+        sweep_now = dead_elems is None
+        if sweep_now:
+            dead_elems = set()
+        for link_name in link_names:
+            assert len(self.children[link_name]) == 0, f"link [{link_name}] still has children!"
+            entry = self.links[link_name]
+            dead_elems.add(entry.this_link_elem)
+            dead_elems.add(entry.joint_elem)
+            self.index.remove_joint(entry.joint_name)
+            self.index.remove_link(link_name)
+            self.children[self.parents[link_name]].remove(link_name)
+            del self.children[link_name]
+            del self.parents[link_name]
+            del self.links[link_name]
+        if sweep_now:
+            self._remove_dead_elems(dead_elems)
+    def _remove_dead_elems(self, dead_elems: set[Element]) -> None:
+        # one sweep over <robot> instead of one `Element.remove` (itself a linear search) per element
+        if dead_elems:
+            self.urdf_root[:] = [elem for elem in self.urdf_root if elem not in dead_elems]
+
     def __len__(self):
         return len(self.links.keys())
 
@@ -274,26 +349,23 @@ class kinematic_tree:
         assert isinstance(method,str)
         assert method in kinematic_tree._sorting_method
 
-        table = calc_descendent_adjacency(self.urdf_root)
-        if len(table) == 0:
+        if len(self.links) == 1:
             print("  This robot [", self.urdf_root.get("name"),"] has just 1 link so nothing to traverse")
-            assert len(self.links) == 1, "Should be exact one link, maybe some bug leading inconsistence between this manager object and the underlying XML data?"
             return
         # initialize the buffer with those/ that directly under the root link
-        buffer = deque(table[self.root_name]) # list[str]
+        buffer = deque(self.children[self.root_name]) # list[str]
         while len(buffer) > 0:
             # visit this link
             this_link_name =  buffer.pop()
             
             # expand this link's descendence
-            if this_link_name in table.keys(): # i.e.  not leaf node
-                for child_link_name in table[this_link_name]:
-                    if method == 'depth_first':
-                        buffer.append(child_link_name)
-                    elif method == 'breadth_first':
-                        buffer.appendleft(child_link_name)
-                    else:
-                        raise NotImplementedError()
+            for child_link_name in self.children[this_link_name]:
+                if method == 'depth_first':
+                    buffer.append(child_link_name)
+                elif method == 'breadth_first':
+                    buffer.appendleft(child_link_name)
+                else:
+                    raise NotImplementedError()
             
             yield this_link_name
     
@@ -301,7 +373,6 @@ class kinematic_tree:
         """
         supported link_sorting method: breadth_first and depth_first
         """
-        table = calc_descendent_adjacency(self.urdf_root)
         print("-"*30)
         print("robot name: ", self.urdf_root.get("name"))
         print("root link name: ", self.root_name)
@@ -313,7 +384,7 @@ class kinematic_tree:
             if show_SE3:
                 print("   X_ParentJoint =")
                 print(this_link_entry.X_ParentJoint)
-    def merge_fixed_joints(self, link_whitelist: list[str] =[]):
+    def merge_fixed_joints(self, link_whitelist: list[str] =[], scheduled: bool = False):
         """ in-place modification of the XML data as well as this object. 
         
         By merging fixed joints, we get a simpler graph,
@@ -340,6 +411,12 @@ class kinematic_tree:
             BY removing the associated link entry (self.links)
             TODO warn the user if other types of elements, e.g. <transmission>, 
             make references to the deleted joint/ element, or when the <link> element still contains stuff
+
+        With `scheduled=True`, the removal is planned instead:
+        each kept link absorbs its whole cluster of fixed descendents at once, 
+        i.e. the transforms and the inertia of a cluster are composed in memory 
+        in one top-down pass and written back to the XML data in one go.
+        This scales linearly with the number of links.
         """
         print("="*50)
         print("Attempting to remove fixed joints as much as possible")
@@ -367,37 +444,61 @@ class kinematic_tree:
             print(" (format: ", body_entry.describe_connection_format(), ")")
             for link_name in pending_list:
                 print(self.links[link_name].describe_connection())
-        
-        for linkName_Removee in pending_list:
+        if scheduled:
+            self._merge_fixed_joints_scheduled(pending_list)
+            return
+
+        # The <origin> elements to rewrite and their new values, written in bulk at the end.
+        # Until then, the pending values take precedence over the XML data.
+        X_pending = dict() # <origin> element ---> (4, 4)
+        def get_X_pending(originElem: Element) -> np.ndarray:
+            if originElem in X_pending:
+                return X_pending[originElem]
+            return get_origin(originElem, backend="numpy")
+
+        # Bottom-up (children before their parents), so that the joint of a removee is never
+        # pending by the time `fuse_child_link` reads it from the XML data.
+        # The siblings follow the depth-first order, i.e. the geometries end up in the same order as with `scheduled=True`.
+        removees = set(pending_list)
+        visiting_order = {link_name: i for i, link_name in enumerate(self.gen_sorted_list_topdown('depth_first'))}
+        order_bottomup = []
+        stack = [(self.root_name, False)]
+        while stack:
+            link_name, is_expanded = stack.pop()
+            if is_expanded:
+                if link_name in removees:
+                    order_bottomup.append(link_name)
+                continue
+            stack.append((link_name, True))
+            stack.extend((child_name, False) for child_name in sorted(self.children[link_name], key=visiting_order.get, reverse=True))
+
+        dead_elems = set() # removed from the XML data in one sweep at the end
+        for linkName_Removee in order_bottomup:
             jointElem_Removee = self.links[linkName_Removee].joint_elem
-            linkName_Newparent = jointElem_Removee.find("parent").get("link")
+            linkName_Newparent = self.parents[linkName_Removee]
             # fixed joint means removee's joint frame == removee's link frame
-            X_NewparentRemovee = self.links[linkName_Removee].X_ParentJoint
+            X_NewparentRemovee = self.links[linkName_Removee].X_ParentJoint.A
             # X_NewparentRemovee = self.links[linkName_Newparent].X_ParentJoint  # oops...
             
             # reroute the joints that spawn joints spawning out of this link
-            # (adjacency table would become inconsistent so regenerate it on demand)
-            # TODO: scheduling of the order to remove the links, 
-            #       thereby eliminating the need to recalculate adjacency
-            removee_is_leaf, adjTab = self._is_leaf_link(linkName_Removee, return_table=True) # oops...
-            if not removee_is_leaf:
-                for linkName_Grandchild in adjTab[linkName_Removee]:
-                    # under the hood, modifying the XML contents
-                    # nothing needs to be changed in `self.links`
-                    jointElem_Granchild = self.links[linkName_Grandchild].joint_elem
-                    # 1. update <joint/parent/@link>
-                    jointElem_Granchild.find("parent").attrib["link"] = linkName_Newparent
-                    # 2  update <joint/origin>
-                    X_RemoveeGrandchildjoint = self.links[linkName_Grandchild].X_ParentJoint
-                    X_NewparentGrandchild = X_NewparentRemovee @ X_RemoveeGrandchildjoint
-                    write_origin(jointElem_Granchild.find("origin"), X_NewparentGrandchild)
-                    # other contents of this <joint> remains untouched
-            del adjTab # to avoid accidentally reusing such inconsistent data.
+            # (the adjacency is updated in-place so there is nothing to regenerate)
+            for linkName_Grandchild in list(self.children[linkName_Removee]):
+                jointElem_Granchild = self.links[linkName_Grandchild].joint_elem
+                # 1. update <joint/parent/@link>
+                self._reroute(linkName_Grandchild, linkName_Newparent)
+                # 2  update <joint/origin>
+                originElem = jointElem_Granchild.find("origin")
+                if originElem is None:
+                    originElem = ET.SubElement(jointElem_Granchild, "origin")
+                    X_pending[originElem] = np.eye(4)
+                X_RemoveeGrandchildjoint = get_X_pending(originElem)
+                X_pending[originElem] = X_NewparentRemovee @ X_RemoveeGrandchildjoint
+                # other contents of this <joint> remains untouched
             
             # move its visual and collision elements one link up.
             # which also doesn't harm the consistency of `self.links`
             linkElem_Removee = self.links[linkName_Removee].this_link_elem
-            linkElem_Newparent = self.urdf_root.find(f"link/[@name='{linkName_Newparent}']")
+            linkElem_Newparent = self.index.link(linkName_Newparent)
             #
             # properly should have chosen lxml ???
             # for subElem_Removee in linkElem_Removee.findall("."): # wrong!
@@ -407,20 +508,17 @@ class kinematic_tree:
             # some patchy solution
             def move_geom_elem_up_one_level(geom_elem: Element):
                 # 1. update the pose accordingly
-                originElem = geomElem_Removee.find("origin")
+                originElem = geom_elem.find("origin")
                 if originElem is None:
-                    # TODO --- test this branch
                     # URDF spec: <origin> is optional for <visual> and <collision> 
-                    X_RemoveeGeom = SE3.Tx(0) # identity 
                     originElem = ET.SubElement(geom_elem, "origin")
-                else:
-                    X_RemoveeGeom = get_origin(originElem)
-                X_NewparentGeom = X_NewparentRemovee @ X_RemoveeGeom
-                write_origin(originElem, X_NewparentGeom)
+                    X_pending[originElem] = np.eye(4)
+                X_RemoveeGeom = get_X_pending(originElem)
+                X_pending[originElem] = X_NewparentRemovee @ X_RemoveeGeom
                 # 2. detach the element from that link
-                linkElem_Removee.remove(geomElem_Removee)
+                linkElem_Removee.remove(geom_elem)
                 # 3. attach the modified elem to the new parent link
-                linkElem_Newparent.append(geomElem_Removee)
+                linkElem_Newparent.append(geom_elem)
             for geomElem_Removee in linkElem_Removee.findall("visual"):
                 move_geom_elem_up_one_level(geomElem_Removee)
             for geomElem_Removee in linkElem_Removee.findall("collision"):
@@ -441,11 +539,172 @@ class kinematic_tree:
             print(color_code['r'])
             print(f"removing link [{linkName_Removee}] and its associated joint [{jointElem_Removee.get('name')}]")
             print(color_code['w'])
-            self.urdf_root.remove(linkElem_Removee)
-            self.urdf_root.remove(jointElem_Removee)
-            del self.links[linkName_Removee] # to maintain consistence
+            self._forget_links([linkName_Removee], dead_elems) # to maintain consistence
+        if X_pending:
+            write_origins(list(X_pending.keys()), np.stack(list(X_pending.values())))
+        self._remove_dead_elems(dead_elems)
+    def _merge_fixed_joints_scheduled(self, pending_list: list[str]) -> None:
+        """ see `merge_fixed_joints` """
+        removees = set(pending_list)
+        # ----------------------------------
+        # 1. plan: top-down, find the kept link absorbing each removee
+        #    and the pose of the removee w.r.t. that kept link
+        # ----------------------------------
+        keeper = {self.root_name: self.root_name}
+        X_KeeperLink = {self.root_name: np.eye(4)} # only needed for the removees
+        clusters = dict() # kept link name --> removee names (top-down)
+        rerouted = [] # kept links whose parent is a removee
+        order_topdown = list(self.gen_sorted_list_topdown('depth_first'))
+        for link_name in order_topdown:
+            parent_name = self.parents[link_name]
+            if link_name in removees:
+                keeper[link_name] = keeper[parent_name]
+                # fixed joint means the joint frame == the child link frame
+                X_KeeperLink[link_name] = X_KeeperLink[parent_name] @ self.links[link_name].X_ParentJoint.A
+                clusters.setdefault(keeper[link_name], []).append(link_name)
+            else:
+                keeper[link_name] = link_name
+                X_KeeperLink[link_name] = np.eye(4)
+                if parent_name in removees:
+                    rerouted.append(link_name)
+
+        # the <origin> elements to rewrite and their new values, written in bulk
+        origin_elems, X_new = [], []
+        # ----------------------------------
+        # 2. reroute the joints of the kept links hanging under a removee
+        # ----------------------------------
+        for link_name in rerouted:
+            parent_name = self.parents[link_name]
+            jointElem = self.links[link_name].joint_elem
+            X_KeeperJoint = X_KeeperLink[parent_name] @ self.links[link_name].X_ParentJoint.A
+            self._reroute(link_name, keeper[parent_name])
+            originElem = jointElem.find("origin")
+            if originElem is None:
+                originElem = ET.SubElement(jointElem, "origin")
+            origin_elems.append(originElem)
+            X_new.append(X_KeeperJoint)
+
+        # ----------------------------------
+        # 3. per cluster: move the geometries and compose the inertia
+        # ----------------------------------
+        for keeper_name, members in clusters.items():
+            linkElem_Keeper = self.index.link(keeper_name)
+            print(color_code['r'])
+            print(f"merging link(s) {members} into link [{keeper_name}]")
+            print(color_code['w'])
+            moved_geom_elems = []
+            for member_name in members:
+                linkElem_Member = self.links[member_name].this_link_elem
+                for geomElem in linkElem_Member:
+                    if geomElem.tag not in ("visual", "collision"):
+                        continue
+                    originElem = geomElem.find("origin")
+                    if originElem is None:
+                        # URDF spec: <origin> is optional for <visual> and <collision> 
+                        originElem = ET.SubElement(geomElem, "origin")
+                        X_MemberGeom = np.eye(4)
+                    else:
+                        X_MemberGeom = get_origin(originElem, backend="numpy")
+                    origin_elems.append(originElem)
+                    X_new.append(X_KeeperLink[member_name] @ X_MemberGeom)
+                    moved_geom_elems.append(geomElem)
+                linkElem_Member[:] = [elem for elem in linkElem_Member if elem.tag not in ("visual", "collision")]
+            linkElem_Keeper.extend(moved_geom_elems)
+
+            self._write_composite_inertial(linkElem_Keeper, [(member_name, X_KeeperLink[member_name]) for member_name in members])
+        write_origins(origin_elems, np.array(X_new).reshape(-1, 4, 4))
+        
+        # ----------------------------------
+        # 4. bottom-up removal, in one sweep over the XML data
+        # ----------------------------------
+        self._forget_links([link_name for link_name in reversed(order_topdown) if link_name in removees])
+    
+    def _write_composite_inertial(self, linkElem_Keeper: Element, members: list[tuple[str, np.ndarray]]):
+        """ fuse the inertia of all `members` (name, X_KeeperMember) into the kept link
+
+        Same result as fusing them one by one with `body_inertial_urdf.fuse_child_link`:
+        the composite inertia is expressed in a frame 
+        with the orientation of the kept link's CoM frame and 
+        its origin at the new center of mass.
+        """
+        masses, X_KeeperCs, inertias = [], [], []
+        if linkElem_Keeper.find("inertial") is not None:
+            inertial_Keeper = body_inertial_urdf(linkElem_Keeper)
+            R_KeeperCkeeper = inertial_Keeper.X_LinkCom.R
+            masses.append(inertial_Keeper.m)
+            X_KeeperCs.append(inertial_Keeper.X_LinkCom.A)
+            inertias.append(inertial_Keeper.I)
+        else:
+            R_KeeperCkeeper = np.eye(3)
+        for member_name, X_KeeperMember in members:
+            linkElem_Member = self.links[member_name].this_link_elem
+            if linkElem_Member.find("inertial") is None:
+                continue # dummy link
+            inertial_Member = body_inertial_urdf(linkElem_Member)
+            masses.append(inertial_Member.m)
+            X_KeeperCs.append(X_KeeperMember @ inertial_Member.X_LinkCom.A)
+            inertias.append(inertial_Member.I)
+            linkElem_Member.remove(linkElem_Member.find("inertial"))
+        if len(masses) == 0:
+            return # all dummies, nothing to fuse
+        masses = np.array(masses)
+        X_KeeperCs = np.array(X_KeeperCs)
+        inertias = np.array(inertias)
+
+        total_mass = np.sum(masses)
+        pos_KeeperCnew = masses @ X_KeeperCs[:, :3, 3] / total_mass
+        # everything below is w.r.t. the orientation of the keeper's CoM frame
+        R = R_KeeperCkeeper.T @ X_KeeperCs[:, :3, :3] # R_CkeeperCi
+        offsets = (X_KeeperCs[:, :3, 3] - pos_KeeperCnew) @ R_KeeperCkeeper # vec_CnewCi
+        I_new = np.einsum('kij,kjl,kml->im', R, inertias, R) # sum of R_i I_i R_i^T
+        # Huygens-Steiner's theorem
+        I_new += np.einsum('k,ki,ki->', masses, offsets, offsets)*np.eye(3) - np.einsum('k,ki,kj->ij', masses, offsets, offsets)
+
+        print("modifying the inertial data of link [",linkElem_Keeper.get("name"),"]")
+        inertialElem = linkElem_Keeper.find("inertial")
+        if inertialElem is None:
+            inertialElem = _make_dummy_inertial_elem()
+            linkElem_Keeper.insert(0, inertialElem)
+        X_KeeperCnew = np.eye(4)
+        X_KeeperCnew[:3, :3] = R_KeeperCkeeper
+        X_KeeperCnew[:3, 3] = pos_KeeperCnew
+        inertialElem.find("mass").attrib["value"] = str(float(total_mass))
+        write_origin(inertialElem.find("origin"), SE3(X_KeeperCnew, check=False))
+        inertiaElem = inertialElem.find("inertia")
+        for attrib_name, (i, j) in (("ixx", (0,0)), ("iyy", (1,1)), ("izz", (2,2)), ("ixy", (0,1)), ("ixz", (0,2)), ("iyz", (1,2))):
+            inertiaElem.attrib[attrib_name] = str(float(I_new[i][j]))
+
+    def compile(self) -> compiled_tree:
+        """ parse the numerical data once into a frozen struct-of-arrays
+
+        The numerical algorithms (e.g. `urdf_kit.graph.kinematics.fk_engine`)
+        consume the result instead of the XML data.
+        Later modifications of this tree are NOT reflected, compile again if needed.
+        """
+        return compiled_tree.from_tree(self)
+    def get_X_AB(self, link_name_a: str, link_name_b: str, joint_positions: dict[str, float] = None) -> np.ndarray:
+        """ (4, 4) pose of link B w.r.t. link A for the given joint positions (default: zeros)
+
+        Convenience wrapper that compiles the tree on each call;
+        for repeated queries, use `urdf_kit.graph.kinematics.fk_engine(tree).relative_transform` instead.
+        """
+        engine = fk_engine(self.compile())
+        joint_positions = dict() if joint_positions is None else joint_positions
+        unknown = set(joint_positions.keys()) - set(engine.joint_names)
+        if unknown:
+            raise ValueError(f"Unknown movable joints {unknown}")
+        q = np.array([joint_positions.get(joint_name, 0.) for joint_name in engine.joint_names])
+        return engine.relative_transform(q, link_name_a, link_name_b)
     def extract_kinematics(self) -> robot_kinematics:
-        raise NotImplementedError()
+        """ home poses + screw axes of all joints (fixed ones included), in one top-down walk
+
+        The joints are sorted top-down (parents first).
+        See `urdf_kit.graph.poe.poe_kinematics` for evaluating the result.
+        """
+        return robot_kinematics(
+            robot_name = self.urdf_root.get("name"),
+            joints = [self.links[link_name].extract_params_joint_body_kinematics() for link_name in self.gen_sorted_list_topdown('depth_first')]
+        )
     def extract_dynamics(self, base_is_mobile = True) -> robot_dynamics:
         """
         Assumptions on the graph (by the time of invoking this function)
@@ -456,15 +715,14 @@ class kinematic_tree:
         out = dict()
         out['robot_name'] = self.urdf_root.get("name")
         if base_is_mobile:
-            baselink_elem = grab_link_elem_by_name(self.urdf_root, self.root_name)
+            baselink_elem = grab_link_elem_by_name(self.urdf_root, self.root_name, index=self.index)
             base_inertial = body_inertial_urdf(baselink_elem).get_serializable()
             out['base_mass'], out['base_inertia'] = base_inertial["mass"], base_inertial["inertia"]
         else:
             out['base_mass'], out['base_inertia'] = None, None
         out['joints'] = []
-        for keys, vals in self.links.items():
-            if keys == self.root_name:
-                continue
-            out['joints'].append(vals.extract_params_joint_body_dynamics())
+        # top-down, as expected by `urdf_kit.graph.dynamics.multibody_dynamics`
+        for link_name in self.gen_sorted_list_topdown('depth_first'):
+            out['joints'].append(self.links[link_name].extract_params_joint_body_dynamics())
         
         return robot_dynamics(**out)
@@ -0,0 +1,180 @@
+from __future__ import annotations
+from xml.etree import ElementTree as ET
+
+__all__ = ("urdf_index",)
+
+"""
+A name-based lookup table of a <robot> element.
+
+The plain `edit_xxxx` helpers scan `urdf_root.findall(...)` on every call,
+which is fine for a handful of queries but becomes quadratic
+once we query every link/ joint of a large assembly.
+The index below is built in one pass over the direct children of <robot>.
+Pass it to the edit APIs (keyword `index`) so that
+the lookups become dictionary accesses and
+the index is kept consistent with the XML data.
+
+Do NOT edit the XML tree behind the index's back
+(e.g. `urdf_root.remove(...)` without calling `index.remove_link(...)`),
+otherwise the lookups will return stale handles.
+"""
+
+class urdf_index:
+    def __init__(self, urdf_root: ET.Element):
+        """name -> element tables (links, joints, transmissions) plus the topology
+
+        Arguments
+        ------------
+        urdf_root: the <robot> element
+
+        Data members
+        ------------
+        links, joints, transmissions: dict[str, Element]
+        parent_joint: dict[str, str]
+            Key: child link name, Value: the name of the joint owning that link
+        child_joints: dict[str, list[str]]
+            Key: link name, Value: names of the joints spawning out of that link
+            (every link has an entry, possibly an empty list)
+        """
+        assert isinstance(urdf_root, ET.Element)
+        assert urdf_root.tag == "robot", f"expect the <robot> element, got <{urdf_root.tag}>"
+        self.urdf_root = urdf_root
+
+        self.links = dict()
+        self.joints = dict()
+        self.transmissions = dict()
+        # the tables below are filled while scanning the joints
+        self._joint_parent = dict() # joint name -> parent link name
+        self._joint_child = dict() # joint name -> child link name
+
+        for elem in urdf_root:
+            self._register(elem)
+        self._build_topology()
+
+    def _register(self, elem: ET.Element):
+        """ add a direct child of <robot> to the name tables (the topology is NOT updated) """
+        if elem.tag == "link":
+            self._insert(self.links, elem, "link")
+        elif elem.tag == "joint":
+            self._insert(self.joints, elem, "joint")
+            self._joint_parent[elem.get("name")] = elem.find("parent").get("link")
+            self._joint_child[elem.get("name")] = elem.find("child").get("link")
+        elif elem.tag == "transmission":
+            self._insert(self.transmissions, elem, "transmission")
+    def _build_topology(self):
+        """ (re)build `parent_joint` and `child_joints` from the registered joints """
+        self.parent_joint = dict()
+        self.child_joints = {link_name: [] for link_name in self.links.keys()}
+        for joint_name in self.joints.keys():
+            self._link_up(joint_name)
+
+    @staticmethod
+    def _insert(table: dict, elem: ET.Element, kind: str):
+        name = elem.get("name")
+        if name in table.keys():
+            raise ValueError(f"Duplicated {kind} name [{name}]!")
+        table[name] = elem
+
+    def _link_up(self, joint_name: str):
+        parent_name = self._joint_parent[joint_name]
+        child_name = self._joint_child[joint_name]
+        if child_name in self.parent_joint.keys():
+            raise ValueError(f"link [{child_name}] is claimed by both joint [{self.parent_joint[child_name]}] and [{joint_name}]!")
+        self.parent_joint[child_name] = joint_name
+        # it is legal to reference a link that is added later
+        self.child_joints.setdefault(parent_name, []).append(joint_name)
+
+    def __repr__(self):
+        return f"urdf_index(robot={self.urdf_root.get('name')}, {len(self.links)} links, {len(self.joints)} joints, {len(self.transmissions)} transmissions)"
+
+    # ==========================
+    # lookups
+    # ==========================
+    def link(self, link_name: str) -> ET.Element:
+        try:
+            return self.links[link_name]
+        except KeyError:
+            raise ValueError(f"The desired link [{link_name}] cannot be found!") from None
+    def joint(self, joint_name: str) -> ET.Element:
+        try:
+            return self.joints[joint_name]
+        except KeyError:
+            raise ValueError(f"The desired joint [{joint_name}] cannot be found!") from None
+    def transmission(self, tx_name: str) -> ET.Element:
+        try:
+            return self.transmissions[tx_name]
+        except KeyError:
+            raise ValueError(f"The desired transmission [{tx_name}] cannot be found!") from None
+
+    def parent_link_name(self, joint_name: str) -> str:
+        return self._joint_parent[joint_name]
+    def child_link_name(self, joint_name: str) -> str:
+        return self._joint_child[joint_name]
+    def child_link_names(self, link_name: str) -> list[str]:
+        """ the direct descendents of this link """
+        return [self._joint_child[joint_name] for joint_name in self.child_joints.get(link_name, [])]
+    def root_link_names(self) -> list[str]:
+        """ links that are not owned by any joint (a valid URDF has exactly one) """
+        return [name for name in self.links.keys() if name not in self.parent_joint.keys()]
+
+    # ==========================
+    # book-keeping for the edit APIs
+    # (they modify the XML data, these methods just follow along)
+    # ==========================
+    def rename_link(self, link_name_old: str, link_name_new: str) -> None:
+        """update the tables AFTER the XML elements are renamed"""
+        if link_name_new in self.links.keys():
+            raise ValueError(f"link [{link_name_new}] already exists!")
+        self.links[link_name_new] = self.links.pop(link_name_old)
+        self.child_joints[link_name_new] = self.child_joints.pop(link_name_old, [])
+        for joint_name in self.child_joints[link_name_new]:
+            self._joint_parent[joint_name] = link_name_new
+        if link_name_old in self.parent_joint.keys():
+            joint_name = self.parent_joint.pop(link_name_old)
+            self.parent_joint[link_name_new] = joint_name
+            self._joint_child[joint_name] = link_name_new
+
+    def rename_joint(self, joint_name_old: str, joint_name_new: str) -> None:
+        if joint_name_new in self.joints.keys():
+            raise ValueError(f"joint [{joint_name_new}] already exists!")
+        self.joints[joint_name_new] = self.joints.pop(joint_name_old)
+        parent_name = self._joint_parent.pop(joint_name_old)
+        child_name = self._joint_child.pop(joint_name_old)
+        self._joint_parent[joint_name_new] = parent_name
+        self._joint_child[joint_name_new] = child_name
+        siblings = self.child_joints[parent_name]
+        siblings[siblings.index(joint_name_old)] = joint_name_new
+        self.parent_joint[child_name] = joint_name_new
+
+    def reparent_joint(self, joint_name: str, link_name_new_parent: str) -> None:
+        """update the tables AFTER <joint/parent/@link> is rewritten"""
+        parent_name_old = self._joint_parent[joint_name]
+        self.child_joints[parent_name_old].remove(joint_name)
+        self._joint_parent[joint_name] = link_name_new_parent
+        self.child_joints.setdefault(link_name_new_parent, []).append(joint_name)
+
+    def add_link(self, link_elem: ET.Element) -> None:
+        self._insert(self.links, link_elem, "link")
+        self.child_joints.setdefault(link_elem.get("name"), [])
+    def add_joint(self, joint_elem: ET.Element) -> None:
+        self._insert(self.joints, joint_elem, "joint")
+        joint_name = joint_elem.get("name")
+        self._joint_parent[joint_name] = joint_elem.find("parent").get("link")
+        self._joint_child[joint_name] = joint_elem.find("child").get("link")
+        self._link_up(joint_name)
+    def add_transmission(self, tx_elem: ET.Element) -> None:
+        self._insert(self.transmissions, tx_elem, "transmission")
+
+    def remove_link(self, link_name: str) -> None:
+        """ forget this link (the joints referencing it shall be removed/ rerouted separately) """
+        del self.links[link_name]
+        if len(self.child_joints.get(link_name, [])) == 0:
+            self.child_joints.pop(link_name, None)
+    def remove_joint(self, joint_name: str) -> None:
+        del self.joints[joint_name]
+        parent_name = self._joint_parent.pop(joint_name)
+        child_name = self._joint_child.pop(joint_name)
+        self.child_joints[parent_name].remove(joint_name)
+        del self.parent_joint[child_name]
+    def remove_transmission(self, tx_name: str) -> None:
+        del self.transmissions[tx_name]
@@ -9,4 +9,5 @@ from ..misc import color_code
 from . import transforms
 from .transforms import *
 
-from . import inertial
\ No newline at end of file
+from . import inertial
+from . import batch
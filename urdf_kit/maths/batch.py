@@ -0,0 +1,206 @@
+import numpy as np
+
+"""
+Batched counterparts of some rigid-body transform routines.
+
+Unlike the rest of `urdf_kit.maths`, no `spatialmath` objects are involved here,
+transforms are plain float arrays of shape (..., 4, 4)
+(rotations: (..., 3, 3)), so that many of them can be processed
+in one NumPy operation.
+"""
+
+def rot_from_rpy(rpy: np.ndarray) -> np.ndarray:
+    """ (..., 3) roll-pitch-yaw angles [rad] ---> (..., 3, 3) rotation matrices
+
+    Same convention as URDF <origin/@rpy> (and `get_origin`):
+    R = Rz(yaw) @ Ry(pitch) @ Rx(roll)
+    """
+    rpy = np.asarray(rpy, dtype=float)
+    cr, cp, cy = np.cos(rpy[..., 0]), np.cos(rpy[..., 1]), np.cos(rpy[..., 2])
+    sr, sp, sy = np.sin(rpy[..., 0]), np.sin(rpy[..., 1]), np.sin(rpy[..., 2])
+    R = np.empty(rpy.shape[:-1]+(3, 3))
+    R[..., 0, 0] = cy*cp
+    R[..., 0, 1] = cy*sp*sr - sy*cr
+    R[..., 0, 2] = cy*sp*cr + sy*sr
+    R[..., 1, 0] = sy*cp
+    R[..., 1, 1] = sy*sp*sr + cy*cr
+    R[..., 1, 2] = sy*sp*cr - cy*sr
+    R[..., 2, 0] = -sp
+    R[..., 2, 1] = cp*sr
+    R[..., 2, 2] = cp*cr
+    return R
+
+def homogeneous(R: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """ (..., 3, 3) rotation + (..., 3) translation ---> (..., 4, 4) """
+    R = np.asarray(R, dtype=float)
+    t = np.asarray(t, dtype=float)
+    batch_shape = np.broadcast_shapes(R.shape[:-2], t.shape[:-1])
+    X = np.zeros(batch_shape+(4, 4))
+    X[..., :3, :3] = R
+    X[..., :3, 3] = t
+    X[..., 3, 3] = 1.
+    return X
+
+def transform_from_xyz_rpy(xyz: np.ndarray, rpy: np.ndarray) -> np.ndarray:
+    """ batched `get_origin`: (..., 3) xyz and (..., 3) rpy ---> (..., 4, 4) """
+    return homogeneous(rot_from_rpy(rpy), xyz)
+
+def rot_from_axis_angle(axis: np.ndarray, angle: np.ndarray) -> np.ndarray:
+    """ Rodrigues' formula in closed form over arrays
+
+    axis: (..., 3) unit vectors
+    angle: (...) [rad]
+    return: (..., 3, 3)
+    """
+    axis = np.asarray(axis, dtype=float)
+    angle = np.asarray(angle, dtype=float)
+    c, s = np.cos(angle), np.sin(angle)
+    v = 1. - c
+    x, y, z = axis[..., 0], axis[..., 1], axis[..., 2]
+    batch_shape = np.broadcast_shapes(axis.shape[:-1], angle.shape)
+    R = np.empty(batch_shape+(3, 3))
+    R[..., 0, 0] = c + x*x*v
+    R[..., 0, 1] = x*y*v - z*s
+    R[..., 0, 2] = x*z*v + y*s
+    R[..., 1, 0] = y*x*v + z*s
+    R[..., 1, 1] = c + y*y*v
+    R[..., 1, 2] = y*z*v - x*s
+    R[..., 2, 0] = z*x*v - y*s
+    R[..., 2, 1] = z*y*v + x*s
+    R[..., 2, 2] = c + z*z*v
+    return R
+
+def exp_twist(screw_axis: np.ndarray, theta: np.ndarray) -> np.ndarray:
+    """ matrix exponential exp([S] theta) of screw axes, in closed form over arrays
+
+    screw_axis: (..., 6) linear part first, i.e. [v, w], with 
+        either |w| = 1 (revolute) or w = 0 and |v| = 1 (prismatic)
+        An all-zero screw axis gives the identity (fixed joint).
+    theta: (...) 
+    return: (..., 4, 4)
+
+    Reference: the "Modern Robotics" textbook, Proposition 3.25
+    """
+    screw_axis = np.asarray(screw_axis, dtype=float)
+    theta = np.asarray(theta, dtype=float)
+    v, w = screw_axis[..., :3], screw_axis[..., 3:]
+    c, s = np.cos(theta), np.sin(theta)
+    is_prismatic = np.sum(w*w, axis=-1) < 0.5
+    R = rot_from_axis_angle(w, theta)
+    R = np.where(is_prismatic[..., None, None], np.eye(3), R)
+    wv = np.cross(w, v)
+    wwv = np.cross(w, wv)
+    t = v*theta[..., None] + (1.-c)[..., None]*wv + (theta-s)[..., None]*wwv
+    return homogeneous(R, t)
+
+def transform_screw(X: np.ndarray, screw: np.ndarray) -> np.ndarray:
+    """ change the frame of screw axes/ twists: Ad_X @ screw, over arrays
+
+    X: (..., 4, 4), the pose of the old frame w.r.t. the new one
+    screw: (..., 6), linear part first
+    return: (..., 6)
+    """
+    R, p = X[..., :3, :3], X[..., :3, 3]
+    w = np.einsum('...ij,...j->...i', R, screw[..., 3:])
+    v = np.einsum('...ij,...j->...i', R, screw[..., :3]) + np.cross(p, w)
+    return np.concatenate((v, w), axis=-1)
+
+def transform_wrench(X: np.ndarray, wrench: np.ndarray) -> np.ndarray:
+    """ Ad_X^T @ wrench, over arrays 
+
+    X: (..., 4, 4), the pose of the NEW frame w.r.t. the old one
+    wrench: (..., 6), [force, moment] 
+    return: (..., 6)
+    """
+    R, p = X[..., :3, :3], X[..., :3, 3]
+    f, n = wrench[..., :3], wrench[..., 3:]
+    f_new = np.einsum('...ji,...j->...i', R, f)
+    n_new = np.einsum('...ji,...j->...i', R, n - np.cross(p, f))
+    return np.concatenate((f_new, n_new), axis=-1)
+
+def inverse_transform(X: np.ndarray) -> np.ndarray:
+    """ (..., 4, 4) ---> (..., 4, 4) inverses, exploiting the structure of rigid-body transforms """
+    R_T = np.swapaxes(X[..., :3, :3], -1, -2)
+    return homogeneous(R_T, -np.einsum('...ij,...j->...i', R_T, X[..., :3, 3]))
+
+def lie_bracket(V: np.ndarray, W: np.ndarray) -> np.ndarray:
+    """ ad_V @ W for twists (linear part first), over arrays """
+    v, w = V[..., :3], V[..., 3:]
+    return np.concatenate((np.cross(w, W[..., :3]) + np.cross(v, W[..., 3:]), np.cross(w, W[..., 3:])), axis=-1)
+
+def lie_bracket_transpose(V: np.ndarray, F: np.ndarray) -> np.ndarray:
+    """ ad_V^T @ F for a twist V and a wrench F (both linear part first), over arrays """
+    v, w = V[..., :3], V[..., 3:]
+    f, n = F[..., :3], F[..., 3:]
+    return np.concatenate((-np.cross(w, f), -np.cross(v, f) - np.cross(w, n)), axis=-1)
+
+def spatial_inertia(mass: np.ndarray, inertia: np.ndarray) -> np.ndarray:
+    """ (...) masses and (..., 3, 3) inertia tensors w.r.t. the CoM-aligned frames 
+    ---> (..., 6, 6) spatial inertia matrices (linear part first)
+    """
+    mass = np.asarray(mass, dtype=float)
+    inertia = np.asarray(inertia, dtype=float)
+    G = np.zeros(mass.shape+(6, 6))
+    G[..., :3, :3] = mass[..., None, None]*np.eye(3)
+    G[..., 3:, 3:] = inertia
+    return G
+
+def adjoint(X: np.ndarray) -> np.ndarray:
+    """ (..., 4, 4) ---> (..., 6, 6) adjoint representations Ad_X (linear part first),
+    cf. `transform_screw`
+    """
+    R, p = X[..., :3, :3], X[..., :3, 3]
+    p_hat = np.zeros(p.shape+(3,))
+    p_hat[..., 0, 1], p_hat[..., 0, 2], p_hat[..., 1, 2] = -p[..., 2], p[..., 1], -p[..., 0]
+    p_hat -= np.swapaxes(p_hat, -1, -2)
+    Ad = np.zeros(p.shape[:-1]+(6, 6))
+    Ad[..., :3, :3] = R
+    Ad[..., :3, 3:] = p_hat @ R
+    Ad[..., 3:, 3:] = R
+    return Ad
+
+def exp_se3(twist: np.ndarray) -> np.ndarray:
+    """ matrix exponential exp([V]) of arbitrary twists (exponential coordinates), over arrays
+
+    twist: (..., 6) linear part first, e.g. a body twist times a time step
+    return: (..., 4, 4)
+
+    Unlike `exp_twist`, the twists need not be normalized.
+    """
+    twist = np.asarray(twist, dtype=float)
+    w_norm = np.linalg.norm(twist[..., 3:], axis=-1)
+    v_norm = np.linalg.norm(twist[..., :3], axis=-1)
+    is_translation = w_norm < 1e-12
+    theta = np.where(is_translation, v_norm, w_norm)
+    scale = np.where(theta > 1e-12, theta, 1.)
+    screw_axis = twist/scale[..., None]
+    screw_axis = np.where(is_translation[..., None], np.concatenate((screw_axis[..., :3], np.zeros_like(screw_axis[..., 3:])), axis=-1), screw_axis)
+    return exp_twist(screw_axis, theta)
+
+def rpy_from_rot(R: np.ndarray) -> np.ndarray:
+    """ (..., 3, 3) rotation matrices ---> (..., 3) roll-pitch-yaw angles [rad]
+
+    The inverse of `rot_from_rpy`, reproducing `SE3.rpy(order='zyx')` 
+    (which `write_origin` used to rely on), its handling of the singularity included:
+    at |pitch| = pi/2, the roll is set to zero.
+    """
+    R = np.asarray(R, dtype=float)
+    rpy = np.empty(R.shape[:-2]+(3,))
+    is_singular = np.abs(np.abs(R[..., 2, 0]) - 1.) < 20*np.finfo(float).eps
+    # regular case
+    roll = np.arctan2(R[..., 2, 1], R[..., 2, 2])
+    yaw = np.arctan2(R[..., 1, 0], R[..., 0, 0])
+    # the pitch from the best-conditioned entry, as `spatialmath.base.tr2rpy`
+    candidates = np.stack((R[..., 0, 0], R[..., 1, 0], R[..., 2, 1], R[..., 2, 2]), axis=-1)
+    k = np.argmax(np.abs(candidates), axis=-1)
+    denominator = np.take_along_axis(candidates, k[..., None], axis=-1)[..., 0]
+    denominator = np.where(denominator == 0., 1., denominator) # only hit in the singular case
+    numerator = np.choose(k, (np.cos(yaw), np.sin(yaw), np.sin(roll), np.cos(roll)))
+    pitch = -np.arctan(R[..., 2, 0]*numerator/denominator)
+    # singular case
+    yaw_singular = np.where(R[..., 2, 0] < 0, -np.arctan2(R[..., 0, 1], R[..., 0, 2]), np.arctan2(-R[..., 0, 1], -R[..., 0, 2]))
+    pitch_singular = -np.arcsin(np.clip(R[..., 2, 0], -1., 1.))
+    rpy[..., 0] = np.where(is_singular, 0., roll)
+    rpy[..., 1] = np.where(is_singular, pitch_singular, pitch)
+    rpy[..., 2] = np.where(is_singular, yaw_singular, yaw)
+    return rpy
@@ -227,22 +227,22 @@ class body_inertial_urdf:
         # self.X_LinkCom += X_ParentCparent.R @ vec_CparentCnew_CParent # oops...
         self.X_LinkCom.t += X_ParentCparent.R @ vec_CparentCnew_CParent
         
-        # update the mass
-        self.m = total_mass
-
         # update the inertia
         # (we will keep the parent CoM frame's orientation)
         # everything frame used here is wrt such frame's orientation
         R = X_CparentCchild.R
-        child_link_inertial.I = R.T@child_link_inertial.I@R
+        child_link_inertial.I = R@child_link_inertial.I@R.T
         # print(child_link_inertial.I)
         vec_CchildCnew_CParent = - vec_CparentCchild_CParent + vec_CparentCnew_CParent
         
         child_link_inertial._steiner_(vec_CchildCnew_CParent)
-        self._steiner_(vec_CparentCnew_CParent)
+        self._steiner_(vec_CparentCnew_CParent) # with the parent's own mass
 
         self.I += child_link_inertial.I
 
+        # update the mass
+        self.m = total_mass
+
         # ---------------------------------
         # final stage:
         #   writeback &
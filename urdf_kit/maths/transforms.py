@@ -1,19 +1,31 @@
+from __future__ import annotations
 import numpy as np
+import functools
 from spatialmath import SE3
 from xml.etree.ElementTree import Element # just for typehint
 
 from . import floatList_from_vec3String, vec3String_from_floatList
 from . import color_code
+from .batch import rot_from_axis_angle, inverse_transform, rpy_from_rot
 
 """
 This submodule deals with rigid-body transform.
 In URDF, this is referred as <origin>.
+
+Backends of the getters
+-------------------------
+* 'spatialmath' (default): SE3 objects
+* 'numpy': plain (4,4) float arrays, much cheaper to construct,
+  see `urdf_kit.maths.batch` for inverse/ adjoint/ RPY conversion over arrays.
+  Compose with `@`.
 """
 
+BACKENDS = ("spatialmath", "numpy")
+
 ##################################
 # getter/ passive operations
 ##################################
-def get_origin(origin_elem: Element) -> SE3:
+def get_origin(origin_elem: Element, backend: str = "spatialmath") -> SE3 | np.ndarray:
     """Read in a URDF <origin> element and return a SE3 object
     
     <origin> means "transforms in URDF".
@@ -23,15 +35,44 @@ def get_origin(origin_elem: Element) -> SE3:
     * <visual>
     * <collision>
 
+    The parsing is memoized on the attribute strings, see `origin_cache_info`.
+    Each call still returns a new object (SE3 or array, see `BACKENDS`), so feel free to modify it.
+
     See also `write_origin`
     """
+    assert backend in BACKENDS, f"got {backend}, supported: {BACKENDS}"
     if origin_elem is None:
-        return SE3.Tx(0)
+        X = np.eye(4)
     else:
         assert origin_elem.tag == "origin"
-        origin_elem_xyz = floatList_from_vec3String(origin_elem.get("xyz"))
-        origin_elem_rpy = floatList_from_vec3String(origin_elem.get("rpy"))
-        return SE3.Trans(origin_elem_xyz)@SE3.RPY(origin_elem_rpy, unit='rad', order='zyx')
+        X = _parse_origin(origin_elem.get("xyz"), origin_elem.get("rpy")).copy()
+    return X if backend == "numpy" else SE3(X, check=False)
+
+# ---------- parse cache for `get_origin` ----------------
+# Keyed on the attribute strings rather than on the element:
+# * edits (e.g. by `write_origin`) change the key, so nothing can go stale
+# * identical origins (very common: "0 0 0") share one entry
+# * no reference to the XML elements is kept
+ORIGIN_CACHE_SIZE = 4096
+
+def _parse_origin_uncached(xyz: str, rpy: str) -> np.ndarray:
+    origin_elem_xyz = floatList_from_vec3String(xyz)
+    origin_elem_rpy = floatList_from_vec3String(rpy)
+    X = (SE3.Trans(origin_elem_xyz)@SE3.RPY(origin_elem_rpy, unit='rad', order='zyx')).A.copy()
+    X.flags.writeable = False # shared by all the cache hits
+    return X
+_parse_origin = functools.lru_cache(maxsize=ORIGIN_CACHE_SIZE)(_parse_origin_uncached)
+
+def origin_cache_info():
+    """ hits, misses, maxsize, currsize of the `get_origin` parse cache """
+    return _parse_origin.cache_info()
+def clear_origin_cache() -> None:
+    _parse_origin.cache_clear()
+def set_origin_cache_size(maxsize: int) -> None:
+    """ resize (and clear) the `get_origin` parse cache, 0 disables it """
+    global _parse_origin
+    assert maxsize is None or maxsize >= 0, f"got {maxsize}"
+    _parse_origin = functools.lru_cache(maxsize=maxsize)(_parse_origin_uncached)
 
 def _get_axis_xyz(joint_elem: Element) -> np.ndarray:
     """
@@ -52,17 +93,32 @@ def _get_axis_xyz(joint_elem: Element) -> np.ndarray:
         axis = floatList_from_vec3String(axisElem.get("xyz"))
         axis = np.array(axis).reshape(3)
         return axis/np.linalg.norm(axis)
-def get_X_JointChild(joint_elem: Element , joint_angle: float) -> SE3:
+def get_X_JointChild(joint_elem: Element , joint_angle: float, backend: str = "spatialmath") -> SE3 | np.ndarray:
     """compute the SE3 of the child link w.r.t. its parent joint
     """
+    assert backend in BACKENDS, f"got {backend}, supported: {BACKENDS}"
+    if backend == "numpy":
+        X = np.eye(4)
+        if joint_elem.get("type") == "fixed":
+            pass
+        elif joint_elem.get("type") in ("continuous","revolute"):
+            X[:3, :3] = rot_from_axis_angle(_get_axis_xyz(joint_elem), joint_angle)
+        elif joint_elem.get("type") == "prismatic":
+            X[:3, 3] = _get_axis_xyz(joint_elem)*joint_angle
+        else:
+            raise NotImplementedError(f"{joint_elem.get('type')} joint not supported yet.")
+        return X
     if joint_elem.get("type") == "fixed":
         return SE3.Tx(0)
     elif joint_elem.get("type") in ("continuous","revolute"):
         return SE3.AngleAxis(theta=joint_angle, v=_get_axis_xyz(joint_elem), unit='rad')
+    elif joint_elem.get("type") == "prismatic":
+        # here `joint_angle` is a displacement along the axis
+        return SE3.Trans(_get_axis_xyz(joint_elem)*joint_angle)
     else: 
-        raise NotImplementedError("Prismatic joint not supported yet.")
+        raise NotImplementedError(f"{joint_elem.get('type')} joint not supported yet.")
 
-def get_X_ParentJoint(joint_elem: Element ) -> SE3:
+def get_X_ParentJoint(joint_elem: Element, backend: str = "spatialmath") -> SE3 | np.ndarray:
     """compute the SE3 of the joint link w.r.t. the parent link
 
     Note: In the context of a fixed joint, we can also use this function
@@ -71,9 +127,9 @@ def get_X_ParentJoint(joint_elem: Element ) -> SE3:
     
     """
     joint_origin_elem = joint_elem.find("origin")
-    return get_origin(joint_origin_elem)
+    return get_origin(joint_origin_elem, backend=backend)
 
-def get_X_CparentCchild(joint_elem: Element, parent_elem: Element, child_elem: Element) -> SE3:
+def get_X_CparentCchild(joint_elem: Element, parent_elem: Element, child_elem: Element, backend: str = "spatialmath") -> SE3 | np.ndarray:
     """ calculate the pose of the Center of mass-aligned frame of the child link w.r.t that of the parent link
     
     use cases:
@@ -90,23 +146,49 @@ def get_X_CparentCchild(joint_elem: Element, parent_elem: Element, child_elem: E
     This API is a bit redundant but 
     it can avoid searching for the XML elements again.
     """
-    X_ParentChild = get_X_ParentJoint(joint_elem)
-    X_ParentCparent = get_origin(parent_elem.find("inertial/origin"))
-    X_ChildCchild = get_origin(child_elem.find("inertial/origin"))
+    X_ParentChild = get_X_ParentJoint(joint_elem, backend=backend)
+    X_ParentCparent = get_origin(parent_elem.find("inertial/origin"), backend=backend)
+    X_ChildCchild = get_origin(child_elem.find("inertial/origin"), backend=backend)
+    if backend == "numpy":
+        return inverse_transform(X_ParentCparent)@X_ParentChild@X_ChildCchild
     X_CparentCchild = X_ParentCparent.inv()@X_ParentChild@X_ChildCchild
     return X_CparentCchild
 
 ####################################
 # in-place modification(s)
 ####################################
-def write_origin(origin_elem: Element , X: SE3) -> None:
-    """ Write SE3 into the given <origin> XML element 
+def write_origin(origin_elem: Element , X: SE3 | np.ndarray) -> None:
+    """ Write SE3 (or a (4,4) array) into the given <origin> XML element 
     
     See also `get_origin`    
     """
     # throw an error because otherwise user won't know he/she did sth wrong.
     if origin_elem.tag != "origin":
         raise ValueError(color_code['r']+"The xml element you pass is invalid! Expect an <origin> element!"+color_code['w'])
-    rpy = X.rpy(order='zyx',unit='rad') # TODO how will it handle singularity???
+    if isinstance(X, np.ndarray):
+        assert X.shape == (4, 4), f"got {X.shape}"
+        rpy, t = rpy_from_rot(X[:3, :3]), X[:3, 3]
+    else:
+        rpy, t = X.rpy(order='zyx',unit='rad'), X.t # TODO how will it handle singularity???
     origin_elem.attrib['rpy'] = vec3String_from_floatList(rpy)
-    origin_elem.attrib['xyz'] = vec3String_from_floatList(X.t)
+    origin_elem.attrib['xyz'] = vec3String_from_floatList(t)
+
+def write_origins(origin_elems: list[Element], X_stack: np.ndarray) -> None:
+    """ bulk `write_origin`: one vectorized RPY conversion for all elements
+
+    origin_elems: N <origin> elements
+    X_stack: (N, 4, 4) the transforms to write, in the same order
+
+    The written strings are the same as `write_origin(origin_elems[i], X_stack[i])`.
+    """
+    X_stack = np.asarray(X_stack, dtype=float).reshape(-1, 4, 4)
+    if len(origin_elems) != X_stack.shape[0]:
+        raise ValueError(f"Got {len(origin_elems)} <origin> elements but {X_stack.shape[0]} transforms!")
+    for i, origin_elem in enumerate(origin_elems):
+        if origin_elem.tag != "origin":
+            raise ValueError(color_code['r']+f"The xml element #{i} you pass is invalid! Expect an <origin> element!"+color_code['w'])
+    rpy_list = rpy_from_rot(X_stack[:, :3, :3]).tolist()
+    xyz_list = X_stack[:, :3, 3].tolist()
+    for origin_elem, rpy, xyz in zip(origin_elems, rpy_list, xyz_list):
+        origin_elem.attrib['rpy'] = vec3String_from_floatList(rpy)
+        origin_elem.attrib['xyz'] = vec3String_from_floatList(xyz)
@@ -1,5 +1,7 @@
 from __future__ import annotations
+import io
 from xml.etree import ElementTree as ET
+import numpy as np
 from . import grab_all_joints
 
 def format_then_write(urdf_root: ET.ElementTree, fpath: str):
@@ -8,6 +10,139 @@ def format_then_write(urdf_root: ET.ElementTree, fpath: str):
     with open(fpath, "wb") as f: # make no mistake it's 'wb' not 'w'
         f.write(ET.tostring(urdf_root) ) # requires Python 3.9+
 
+# ------------ serialization helpers -----------
+# the same output as the (private) helpers of `xml.etree.ElementTree`, which are not part of its API
+def _escape_cdata(text: str) -> str:
+    if not isinstance(text, str):
+        raise TypeError(f"cannot serialize {text!r} (type {type(text).__name__})")
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+def _escape_attrib(text: str) -> str:
+    # the whitespaces are escaped as well, otherwise they would be normalized when parsed back
+    return _escape_cdata(text).replace("\"", "&quot;").replace("\r", "&#13;").replace("\n", "&#10;").replace("\t", "&#09;")
+
+def _registered_prefix(uri: str) -> str:
+    """ the prefix registered for this namespace (cf. `ET.register_namespace`), None if none """
+    text = ET.tostring(ET.Element(f"{{{uri}}}_"), encoding="unicode") # e.g. '<xacro:_ xmlns:xacro="..." />'
+    prefix = text[1:text.index(" ")].rpartition(":")[0]
+    return None if prefix == "ns0" else prefix # `ET.register_namespace` rejects the "ns<digits>" prefixes
+def _qualified_names(urdf_root: ET.Element) -> tuple[dict, dict]:
+    """ Return: qualified name ---> serialized "prefix:name", namespace ---> prefix
+    the prefixes are assigned as in `ET.ElementTree.write` (registered ones, otherwise ns0, ns1, ... in document order)
+    """
+    qnames = {None: None}
+    namespaces = dict()
+    def add_qname(qname: str):
+        if not isinstance(qname, str):
+            raise TypeError(f"cannot serialize {qname!r} (type {type(qname).__name__})")
+        if qname[:1] != "{":
+            qnames[qname] = qname
+            return
+        uri, tag = qname[1:].rsplit("}", 1)
+        prefix = namespaces.get(uri)
+        if prefix is None:
+            prefix = _registered_prefix(uri)
+            if prefix is None:
+                prefix = f"ns{len(namespaces)}"
+            if prefix != "xml":
+                namespaces[uri] = prefix
+        qnames[qname] = f"{prefix}:{tag}" if prefix else tag
+    for elem in urdf_root.iter():
+        tag = elem.tag
+        if isinstance(tag, ET.QName):
+            tag = tag.text
+        if tag is not ET.Comment and tag is not ET.ProcessingInstruction and tag not in qnames:
+            add_qname(tag)
+        for key, value in elem.items():
+            if isinstance(key, ET.QName):
+                key = key.text
+            if key not in qnames:
+                add_qname(key)
+            if isinstance(value, ET.QName) and value.text not in qnames:
+                add_qname(value.text)
+        if isinstance(elem.text, ET.QName) and elem.text.text not in qnames:
+            add_qname(elem.text.text)
+    return qnames, namespaces
+
+def stream_write_formatted(urdf_root: ET.Element, file, space: str = "  "):
+    """ same bytes as `format_then_write` but
+    * the tree is NOT modified (the indentation is computed on the fly), and
+    * the document is written element by element instead of being built as one bytes object first.
+
+    Arguments
+    ------------
+    urdf_root: the element to write (or an ElementTree)
+    file: a file path or a binary file object (left open)
+    space: the indentation of one level, cf. `ET.indent`
+    """
+    if isinstance(urdf_root, ET.ElementTree):
+        urdf_root = urdf_root.getroot()
+    assert isinstance(urdf_root, ET.Element)
+    # the serialization mirrors `ET.ElementTree.write` (US-ASCII, hence no XML declaration)
+    qnames, namespaces = _qualified_names(urdf_root)
+    indentations = ["\n"]
+
+    def write_elem(elem: ET.Element, level: int, tail: str, namespaces: dict, flush = None):
+        tag, text = elem.tag, elem.text
+        if isinstance(tag, ET.QName):
+            tag = tag.text
+        if len(elem) > 0 and (not text or not text.strip()):
+            # `ET.indent` only touches the text of the elements having children
+            if len(indentations) == level + 1:
+                indentations.append(indentations[level] + space)
+            text = indentations[level + 1]
+        if tag is ET.Comment:
+            write(f"<!--{text}-->")
+        elif tag is ET.ProcessingInstruction:
+            write(f"<?{text}?>")
+        else:
+            tag = qnames[tag]
+            if tag is not None:
+                write("<" + tag)
+                for v, k in sorted((namespaces or dict()).items(), key=lambda x: x[1]): # sort on prefix
+                    write(f' xmlns{":" + k if k else ""}="{_escape_attrib(v)}"')
+                for k, v in elem.items():
+                    if isinstance(k, ET.QName):
+                        k = k.text
+                    v = qnames[v.text] if isinstance(v, ET.QName) else _escape_attrib(v)
+                    write(f' {qnames[k]}="{v}"')
+            if tag is None or text or len(elem) > 0:
+                if tag is not None:
+                    write(">")
+                if text:
+                    write(_escape_cdata(text))
+                num_children = len(elem)
+                for i, child in enumerate(elem):
+                    child_tail = child.tail
+                    if not child_tail or not child_tail.strip():
+                        child_tail = indentations[level + (1 if i < num_children - 1 else 0)]
+                    write_elem(child, level + 1, child_tail, None)
+                    if flush is not None:
+                        flush()
+                if tag is not None:
+                    write("</" + tag + ">")
+            else:
+                write(" />")
+        if tail:
+            write(_escape_cdata(tail))
+
+    is_path = not hasattr(file, "write")
+    f = open(file, "wb") if is_path else file
+    try:
+        stream = io.TextIOWrapper(f, encoding="us-ascii", errors="xmlcharrefreplace", newline="\n")
+        # the pieces are small, pass them on by batches (one top-level element at a time)
+        pieces = []
+        write = pieces.append
+        def flush():
+            stream.write("".join(pieces))
+            pieces.clear()
+        write_elem(urdf_root, 0, urdf_root.tail, namespaces, flush)
+        flush()
+        stream.flush()
+        stream.detach() # leave the underlying file open
+    finally:
+        if is_path:
+            f.close()
+
 def remove_subelement_by_tag(parent_elem: ET.Element, tag: str):
     """
     notes: will remove all occurence, okay to not exist.
@@ -43,6 +178,102 @@ def stringList_from_vec3String(input_str: str) ->  list[str]:
     return val_list
 def floatList_from_vec3String(input_str: str) ->  list[float]:
     return [float(string) for string in stringList_from_vec3String(input_str)]
+def array_from_vec3Strings(input_strs: list[str]) -> np.ndarray:
+    """bulk `floatList_from_vec3String`: N strings ---> (N,3) float array
+
+    Same acceptance rules as `stringList_from_vec3String` followed by `float`,
+    but all strings are checked first and the offending ones are reported together.
+
+    Raise
+    ---------
+    ValueError: listing the indices (and values) of all offending strings
+    """
+    n = len(input_strs)
+    # fast path: every string is "x y z" with single spaces, one join, one conversion
+    if all(isinstance(input_str, str) for input_str in input_strs) \
+            and [input_str.count(" ") for input_str in input_strs].count(2) == n:
+        tokens = " ".join(input_strs).split(" ")
+        if '' not in tokens:
+            try:
+                return np.array(tokens, dtype=float).reshape(n, 3)
+            except ValueError:
+                pass # to be reported below
+    # slow path: string by string
+    out = np.empty((n, 3))
+    offending = []
+    for i, input_str in enumerate(input_strs):
+        try:
+            out[i] = floatList_from_vec3String(input_str)
+        except (AssertionError, ValueError):
+            offending.append(i)
+    if offending:
+        raise ValueError(f"Expect exactly 3 floating point numbers separated by whitespaces in each string, "
+            f"{len(offending)} offending string(s) at (index: value) "
+            + ", ".join(f"{i}: {input_strs[i]!r}" for i in offending[:10]) + (", ..." if len(offending) > 10 else ""))
+    return out
+def collect_vec3_attributes(urdf_root: ET.Element, path: str, attrib_name: str, default: str = None) -> tuple[list[ET.Element], np.ndarray]:
+    """parse the vec3 attribute of all the matching elements in one go
+
+    Arguments
+    ------------
+    path: as for `findall`, e.g. "joint/origin", "link/inertial/origin", "joint/axis"
+    attrib_name: e.g. "xyz", "rpy"
+    default: used for the elements without this attribute (e.g. "0 0 0" for <origin>),
+        if None, these elements are reported as offending
+
+    Return
+    ------------
+    the elements in document order and the (N,3) values, see `array_from_vec3Strings`
+    """
+    elems = urdf_root.findall(path)
+    return elems, array_from_vec3Strings([elem.get(attrib_name, default) for elem in elems])
+VEC3_ATTRIBUTE_DEFAULTS = {
+    # (tag, attribute) ---> value if missing (cf. the URDF specification), None: mandatory
+    ("origin", "xyz"): "0 0 0",
+    ("origin", "rpy"): "0 0 0",
+    ("axis", "xyz"): "1 0 0",
+}
+def collect_all_vec3_attributes(urdf_root: ET.Element, defaults: dict[tuple[str, str], str] = None) -> dict[tuple[str, str], tuple[list[ET.Element], np.ndarray]]:
+    """parse all the vec3 attributes of a model in ONE pass over the tree (instead of one `findall` per path)
+
+    The elements are bucketed by (tag, attribute) wherever they are,
+    e.g. ("origin", "xyz") gathers the origins of the joints, inertials, visuals and collisions.
+
+    Arguments
+    ------------
+    defaults: (tag, attribute) ---> default value, see `VEC3_ATTRIBUTE_DEFAULTS` (the default)
+        if a default value is None, the elements without this attribute are reported as offending
+
+    Return
+    ------------
+    (tag, attribute) ---> the elements in document order and the (N,3) values, see `array_from_vec3Strings`
+
+    Raise
+    ---------
+    ValueError: naming the (tag, attribute) bucket and the offending indices within it
+    """
+    if defaults is None:
+        defaults = VEC3_ATTRIBUTE_DEFAULTS
+    attrib_names_of = dict() # tag ---> attribute names
+    for tag, attrib_name in defaults.keys():
+        attrib_names_of.setdefault(tag, []).append(attrib_name)
+    buckets = {key: ([], []) for key in defaults.keys()} # elements, strings
+    for elem in urdf_root.iter():
+        attrib_names = attrib_names_of.get(elem.tag)
+        if attrib_names is None:
+            continue
+        for attrib_name in attrib_names:
+            key = (elem.tag, attrib_name)
+            elems, strings = buckets[key]
+            elems.append(elem)
+            strings.append(elem.get(attrib_name, defaults[key]))
+    out = dict()
+    for (tag, attrib_name), (elems, strings) in buckets.items():
+        try:
+            out[(tag, attrib_name)] = elems, array_from_vec3Strings(strings)
+        except ValueError as e:
+            raise ValueError(f"<{tag} {attrib_name}=...>: {e}") from e
+    return out
 def vec3String_from_stringList(val_list: list[str]) -> str:
     assert len(val_list) == 3
     return " ".join(val_list)
@@ -0,0 +1,157 @@
+from __future__ import annotations
+import dataclasses
+import tracemalloc
+import numpy as np
+from pathlib import Path
+from xml.etree import ElementTree as ET
+
+from .index import urdf_index
+from .misc import array_from_vec3Strings
+
+"""
+Load (very) large URDF files in one streaming pass.
+
+Instead of `ET.parse(...).getroot()` followed by repeated scans,
+`iterparse_urdf` builds the name index, the adjacency and the numeric arrays
+while the file is being parsed, and can drop the heavy subtrees
+(e.g. <visual> meshes, <gazebo> blocks) as soon as they are complete,
+so they never accumulate in memory.
+"""
+
+@dataclasses.dataclass
+class streamed_urdf:
+    urdf_root: ET.Element # without the discarded subtrees
+    index: urdf_index
+    adjacency: dict[str, list[str]] # parent link ---> child links, cf. `graph.tree.calc_descendent_adjacency`
+    joint_names: list[str] # document order, the rows of the joint arrays
+    joint_types: list[str]
+    joint_origin_xyz: np.ndarray # (n_joints, 3)
+    joint_origin_rpy: np.ndarray # (n_joints, 3)
+    joint_axis: np.ndarray # (n_joints, 3) as written, (1, 0, 0) if unspecified
+    link_names: list[str] # document order, the rows of the link arrays
+    mass: np.ndarray # (n_links,) 0 if no <inertial>
+    inertial_origin_xyz: np.ndarray # (n_links, 3)
+    inertial_origin_rpy: np.ndarray # (n_links, 3)
+    inertia: np.ndarray # (n_links, 6) ixx, iyy, izz, ixy, iyz, ixz
+    num_discarded: dict[str, int] # discarded path ---> number of elements
+    peak_memory: int = None # [bytes] during the parsing, if tracked
+    def __repr__(self):
+        out = f"streamed_urdf(robot={self.urdf_root.get('name')}, {len(self.link_names)} links, {len(self.joint_names)} joints"
+        if self.peak_memory is not None:
+            out += f", peak memory {self.peak_memory/2**20:.1f} MiB"
+        return out + ")"
+
+_INERTIA_ATTRIBUTES = ("ixx", "iyy", "izz", "ixy", "iyz", "ixz")
+
+def iterparse_urdf(source: str | Path, discard: tuple[str] = (), track_memory: bool = False) -> streamed_urdf:
+    """parse a URDF file in one pass
+
+    Arguments
+    ------------
+    source: a file path (or a file object)
+    discard: paths relative to <robot> of the subtrees to drop,
+        e.g. ("link/visual", "link/collision", "gazebo", "transmission")
+    track_memory: report the peak memory (traced Python allocations) during the parsing,
+        this slows down the parsing noticeably
+
+    Return
+    ------------
+    see `streamed_urdf`
+    """
+    discard = set(discard)
+    if not track_memory:
+        return _iterparse_urdf(source, discard)
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        out = _iterparse_urdf(source, discard)
+        out.peak_memory = tracemalloc.get_traced_memory()[1]
+        return out
+    finally:
+        if started_tracing: # even if the parsing fails, otherwise every later allocation stays traced
+            tracemalloc.stop()
+
+def _iterparse_urdf(source: str | Path, discard: set[str]) -> streamed_urdf:
+    path = [] # tags from <robot> (exclusive) down to the current element
+    stack = [] # the corresponding elements, <robot> included
+    urdf_root = None
+    index = None
+    num_discarded = {discarded_path: 0 for discarded_path in discard}
+    joint_strings = [] # (name, type, xyz, rpy, axis)
+    link_strings = [] # (name, mass, xyz, rpy, inertia values)
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            if urdf_root is None:
+                if elem.tag != "robot":
+                    raise ValueError(f"expect the <robot> element, got <{elem.tag}>")
+                urdf_root = elem
+                # NOTE: the parser works by chunks, <robot> may already hold some children at its start event,
+                # hence the index starts from an empty placeholder and registers the children one by one below
+                index = urdf_index(ET.Element("robot"))
+                index.urdf_root = urdf_root
+            else:
+                path.append(elem.tag)
+            stack.append(elem)
+            continue
+        # ---------- end event: the element is complete ----------
+        stack.pop()
+        if elem is urdf_root:
+            break
+        this_path = "/".join(path)
+        path.pop()
+        if this_path in discard:
+            stack[-1].remove(elem)
+            elem.clear()
+            num_discarded[this_path] += 1
+            continue
+        if len(path) > 0:
+            continue # not a direct child of <robot>
+        index._register(elem)
+        if elem.tag == "joint":
+            origin_elem, axis_elem = elem.find("origin"), elem.find("axis")
+            joint_strings.append((
+                elem.get("name"), elem.get("type"),
+                "0 0 0" if origin_elem is None else origin_elem.get("xyz", "0 0 0"),
+                "0 0 0" if origin_elem is None else origin_elem.get("rpy", "0 0 0"),
+                "1 0 0" if axis_elem is None else axis_elem.get("xyz", "1 0 0"),
+            ))
+        elif elem.tag == "link":
+            inertial_elem = elem.find("inertial")
+            if inertial_elem is None:
+                link_strings.append((elem.get("name"), "0", "0 0 0", "0 0 0", ("0",)*6))
+            else:
+                origin_elem, inertia_elem = inertial_elem.find("origin"), inertial_elem.find("inertia")
+                link_strings.append((
+                    elem.get("name"),
+                    inertial_elem.find("mass").get("value"),
+                    "0 0 0" if origin_elem is None else origin_elem.get("xyz", "0 0 0"),
+                    "0 0 0" if origin_elem is None else origin_elem.get("rpy", "0 0 0"),
+                    tuple(inertia_elem.get(attrib_name) for attrib_name in _INERTIA_ATTRIBUTES),
+                ))
+    if urdf_root is None:
+        raise ValueError("Empty document!")
+    index._build_topology()
+
+    joint_columns = list(zip(*joint_strings)) if joint_strings else [[]]*5
+    link_columns = list(zip(*link_strings)) if link_strings else [[]]*5
+    adjacency = dict()
+    for joint_name in index.joints.keys():
+        adjacency.setdefault(index.parent_link_name(joint_name), []).append(index.child_link_name(joint_name))
+    return streamed_urdf(
+        urdf_root = urdf_root,
+        index = index,
+        adjacency = adjacency,
+        joint_names = list(joint_columns[0]),
+        joint_types = list(joint_columns[1]),
+        joint_origin_xyz = array_from_vec3Strings(joint_columns[2]),
+        joint_origin_rpy = array_from_vec3Strings(joint_columns[3]),
+        joint_axis = array_from_vec3Strings(joint_columns[4]),
+        link_names = list(link_columns[0]),
+        mass = np.array(link_columns[1], dtype=float).reshape(-1),
+        inertial_origin_xyz = array_from_vec3Strings(link_columns[2]),
+        inertial_origin_rpy = array_from_vec3Strings(link_columns[3]),
+        inertia = np.array(link_columns[4], dtype=float).reshape(-1, 6),
+        num_discarded = num_discarded,
+    )